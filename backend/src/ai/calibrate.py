@@ -0,0 +1,147 @@
+"""
+Calibration des embeddings de visages (python -m src.ai.calibrate)
+
+Le jeu de visages est un dossier par personne (disposition de LFW) : dossier/<personne>/<image>.
+
+    python -m src.ai.calibrate mean <dossier>        # calcule src/ai/face_mean.npy
+    python -m src.ai.calibrate threshold <dossier>   # taux de fausses acceptations par seuil
+
+Trois familles de paires sont évaluées :
+- "repost" : un visage contre une copie recadrée, redimensionnée et recompressée de la même photo
+  (cas d'une photo protégée republiée, celui des alertes "photo détectée") ;
+- "même personne" : deux photos différentes d'un même dossier ;
+- "imposteurs" : deux visages de dossiers différents (taux de fausses acceptations).
+"""
+
+import argparse
+import itertools
+import os
+import cv2
+import numpy as np
+
+from src.ai.face_scan import FACE_MEAN_PATH, center_embedding, describe_face, detect_faces, load_image
+
+def load_faces(directory, whole_image=False):
+    """
+    Descripteurs bruts du plus grand visage de chaque image
+
+    Args:
+        directory (str): Dossier contenant un sous-dossier par personne
+        whole_image (bool): Images déjà recadrées sur le visage (pas de détection)
+
+    Returns:
+        list: Tuples (personne, image en niveaux de gris, boîte du visage)
+    """
+    faces = []
+    for person in sorted(os.listdir(directory)):
+        person_dir = os.path.join(directory, person)
+        if not os.path.isdir(person_dir):
+            continue
+        for name in sorted(os.listdir(person_dir)):
+            gray = load_image(os.path.join(person_dir, name), cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                continue
+            if whole_image:
+                box = (0, 0, gray.shape[1], gray.shape[0])
+            else:
+                boxes = detect_faces(gray)
+                if not boxes:
+                    continue
+                box = max(boxes, key=lambda b: b[2] * b[3])
+            faces.append((person, gray, box))
+    return faces
+
+def repost(gray, box, rng):
+    """
+    Copie republiée d'une photo : boîte décalée de quelques pixels, changement d'échelle,
+    de luminosité et recompression JPEG
+    """
+    x, y, w, h = box
+    # Réduction jusqu'à la moitié, sans descendre sous 32 pixels de visage
+    scale = rng.uniform(min(1.0, max(0.5, 32 / w)), 1.0)
+    img = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    img = np.clip(img * rng.uniform(0.8, 1.2) + rng.uniform(-20, 20), 0, 255).astype(np.uint8)
+    _, buffer = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, int(rng.integers(50, 90))])
+    img = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+
+    # La détection sur la copie ne retrouve pas exactement la même boîte
+    jitter = rng.uniform(-0.08, 0.08, 3) * w
+    size = min(int(round((w + jitter[2]) * scale)), *img.shape[:2])
+    x = int(np.clip(round((x + jitter[0]) * scale), 0, img.shape[1] - size))
+    y = int(np.clip(round((y + jitter[1]) * scale), 0, img.shape[0] - size))
+    return img, (x, y, size, size)
+
+def compute_mean(faces):
+    return np.mean([describe_face(gray, box) for _, gray, box in faces], axis=0).astype(np.float32)
+
+def score_pairs(faces, max_impostors=200000, seed=0):
+    """
+    Cosinus des paires "repost", "même personne" et "imposteurs" avec les embeddings centrés
+
+    Returns:
+        dict: {"repost", "same_person", "impostor"} -> np.ndarray des scores
+    """
+    rng = np.random.default_rng(seed)
+    people = np.array([person for person, _, _ in faces])
+    embeddings = center_embedding(np.stack([describe_face(gray, box) for _, gray, box in faces]))
+    reposts = center_embedding(np.stack([describe_face(*repost(gray, box, rng)) for _, gray, box in faces]))
+
+    same, impostor = [], []
+    pairs = itertools.combinations(range(len(faces)), 2)
+    total = len(faces) * (len(faces) - 1) // 2
+    if total > max_impostors:
+        # Échantillon aléatoire des paires (les paires d'une même personne sont rares)
+        pairs = {tuple(sorted(pair)) for pair in rng.integers(0, len(faces), (max_impostors, 2)) if pair[0] != pair[1]}
+    for i, j in pairs:
+        (same if people[i] == people[j] else impostor).append(float(embeddings[i] @ embeddings[j]))
+    return {
+        "repost": np.einsum("ij,ij->i", embeddings, reposts),
+        "same_person": np.array(same),
+        "impostor": np.array(impostor),
+    }
+
+def threshold_for_far(impostor, far):
+    """
+    Plus petit seuil dont le taux de fausses acceptations (score > seuil) ne dépasse pas far
+    """
+    if len(impostor) == 0:
+        return None
+    return float(np.quantile(impostor, 1 - far, method="higher"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibration des embeddings de visages")
+    parser.add_argument("command", choices=["mean", "threshold"])
+    parser.add_argument("directory", help="Dossier de visages (un sous-dossier par personne)")
+    parser.add_argument("--whole-image", action="store_true", help="Images déjà recadrées sur le visage")
+    parser.add_argument("--output", default=FACE_MEAN_PATH, help="Fichier du visage moyen (commande mean)")
+    parser.add_argument("--far", type=float, default=0.001, help="Taux de fausses acceptations visé")
+    args = parser.parse_args()
+
+    faces = load_faces(args.directory, args.whole_image)
+    print(f"{len(faces)} visage(s), {len({person for person, _, _ in faces})} personne(s)")
+    if not faces:
+        return
+
+    if args.command == "mean":
+        np.save(args.output, compute_mean(faces))
+        print(f"Visage moyen enregistré dans {args.output}")
+        return
+
+    scores = score_pairs(faces)
+    for name, values in scores.items():
+        if len(values):
+            print(f"{name}: {len(values)} paire(s), médiane {np.median(values):.3f}, "
+                  f"1% {np.quantile(values, 0.01):.3f}, 99% {np.quantile(values, 0.99):.3f}")
+    threshold = threshold_for_far(scores["impostor"], args.far)
+    if threshold is None:
+        return
+    print(f"Seuil pour {args.far:.2%} de fausses acceptations: {threshold:.3f}")
+    for value in sorted({round(threshold, 2), 0.3, 0.4, 0.5, 0.6, 0.7}):
+        row = [f"seuil {value:.2f}", f"fausses acceptations {np.mean(scores['impostor'] > value):.3%}",
+               f"reposts reconnus {np.mean(scores['repost'] > value):.1%}"]
+        if len(scores["same_person"]):
+            row.append(f"même personne reconnue {np.mean(scores['same_person'] > value):.1%}")
+        print(", ".join(row))
+
+if __name__ == "__main__":
+    main()
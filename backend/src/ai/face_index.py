@@ -0,0 +1,216 @@
+import os
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+class FaceIndex:
+    """
+    Index des plus proches voisins pour les embeddings de visages protégés
+
+    Deux modes :
+    - "flat" : recherche exacte par produit matriciel sur tous les embeddings
+    - "ivf" : partitionnement k-means (inverted file), seules les nprobe partitions
+      les plus proches de la requête sont parcourues
+
+    Les embeddings sont supposés normalisés (norme 1) : le score est le cosinus.
+    """
+
+    def __init__(self, dim, mode="flat", nlist=64, nprobe=4):
+        if mode not in ("flat", "ivf"):
+            raise ValueError(f"Mode d'index inconnu: {mode}")
+        self.dim = dim
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._content_ids = np.empty(0, dtype=np.int64)
+        self._user_ids = np.empty(0, dtype=np.int64)
+        self._centroids = None
+        self._assignments = np.empty(0, dtype=np.int64)
+        self._lists = None
+
+    def __len__(self):
+        return len(self._content_ids)
+
+    def add(self, content_ids, user_ids, vectors):
+        """
+        Ajoute des embeddings à l'index (un par contenu protégé)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            self._vectors = np.vstack([self._vectors, vectors])
+            self._content_ids = np.concatenate([self._content_ids, np.asarray(content_ids, dtype=np.int64)])
+            self._user_ids = np.concatenate([self._user_ids, np.asarray(user_ids, dtype=np.int64)])
+            if self.mode != "ivf":
+                return
+            if self._centroids is None:
+                self.train()
+            else:
+                # Les nouveaux visages rejoignent la partition la plus proche, sans réentraînement
+                self._assignments = np.concatenate([self._assignments, np.argmax(vectors @ self._centroids.T, axis=1)])
+                self._build_lists()
+
+    def remove(self, content_id):
+        """
+        Retire l'embedding d'un contenu protégé
+        """
+        with self._lock:
+            keep = self._content_ids != content_id
+            self._vectors = self._vectors[keep]
+            self._content_ids = self._content_ids[keep]
+            self._user_ids = self._user_ids[keep]
+            if self.mode == "ivf" and self._centroids is not None:
+                self._assignments = self._assignments[keep]
+                self._build_lists()
+
+    def train(self, iterations=10):
+        """
+        Entraîne les partitions de l'inverted file (k-means de Lloyd) sur les embeddings indexés
+        """
+        with self._lock:
+            self._train(iterations)
+
+    def _train(self, iterations):
+        count = len(self._vectors)
+        if count == 0:
+            self._centroids, self._lists = None, None
+            self._assignments = np.empty(0, dtype=np.int64)
+            return
+
+        nlist = min(self.nlist, count)
+        rng = np.random.default_rng(0)
+        centroids = self._vectors[rng.choice(count, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(self._vectors @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = self._vectors[assignments == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm > 0 else centroid
+
+        self._centroids = centroids
+        self._assignments = np.argmax(self._vectors @ centroids.T, axis=1)
+        self._build_lists()
+
+    def _build_lists(self):
+        self._lists = [np.flatnonzero(self._assignments == c) for c in range(len(self._centroids))]
+
+    def search(self, queries, k=5, threshold=None):
+        """
+        Recherche les contenus protégés les plus proches de chaque requête
+
+        Args:
+            queries (np.ndarray): Embeddings requêtes, forme (n, dim) ou (dim,)
+            k (int): Nombre de voisins par requête
+            threshold (float): Score minimal (optionnel)
+
+        Returns:
+            list: Pour chaque requête, liste de dicts {content_id, user_id, score} triés par score décroissant
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            vectors, content_ids, user_ids = self._vectors, self._content_ids, self._user_ids
+            centroids, lists = self._centroids, self._lists
+
+        if len(vectors) == 0:
+            return [[] for _ in range(len(queries))]
+
+        if self.mode == "flat" or centroids is None:
+            # Un seul produit matriciel pour toutes les requêtes contre tous les visages protégés
+            scores = queries @ vectors.T
+            return [self._top_k(row, np.arange(len(vectors)), k, threshold, content_ids, user_ids) for row in scores]
+
+        results = []
+        nprobe = min(self.nprobe, len(centroids))
+        probes = np.argsort(-(queries @ centroids.T), axis=1)[:, :nprobe]
+        for query, probe in zip(queries, probes):
+            candidates = np.concatenate([lists[c] for c in probe]).astype(np.int64)
+            scores = vectors[candidates] @ query
+            results.append(self._top_k(scores, candidates, k, threshold, content_ids, user_ids))
+        return results
+
+    @staticmethod
+    def _top_k(scores, candidates, k, threshold, content_ids, user_ids):
+        if len(scores) == 0:
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        matches = []
+        for i in top:
+            score = float(scores[i])
+            if threshold is not None and score < threshold:
+                break
+            row = candidates[i]
+            matches.append({"content_id": int(content_ids[row]), "user_id": int(user_ids[row]), "score": score})
+        return matches
+
+def _create_index():
+    from src.ai.face_scan import EMBEDDING_DIM
+
+    return FaceIndex(
+        EMBEDDING_DIM,
+        mode=os.getenv("FACE_INDEX_MODE", "flat"),
+        nlist=int(os.getenv("FACE_INDEX_NLIST", "64")),
+        nprobe=int(os.getenv("FACE_INDEX_NPROBE", "4")),
+    )
+
+# Index partagé par le processus, reconstruit depuis la base au démarrage
+face_index = _create_index()
+
+def rebuild_face_index(db):
+    """
+    Recharge l'index depuis les embeddings de référence stockés dans ProtectedContent
+
+    Returns:
+        int: Nombre de visages indexés
+    """
+    global face_index
+    from src.ai.protected_content import refresh_face_embeddings
+    from src.models.database import ProtectedContent
+
+    refresh_face_embeddings(db)
+    rows = db.query(ProtectedContent.id, ProtectedContent.user_id, ProtectedContent.face_embedding) \
+        .filter(ProtectedContent.face_embedding.isnot(None)) \
+        .all()
+
+    index = _create_index()
+    if rows:
+        index.add(
+            [row.id for row in rows],
+            [row.user_id for row in rows],
+            np.stack([np.frombuffer(row.face_embedding, dtype=np.float32) for row in rows]),
+        )
+    face_index = index
+    return len(index)
+
+def index_protected_content(content):
+    """
+    Ajoute l'embedding de référence d'un ProtectedContent à l'index courant
+    """
+    if content.face_embedding is not None:
+        face_index.add([content.id], [content.user_id], np.frombuffer(content.face_embedding, dtype=np.float32))
+
+def unindex_protected_content(content_id):
+    """
+    Retire l'embedding d'un contenu protégé de l'index courant
+    """
+    face_index.remove(content_id)
+
+def match_faces(embeddings, k=5, threshold=None):
+    """
+    Vérifie un ou plusieurs visages extraits contre tous les visages protégés, en une requête vectorisée
+
+    Une correspondance signifie la même photo de visage (republiée, recadrée, recompressée),
+    pas la même personne : deux photos différentes d'un même visage restent sous le seuil.
+    """
+    from src.ai.face_scan import get_match_threshold
+
+    if threshold is None:
+        threshold = get_match_threshold()
+    return face_index.search(embeddings, k=k, threshold=threshold)
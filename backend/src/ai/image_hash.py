@@ -0,0 +1,202 @@
+import hashlib
+import os
+import threading
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+from src.ai.face_scan import load_image
+
+# Charger les variables d'environnement
+load_dotenv()
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+def average_hash(gray):
+    """
+    aHash : pixels d'une miniature 8x8 comparés à leur moyenne
+    """
+    small = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+    return _bits_to_int(small > small.mean())
+
+def difference_hash(gray):
+    """
+    dHash : gradient horizontal d'une miniature 9x8
+    """
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+def perceptual_hash(gray):
+    """
+    pHash : basses fréquences de la DCT d'une miniature 32x32 comparées à leur médiane
+    """
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    # La composante continue (0, 0) est exclue du calcul de la médiane
+    median = np.median(low.ravel()[1:])
+    return _bits_to_int(low > median)
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+def hash_to_hex(value):
+    return f"{value:016x}"
+
+def compute_image_hashes(source):
+    """
+    Calcule les hashes perceptuels d'une image
+
+    Args:
+        source (str | bytes): Chemin ou contenu encodé de l'image
+
+    Returns:
+        dict: {"ahash", "dhash", "phash"} en hexadécimal (64 bits), ou None si l'image est illisible
+    """
+    gray = load_image(source, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    return {
+        "ahash": hash_to_hex(average_hash(gray)),
+        "dhash": hash_to_hex(difference_hash(gray)),
+        "phash": hash_to_hex(perceptual_hash(gray)),
+    }
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    """
+    SHA-256 d'un fichier, lu par blocs
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class BKTree:
+    """
+    Arbre BK sur la distance de Hamming entre hashes de 64 bits
+
+    Chaque nœud est [hash, enfants {distance: nœud}, valeurs associées].
+    Une recherche de rayon r n'explore que les enfants à distance d ± r du nœud courant.
+    """
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        with self._lock:
+            self._size += 1
+            if self._root is None:
+                self._root = [value, {}, [item]]
+                return
+            node = self._root
+            while True:
+                distance = hamming_distance(value, node[0])
+                if distance == 0:
+                    node[2].append(item)
+                    return
+                child = node[1].get(distance)
+                if child is None:
+                    node[1][distance] = [value, {}, [item]]
+                    return
+                node = child
+
+    def remove(self, value, item):
+        """
+        Retire une valeur associée à un hash (le nœud reste en place pour ne pas réorganiser l'arbre)
+        """
+        with self._lock:
+            node = self._root
+            while node is not None:
+                distance = hamming_distance(value, node[0])
+                if distance == 0:
+                    if item in node[2]:
+                        node[2].remove(item)
+                        self._size -= 1
+                    return
+                node = node[1].get(distance)
+
+    def search(self, value, max_distance):
+        """
+        Retourne les (distance, valeur associée) dont le hash est à au plus max_distance bits
+        """
+        results = []
+        # Sous verrou : add et remove modifient les enfants et les valeurs des nœuds parcourus
+        with self._lock:
+            stack = [self._root] if self._root is not None else []
+            while stack:
+                node = stack.pop()
+                distance = hamming_distance(value, node[0])
+                if distance <= max_distance:
+                    results.extend((distance, item) for item in node[2])
+                for child_distance, child in node[1].items():
+                    if distance - max_distance <= child_distance <= distance + max_distance:
+                        stack.append(child)
+        results.sort(key=lambda result: result[0])
+        return results
+
+def get_hash_max_distance():
+    """
+    Distance de Hamming maximale (en bits de pHash) pour considérer deux images comme identiques
+    """
+    return int(os.getenv("PHASH_MAX_DISTANCE", "8"))
+
+# Index des pHash des contenus protégés, reconstruit depuis la base au démarrage
+hash_index = BKTree()
+
+def rebuild_hash_index(db):
+    """
+    Recharge l'index depuis ProtectedContent.perceptual_hash
+
+    Returns:
+        int: Nombre d'images indexées
+    """
+    global hash_index
+    from src.models.database import ProtectedContent
+
+    rows = db.query(ProtectedContent.id, ProtectedContent.user_id, ProtectedContent.perceptual_hash) \
+        .filter(ProtectedContent.perceptual_hash.isnot(None)) \
+        .all()
+
+    index = BKTree()
+    for row in rows:
+        index.add(int(row.perceptual_hash, 16), (row.id, row.user_id))
+    hash_index = index
+    return len(index)
+
+def index_protected_hash(content):
+    """
+    Ajoute le pHash d'un ProtectedContent à l'index courant
+    """
+    if content.perceptual_hash:
+        hash_index.add(int(content.perceptual_hash, 16), (content.id, content.user_id))
+
+def unindex_protected_hash(content_id, user_id, phash):
+    """
+    Retire le pHash (hexadécimal) d'un contenu protégé de l'index courant
+    """
+    if phash:
+        hash_index.remove(int(phash, 16), (content_id, user_id))
+
+def screen_image(source, max_distance=None):
+    """
+    Filtre rapide d'une image scrapée contre tous les contenus protégés, avant tout modèle facial
+
+    Returns:
+        list: Dicts {content_id, user_id, distance} triés par distance croissante
+    """
+    if max_distance is None:
+        max_distance = get_hash_max_distance()
+
+    gray = load_image(source, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return []
+    return [
+        {"content_id": content_id, "user_id": user_id, "distance": distance}
+        for distance, (content_id, user_id) in hash_index.search(perceptual_hash(gray), max_distance)
+    ]
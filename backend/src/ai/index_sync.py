@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import uuid
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from src.models.database import ProtectedContent, run_with_session
+
+# Charger les variables d'environnement
+load_dotenv()
+
+def rebuild_indexes(db):
+    """
+    Recharge les index des contenus protégés (pHash et visages) depuis la base
+
+    Returns:
+        dict: {"hashes": images indexées, "faces": visages indexés}
+    """
+    from src.ai.face_index import rebuild_face_index
+    from src.ai.image_hash import rebuild_hash_index
+
+    return {"hashes": rebuild_hash_index(db), "faces": rebuild_face_index(db)}
+
+def _index_content(db, content_id):
+    from src.ai.face_index import index_protected_content, unindex_protected_content
+    from src.ai.image_hash import index_protected_hash, unindex_protected_hash
+
+    content = db.get(ProtectedContent, content_id)
+    if content is None:
+        return
+    # Retrait préalable : le contenu peut déjà figurer dans un index reconstruit entre-temps
+    unindex_protected_content(content.id)
+    unindex_protected_hash(content.id, content.user_id, content.perceptual_hash)
+    index_protected_hash(content)
+    index_protected_content(content)
+
+class IndexSync:
+    """
+    Maintien des index des contenus protégés dans chaque processus (API, workers)
+
+    En mode "local" (par défaut), les index sont chargés au démarrage et seul le processus qui
+    ajoute ou retire un contenu met à jour les siens. En mode "postgres" (plusieurs processus),
+    chaque ajout ou suppression émet un NOTIFY dans la transaction ; les autres processus le
+    reçoivent via LISTEN et appliquent le changement à leurs propres index. Les index sont
+    reconstruits à chaque (re)connexion de l'écoute, pour rattraper les changements émis pendant
+    une coupure.
+    """
+
+    def __init__(self, mode=None, channel=None):
+        self.mode = mode or os.getenv("INDEX_SYNC", os.getenv("ALERT_BROKER", "local"))
+        self.channel = channel or os.getenv("INDEX_SYNC_CHANNEL", "shadow_protected_content")
+        # Identifie les notifications émises par ce processus, déjà appliquées à ses index
+        self.origin = uuid.uuid4().hex
+        self._listener = None
+        self._loaded = None
+        self._stopping = False
+
+    @property
+    def distributed(self):
+        return self.mode == "postgres"
+
+    def notify(self, db, action, content):
+        """
+        Émet un NOTIFY dans la transaction de db (délivré seulement au commit)
+
+        Args:
+            db: Session SQLAlchemy synchrone
+            action (str): "added" ou "removed"
+            content (ProtectedContent): Contenu ajouté (après flush) ou retiré (avant suppression)
+        """
+        if not self.distributed:
+            return
+        payload = json.dumps({
+            "origin": self.origin,
+            "action": action,
+            "content_id": content.id,
+            "user_id": content.user_id,
+            "phash": content.perceptual_hash,
+        })
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+
+    def apply(self, change):
+        """
+        Applique aux index de ce processus un changement émis par un autre processus
+        """
+        from src.ai.face_index import unindex_protected_content
+        from src.ai.image_hash import unindex_protected_hash
+
+        if change["action"] == "removed":
+            unindex_protected_content(change["content_id"])
+            unindex_protected_hash(change["content_id"], change["user_id"], change["phash"])
+        else:
+            run_with_session(_index_content, change["content_id"])
+
+    async def rebuild(self):
+        try:
+            counts = await asyncio.to_thread(run_with_session, rebuild_indexes)
+            print(f"Index des hashes perceptuels chargé: {counts['hashes']} image(s) protégée(s)")
+            print(f"Index des visages chargé: {counts['faces']} visage(s) protégé(s)")
+        except Exception as e:
+            print(f"Erreur lors du chargement des index: {str(e)}")
+        self._loaded.set()
+
+    async def _listen(self):
+        import asyncpg
+        from src.models.database import DATABASE_URL
+
+        # Connexion dédiée hors pool : LISTEN la garde occupée en permanence
+        dsn = DATABASE_URL.replace("postgresql+psycopg2://", "postgresql://")
+        delay = 1
+        while not self._stopping:
+            try:
+                connection = await asyncpg.connect(dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                print(f"Erreur de connexion pour la synchronisation des index: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+
+            delay = 1
+            # Changements appliqués un par un, dans l'ordre d'arrivée ; None signale la perte de la connexion
+            changes = asyncio.Queue()
+
+            def on_notification(connection, pid, channel, payload):
+                try:
+                    change = json.loads(payload)
+                except ValueError as e:
+                    print(f"Notification d'index invalide: {str(e)}")
+                    return
+                if change.get("origin") != self.origin:
+                    changes.put_nowait(change)
+
+            connection.add_termination_listener(lambda _: changes.put_nowait(None))
+            try:
+                await connection.add_listener(self.channel, on_notification)
+                await self.rebuild()
+                while (change := await changes.get()) is not None:
+                    try:
+                        await asyncio.to_thread(self.apply, change)
+                    except Exception as e:
+                        print(f"Erreur lors de la mise à jour des index: {str(e)}")
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+
+    async def start(self, wait=False):
+        """
+        Charge les index, puis (mode "postgres") écoute les changements des autres processus
+
+        Args:
+            wait (bool): Mode "postgres" : attendre le premier chargement (sinon fait en arrière-plan)
+        """
+        self._loaded = self._loaded or asyncio.Event()
+        if not self.distributed:
+            await self.rebuild()
+        elif self._listener is None:
+            self._stopping = False
+            self._listener = asyncio.create_task(self._listen())
+        if wait:
+            await self._loaded.wait()
+
+    async def stop(self):
+        self._stopping = True
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+# Synchronisation partagée par le processus
+index_sync = IndexSync()
@@ -0,0 +1,181 @@
+import os
+import cv2
+import numpy as np
+
+from src.ai.face_scan import compute_face_embeddings, load_image
+from src.ai.face_index import index_protected_content, unindex_protected_content
+from src.ai.image_hash import compute_image_hashes, index_protected_hash, unindex_protected_hash, sha256_file
+from src.ai.index_sync import index_sync
+from src.jobs.queue import enqueue_job
+from src.models.database import ProtectedContent
+from src.storage.blobs import blob_store, acquire_blob, release_blob
+
+# Plus grand côté des miniatures (pixels)
+THUMBNAIL_SIZE = 256
+
+def _encode_jpeg(img):
+    ok, buffer = cv2.imencode(".jpg", img)
+    return buffer.tobytes() if ok else b""
+
+def _thumbnail(path):
+    img = load_image(path)
+    if img is None:
+        return b""
+    scale = THUMBNAIL_SIZE / max(img.shape[:2])
+    if scale < 1:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return _encode_jpeg(img)
+
+def _face_crop(path, box):
+    img = load_image(path)
+    if img is None:
+        return b""
+    x, y, w, h = box
+    return _encode_jpeg(img[y:y + h, x:x + w])
+
+def compute_image_artefacts(sha256, image_path, phash=None):
+    """
+    Dérivés d'une image (pHash, embedding et recadrage du plus grand visage, miniature),
+    calculés une seule fois puis relus depuis le dossier du blob (voir storage.blobs)
+
+    Args:
+        sha256 (str): SHA-256 de l'image
+        image_path (str): Chemin de l'image
+        phash (str): pHash déjà calculé (envoi en flux), sinon calculé si absent du stockage
+
+    Returns:
+        dict: {"phash": str ou None, "embedding": bytes float32 ou None}
+    """
+    largest = []
+
+    def largest_face():
+        # Détection faite au plus une fois, partagée par l'embedding et le recadrage
+        if not largest:
+            faces = compute_face_embeddings(image_path)
+            largest.append(max(faces, key=lambda face: face[0][2] * face[0][3]) if faces else None)
+        return largest[0]
+
+    def compute_phash():
+        if phash is not None:
+            return phash.encode()
+        hashes = compute_image_hashes(image_path)
+        return hashes["phash"].encode() if hashes else b""
+
+    stored_phash = blob_store.derive(sha256, "phash.txt", compute_phash).decode()
+    embedding = blob_store.derive(
+        sha256, "embedding.v2.f32", lambda: largest_face()[1].tobytes() if largest_face() else b""
+    )
+    blob_store.derive(sha256, "face.jpg", lambda: _face_crop(image_path, largest_face()[0]) if largest_face() else b"")
+    blob_store.derive(sha256, "thumbnail.jpg", lambda: _thumbnail(image_path))
+    return {"phash": stored_phash or None, "embedding": embedding or None}
+
+def refresh_face_embeddings(db):
+    """
+    Recalcule les embeddings enregistrés avant le centrage sur le visage moyen
+    (descripteur brut : aucune composante négative)
+
+    Returns:
+        int: Nombre de contenus mis à jour
+    """
+    contents = db.query(ProtectedContent).filter(ProtectedContent.face_embedding.isnot(None)).all()
+    count = 0
+    for content in contents:
+        if np.frombuffer(content.face_embedding, dtype=np.float32).min() < 0:
+            continue
+        content.face_embedding = compute_image_artefacts(content.hash_value, content.content_path)["embedding"]
+        count += 1
+    if count:
+        db.commit()
+    return count
+
+def register_protected_image(db, user_id, image_path, description=None, sha256=None, phash=None):
+    """
+    Enregistre une image à protéger : calcule ses hashes et son embedding facial, puis l'indexe
+
+    Args:
+        db: Session SQLAlchemy
+        user_id (int): Propriétaire du contenu
+        image_path (str): Chemin de l'image stockée
+        description (str): Description libre
+        sha256 (str): SHA-256 déjà calculé (envoi en flux), sinon calculé depuis le fichier
+        phash (str): Hash perceptuel déjà calculé, sinon calculé depuis le fichier
+
+    Returns:
+        ProtectedContent: Ligne créée
+    """
+    sha256 = sha256 or sha256_file(image_path)
+    artefacts = compute_image_artefacts(sha256, image_path, phash)
+
+    content = ProtectedContent(
+        user_id=user_id,
+        content_type="image",
+        content_path=image_path,
+        description=description,
+        hash_value=sha256,
+        perceptual_hash=artefacts["phash"],
+        face_embedding=artefacts["embedding"],
+    )
+    db.add(content)
+    db.flush()
+    # Les index des autres processus (API, workers) sont mis à jour au commit
+    index_sync.notify(db, "added", content)
+    db.commit()
+    db.refresh(content)
+
+    index_protected_hash(content)
+    index_protected_content(content)
+    return content
+
+def store_uploaded_image(db, user_id, upload, description=None):
+    """
+    Enregistre une image reçue par /social/upload, dédoublonnée par SHA-256 (hash_value)
+
+    Un fichier déjà protégé par l'utilisateur n'est pas enregistré une seconde fois. Sinon le
+    fichier est rangé dans le stockage par contenu (une seule copie, référencée par chaque
+    utilisateur qui le protège) et ses dérivés déjà calculés sont réutilisés.
+
+    Args:
+        db: Session SQLAlchemy
+        user_id (int): Propriétaire du contenu
+        upload (dict): Fichier reçu (voir storage.uploads.MultipartUpload.files)
+        description (str): Description libre
+
+    Returns:
+        tuple: (ProtectedContent, "created" ou "duplicate")
+    """
+    existing = db.query(ProtectedContent) \
+        .filter(ProtectedContent.user_id == user_id, ProtectedContent.hash_value == upload["sha256"]) \
+        .first()
+    if existing is not None:
+        os.remove(upload["path"])
+        return existing, "duplicate"
+
+    extension = os.path.splitext(upload["filename"])[1].lower()
+    acquire_blob(db, upload["sha256"], upload["size"], extension)
+    path = blob_store.put(upload["path"], upload["sha256"], extension)
+    content = register_protected_image(db, user_id, path, description, sha256=upload["sha256"], phash=upload["phash"])
+    return content, "created"
+
+def remove_protected_content(db, content_id, user_id):
+    """
+    Retire un contenu de la surveillance ; le fichier est supprimé quand plus aucun contenu ne l'utilise
+
+    Returns:
+        bool: False si le contenu n'existe pas ou n'appartient pas à l'utilisateur
+    """
+    content = db.get(ProtectedContent, content_id)
+    if content is None or content.user_id != user_id:
+        return False
+
+    if content.content_path and content.content_path.startswith(blob_store.root):
+        release_blob(db, content.hash_value)
+        enqueue_job(db, "collect_blobs", {}, commit=False)
+    phash, owner = content.perceptual_hash, content.user_id
+    index_sync.notify(db, "removed", content)
+    db.delete(content)
+    db.commit()
+
+    # Index courants (rebuild_face_index et rebuild_hash_index remplacent les objets)
+    unindex_protected_content(content_id)
+    unindex_protected_hash(content_id, owner, phash)
+    return True
@@ -0,0 +1 @@
+# Fichier __init__.py pour indiquer que le dossier est un package Python
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+class BloomFilter:
+    """
+    Filtre de Bloom à taille fixe (double hachage sur un BLAKE2b de 128 bits)
+    """
+
+    def __init__(self, capacity, error_rate, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        """
+        Ajoute une clé ; retourne False si elle était (probablement) déjà présente
+        """
+        new = False
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+class ScalableBloomFilter:
+    """
+    Filtre de Bloom extensible : une nouvelle couche, plus grande et plus stricte, est ajoutée
+    quand la couche courante est pleine, ce qui garde le taux de faux positifs global borné
+    (environ error_rate / (1 - tightening)) sans connaître le volume à l'avance.
+    """
+
+    def __init__(self, initial_capacity=1000, error_rate=1e-4, growth=2, tightening=0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.layers = []
+
+    def __contains__(self, key):
+        return any(key in layer for layer in self.layers)
+
+    def add(self, key):
+        if key in self:
+            return False
+        if not self.layers or self.layers[-1].count >= self.layers[-1].capacity:
+            index = len(self.layers)
+            self.layers.append(BloomFilter(
+                self.initial_capacity * self.growth ** index,
+                self.error_rate * (1 - self.tightening) * self.tightening ** index,
+            ))
+        return self.layers[-1].add(key)
+
+    def save(self, path):
+        """
+        Écrit le filtre sur disque (en-tête JSON sur une ligne puis bits des couches), de façon atomique
+        """
+        header = {
+            "initial_capacity": self.initial_capacity,
+            "error_rate": self.error_rate,
+            "growth": self.growth,
+            "tightening": self.tightening,
+            "layers": [[layer.capacity, layer.error_rate, layer.count] for layer in self.layers],
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            for layer in self.layers:
+                f.write(layer.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            bloom = cls(header["initial_capacity"], header["error_rate"], header["growth"], header["tightening"])
+            for capacity, error_rate, count in header["layers"]:
+                layer = BloomFilter(capacity, error_rate, count=count)
+                layer.bits = bytearray(f.read(len(layer.bits)))
+                bloom.layers.append(layer)
+        return bloom
+
+@contextmanager
+def _file_lock(path):
+    """
+    Verrou exclusif entre processus (fichier path), sans effet là où fcntl n'existe pas
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+class SeenUrlRegistry:
+    """
+    URLs canoniques déjà signalées, un filtre de Bloom par utilisateur
+
+    Les filtres sont chargés depuis BLOOM_DIR, ou reconstruits depuis la table alerts s'ils
+    n'existent pas encore. Un faux positif écarte une découverte nouvelle avec une probabilité
+    de l'ordre de BLOOM_ERROR_RATE ; l'index unique de la table alerts reste la garantie finale
+    contre les doublons (y compris entre workers dont les filtres ne sont pas encore fusionnés).
+
+    Plusieurs processus partagent BLOOM_DIR : chacun garde les URLs marquées depuis son dernier
+    enregistrement et les ajoute, sous verrou, au filtre relu sur disque. Les couches ne sont
+    jamais fusionnées bit à bit : des couches qui ont divergé dépasseraient leur capacité sans
+    que leur compteur ne le montre, et le taux de faux positifs exploserait.
+    """
+
+    def __init__(self, directory=None, error_rate=None):
+        self.directory = directory or os.getenv("BLOOM_DIR", "./data/bloom")
+        self.error_rate = error_rate or float(os.getenv("BLOOM_ERROR_RATE", "1e-4"))
+        self._filters = {}
+        # URLs marquées depuis le dernier enregistrement, par utilisateur
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _path(self, user_id):
+        return os.path.join(self.directory, f"{user_id}.bloom")
+
+    def _load(self, user_id):
+        from src.models.database import SessionLocal, Alert
+        from src.scraping.urls import canonicalize_url
+
+        path = self._path(user_id)
+        if os.path.exists(path):
+            try:
+                return ScalableBloomFilter.load(path), False
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Filtre de Bloom illisible pour l'utilisateur {user_id}, reconstruction: {str(e)}")
+
+        bloom = ScalableBloomFilter(error_rate=self.error_rate)
+        db = SessionLocal()
+        try:
+            for (url,) in db.query(Alert.url).filter(Alert.user_id == user_id).yield_per(10000):
+                # Les alertes antérieures à la canonicalisation sont ramenées à la forme canonique
+                bloom.add(canonicalize_url(url))
+        finally:
+            db.close()
+        return bloom, True
+
+    def get(self, user_id):
+        """
+        Filtre de l'utilisateur (chargé depuis le disque ou la base au premier appel)
+        """
+        bloom = self._filters.get(user_id)
+        if bloom is not None:
+            return bloom
+        loaded, rebuilt = self._load(user_id)
+        with self._lock:
+            bloom = self._filters.setdefault(user_id, loaded)
+            if rebuilt and bloom is loaded:
+                self._pending.setdefault(user_id, [])
+        return bloom
+
+    async def aget(self, user_id):
+        """
+        Variante asynchrone de get : le premier chargement se fait hors de la boucle d'événements
+        """
+        bloom = self._filters.get(user_id)
+        if bloom is not None:
+            return bloom
+        return await asyncio.to_thread(self.get, user_id)
+
+    def mark(self, user_id, url):
+        self.get(user_id)
+        with self._lock:
+            if self._filters[user_id].add(url):
+                self._pending.setdefault(user_id, []).append(url)
+
+    def save(self):
+        """
+        Ajoute les URLs marquées depuis le dernier enregistrement au filtre présent sur disque
+        (celui des autres processus), l'écrit, puis le reprend en mémoire
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for user_id, urls in pending.items():
+            path = self._path(user_id)
+            try:
+                with _file_lock(f"{path}.lock"):
+                    bloom = self._filters[user_id]
+                    if os.path.exists(path):
+                        try:
+                            bloom = ScalableBloomFilter.load(path)
+                        except (OSError, ValueError, KeyError) as e:
+                            # Fichier illisible : remplacé par le filtre en mémoire
+                            print(f"Filtre de Bloom illisible pour l'utilisateur {user_id}, remplacement: {str(e)}")
+                        else:
+                            for url in urls:
+                                bloom.add(url)
+                    bloom.save(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Erreur lors de l'enregistrement du filtre de Bloom ({user_id}): {str(e)}")
+                with self._lock:
+                    self._pending.setdefault(user_id, [])[:0] = urls
+                continue
+            with self._lock:
+                # URLs marquées pendant l'écriture : gardées pour le prochain enregistrement
+                for url in self._pending.get(user_id, []):
+                    bloom.add(url)
+                self._filters[user_id] = bloom
+
+# Registre partagé par le processus
+seen_urls = SeenUrlRegistry()
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Limite de taille d'une notification PostgreSQL (8000 octets, marge comprise)
+NOTIFY_MAX_PAYLOAD = 7900
+
+def serialize_alert(alert):
+    """
+    Représentation d'une alerte renvoyée aux clients (API, flux SSE/WebSocket)
+
+    Args:
+        alert: Instance Alert ou ligne renvoyée par un INSERT ... RETURNING
+    """
+    return {
+        "id": alert.id,
+        "message": alert.message,
+        "platform": alert.platform,
+        "url": alert.url,
+        "severity": alert.severity,
+        "status": alert.status,
+        "content_id": alert.content_id,
+        "timestamp": alert.created_at.isoformat()
+    }
+
+class Subscription:
+    """
+    Abonnement d'un client au flux d'alertes
+
+    La file est bornée : un client trop lent perd les alertes les plus anciennes (compteur dropped)
+    au lieu de faire grossir la mémoire du serveur ; il peut les récupérer via /social/alerts.
+    """
+
+    def __init__(self, broker, user_id, queue_size):
+        self.broker = broker
+        self.user_id = user_id
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, event):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """
+        Prochaine alerte, ou None si rien n'arrive avant timeout secondes
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class AlertBroker:
+    """
+    Diffusion des nouvelles alertes aux clients connectés
+
+    En mode "local" (par défaut), les alertes écrites par ce processus sont diffusées directement
+    aux abonnés. En mode "postgres" (plusieurs workers), AlertSink émet un NOTIFY dans la
+    transaction d'insertion et chaque processus le reçoit via LISTEN avant de le diffuser à ses
+    propres abonnés : une alerte est visible par tous les clients, quel que soit le worker.
+    """
+
+    def __init__(self, mode=None, channel=None, queue_size=None):
+        self.mode = mode or os.getenv("ALERT_BROKER", "local")
+        self.channel = channel or os.getenv("ALERT_BROKER_CHANNEL", "shadow_alerts")
+        self.queue_size = queue_size or int(os.getenv("ALERT_STREAM_QUEUE_SIZE", "100"))
+        self._subscribers = {}
+        self.listeners = []  # Fonctions appelées avec chaque lot d'alertes diffusé (ex: invalidation de cache)
+        self._listener = None
+        self._stopping = False
+
+    @property
+    def distributed(self):
+        return self.mode == "postgres"
+
+    def subscribe(self, user_id=None):
+        """
+        Abonne un client aux alertes d'un utilisateur (toutes les alertes si user_id est None)
+        """
+        subscription = Subscription(self, user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self):
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, events):
+        """
+        Diffuse des alertes (dicts de serialize_alert avec user_id) aux abonnés de ce processus
+        """
+        for listener in self.listeners:
+            listener(events)
+        for event in events:
+            for user_id in (event["user_id"], None):
+                for subscription in list(self._subscribers.get(user_id, ())):
+                    subscription.put(event)
+
+    async def notify(self, db, events):
+        """
+        Émet un NOTIFY par alerte dans la transaction de db (délivré seulement au commit)
+        """
+        payloads = []
+        for event in events:
+            payload = json.dumps(event)
+            if len(payload) > NOTIFY_MAX_PAYLOAD:
+                payload = json.dumps({**event, "message": event["message"][:200], "url": event["url"][:2000]})
+            payloads.append(payload)
+        if payloads:
+            await db.execute(
+                text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                {"channel": self.channel, "payloads": payloads},
+            )
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            self.publish([json.loads(payload)])
+        except ValueError as e:
+            print(f"Notification d'alerte invalide: {str(e)}")
+
+    async def _listen(self):
+        import asyncpg
+        from src.models.database import DATABASE_URL
+
+        # Connexion dédiée hors pool : LISTEN la garde occupée en permanence
+        dsn = DATABASE_URL.replace("postgresql+psycopg2://", "postgresql://")
+        delay = 1
+        while not self._stopping:
+            try:
+                connection = await asyncpg.connect(dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                print(f"Erreur de connexion pour l'écoute des alertes: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+
+            delay = 1
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            try:
+                await connection.add_listener(self.channel, self._on_notification)
+                await lost.wait()
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+
+    async def start(self):
+        """
+        Lance l'écoute des notifications PostgreSQL (mode "postgres" uniquement)
+        """
+        if self.distributed and self._listener is None:
+            self._stopping = False
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        self._stopping = True
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+# Diffuseur partagé par le processus
+alert_broker = AlertBroker()
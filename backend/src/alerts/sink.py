@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from src.alerts.bloom import seen_urls
+from src.api.cache import response_cache, alert_tags
+from src.alerts.pubsub import alert_broker, serialize_alert
+from src.models.database import AsyncSessionLocal, Alert
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Clé d'unicité des alertes, identique à l'index uq_alerts_user_url_content
+ALERT_CONFLICT_KEY = [Alert.user_id, Alert.url, func.coalesce(Alert.content_id, 0)]
+
+class AlertSink:
+    """
+    Tampon d'écriture des alertes : les découvertes sont accumulées puis insérées par lots
+
+    Un lot est écrit quand il atteint max_batch alertes ou quand la plus ancienne attend
+    depuis max_delay secondes. L'insertion multi-lignes utilise ON CONFLICT DO NOTHING sur
+    (user_id, url, content_id) : une même URL trouvée deux fois ne crée qu'une alerte.
+    Les URLs déjà présentes dans le filtre de Bloom de l'utilisateur sont écartées sans
+    requête ; celles de chaque lot écrit y sont ajoutées. Les alertes insérées sont diffusées
+    aux clients abonnés au flux (voir alerts.pubsub).
+
+    Usage :
+        async with AlertSink() as sink:
+            await sink.add({...})
+    """
+
+    def __init__(self, max_batch=None, max_delay=None):
+        self.max_batch = max_batch or int(os.getenv("ALERT_SINK_BATCH_SIZE", "500"))
+        self.max_delay = max_delay or float(os.getenv("ALERT_SINK_MAX_DELAY", "2"))
+        self.inserted = 0
+        self.duplicates = 0
+        self._buffer = {}
+        self._oldest = None
+        self._lock = asyncio.Lock()
+        self._timer = None
+
+    async def __aenter__(self):
+        self._timer = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._timer.cancel()
+        await self.flush()
+        await asyncio.to_thread(seen_urls.save)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.max_delay / 2)
+            if self._oldest is not None and time.monotonic() - self._oldest >= self.max_delay:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Erreur lors de l'écriture des alertes: {str(e)}")
+
+    async def add(self, alert):
+        """
+        Ajoute une alerte au tampon (dict des colonnes de Alert) et écrit le lot s'il est plein
+        """
+        now = datetime.utcnow()
+        alert = {"content_id": None, "created_at": now, "updated_at": now, **alert}
+        key = (alert["user_id"], alert["url"], alert["content_id"] or 0)
+        if key in self._buffer or alert["url"] in await seen_urls.aget(alert["user_id"]):
+            self.duplicates += 1
+            return
+        self._buffer[key] = alert
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if len(self._buffer) >= self.max_batch:
+            await self.flush()
+
+    async def flush(self):
+        """
+        Écrit le tampon en base en une seule requête
+
+        Returns:
+            list: Alertes réellement insérées (hors doublons déjà présents en base), au format
+                de serialize_alert avec leur user_id
+        """
+        async with self._lock:
+            if not self._buffer:
+                return []
+            pending, oldest = self._buffer, self._oldest
+            rows = list(pending.values())
+            self._buffer = {}
+            self._oldest = None
+
+            stmt = insert(Alert).values(rows).on_conflict_do_nothing(index_elements=ALERT_CONFLICT_KEY)
+            stmt = stmt.returning(
+                Alert.id, Alert.user_id, Alert.url, Alert.content_id, Alert.created_at,
+                Alert.message, Alert.platform, Alert.severity, Alert.status,
+            )
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(stmt)
+                    events = [{**serialize_alert(row), "user_id": row.user_id} for row in result]
+                    if alert_broker.distributed:
+                        await alert_broker.notify(db, events)
+                    await db.commit()
+            except Exception:
+                # Le lot reste en tampon pour la prochaine tentative
+                self._buffer = {**pending, **self._buffer}
+                self._oldest = oldest
+                raise
+
+            # Lignes insérées comme doublons ignorés : l'URL est désormais connue en base
+            for row in rows:
+                seen_urls.mark(row["user_id"], row["url"])
+
+            if events:
+                await response_cache.invalidate(alert_tags(event["user_id"] for event in events))
+            if not alert_broker.distributed:
+                alert_broker.publish(events)
+
+            self.inserted += len(events)
+            self.duplicates += len(rows) - len(events)
+            return events
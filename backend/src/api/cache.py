@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+# Charger les variables d'environnement
+load_dotenv()
+
+class LocalCacheBackend:
+    """
+    Cache en mémoire du processus : LRU borné à max_entries, chaque entrée expirant après son TTL
+
+    Les versions des étiquettes ne sont jamais évincées : une étiquette oubliée repartirait
+    de 0 et rendrait valides des entrées périmées.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+        self._entries = OrderedDict()
+        self._versions = {}
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_versions(self, tags):
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    async def bump(self, tags):
+        self.bump_local(tags)
+
+    def bump_local(self, tags):
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+class RedisCacheBackend:
+    """
+    Cache partagé entre les processus (Redis ou compatible : Valkey, KeyDB, Dragonfly)
+
+    Les versions des étiquettes sont des compteurs Redis : une écriture faite par un worker
+    invalide aussi les réponses mises en cache par les processus de l'API.
+    """
+
+    def __init__(self, url):
+        import redis.asyncio
+
+        self._redis = redis.asyncio.from_url(url)
+
+    async def get(self, key):
+        return await self._redis.get(f"cache:{key}")
+
+    async def set(self, key, value, ttl):
+        await self._redis.set(f"cache:{key}", value, ex=max(1, int(ttl)))
+
+    async def get_versions(self, tags):
+        if not tags:
+            return []
+        return [int(version or 0) for version in await self._redis.mget([f"cache-version:{tag}" for tag in tags])]
+
+    async def bump(self, tags):
+        pipe = self._redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(f"cache-version:{tag}")
+        await pipe.execute()
+
+    def bump_local(self, tags):
+        # Les versions sont déjà partagées par Redis
+        pass
+
+    async def close(self):
+        await self._redis.aclose()
+
+def alert_tags(user_ids):
+    """
+    Étiquettes des listes d'alertes touchées par une écriture pour ces utilisateurs
+    """
+    return ["alerts:all"] + [f"alerts:user:{user_id}" for user_id in sorted(set(user_ids))]
+
+def dmca_tags(request_ids):
+    return [f"dmca:{request_id}" for request_id in sorted(set(request_ids))]
+
+def _matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in [c[2:] if c.startswith("W/") else c for c in candidates]
+
+class ResponseCache:
+    """
+    Cache des réponses JSON des routes en lecture, avec ETag / If-None-Match
+
+    La clé d'une réponse contient la version courante de ses étiquettes (ex: "alerts:user:42").
+    Une écriture incrémente ces versions (invalidate) : les anciennes entrées ne sont plus
+    jamais lues et expirent d'elles-mêmes. Un client qui présente l'ETag courant reçoit un 304
+    sans qu'aucune requête ne soit envoyée à Postgres.
+
+    Backend : CACHE_URL=redis://... pour un cache partagé entre processus, sinon LRU en mémoire.
+    Avec le cache local et des workers séparés, les écritures des workers ne sont visibles
+    qu'à l'expiration du TTL (sauf les alertes, reçues via le diffuseur en mode "postgres").
+    """
+
+    def __init__(self, backend=None, enabled=None):
+        if enabled is None:
+            enabled = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        if backend is None:
+            url = os.getenv("CACHE_URL")
+            backend = RedisCacheBackend(url) if url else LocalCacheBackend()
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def _key(self, request, tags):
+        versions = await self.backend.get_versions(tags)
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        stamp = ",".join(f"{tag}={version}" for tag, version in zip(tags, versions))
+        return f"{request.url.path}?{query}|{stamp}"
+
+    async def respond(self, request, producer, tags=(), ttl=None):
+        """
+        Réponse JSON mise en cache
+
+        Args:
+            request (Request): Requête entrante (chemin, paramètres, If-None-Match)
+            producer: Coroutine sans argument qui calcule le contenu en cas d'absence en cache
+            tags (list): Étiquettes invalidées par les écritures concernées
+            ttl (float): Durée de vie de l'entrée (CACHE_DEFAULT_TTL par défaut)
+
+        Returns:
+            Response: 200 avec ETag, ou 304 si le client possède déjà ce contenu
+        """
+        ttl = ttl or float(os.getenv("CACHE_DEFAULT_TTL", "30"))
+        tags = list(tags)
+        key = entry = None
+        if self.enabled:
+            try:
+                key = await self._key(request, tags)
+                entry = await self.backend.get(key)
+            except Exception as e:
+                print(f"Erreur de lecture du cache: {str(e)}")
+
+        if entry is None:
+            self.misses += 1
+            body = json.dumps(jsonable_encoder(await producer())).encode()
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            entry = etag.encode() + b"\n" + body
+            if key is not None:
+                try:
+                    await self.backend.set(key, entry, ttl)
+                except Exception as e:
+                    print(f"Erreur d'écriture du cache: {str(e)}")
+        else:
+            self.hits += 1
+
+        etag, body = entry.split(b"\n", 1)
+        etag = etag.decode()
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, tags):
+        """
+        Rend périmées toutes les réponses portant l'une de ces étiquettes
+        """
+        if not tags:
+            return
+        try:
+            await self.backend.bump(list(tags))
+        except Exception as e:
+            print(f"Erreur d'invalidation du cache: {str(e)}")
+
+    def on_alerts(self, events):
+        """
+        Invalidation locale pour les alertes reçues du diffuseur (écrites par un autre processus)
+        """
+        self.backend.bump_local(alert_tags(event["user_id"] for event in events))
+
+    async def close(self):
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            await close()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified}
+
+# Cache partagé par le processus
+response_cache = ResponseCache()
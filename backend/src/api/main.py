@@ -1,7 +1,16 @@
-from fastapi import FastAPI
-from src.api.routes import social, legal
-from src.scraping.twitter import search_twitter
-from src.ai.face_scan import scan_image
+import asyncio
+import os
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from src.api.cache import response_cache
+from src.api.routes import social, legal, stream
+from src.scraping.client import close_client
+from src.alerts.bloom import seen_urls
+from src.alerts.pubsub import alert_broker
+from src.ai.index_sync import index_sync
+from src.legal.templating import load_templates
+from src.models.database import async_engine, get_pool_metrics
+from src.scheduler.scans import ScanScheduler
 
 app = FastAPI(title="Shadow API")
 
@@ -11,9 +20,67 @@ def root():
 
 # Include routers from different modules
 app.include_router(social.router, prefix="/social")
+app.include_router(stream.router, prefix="/social")
 app.include_router(legal.router, prefix="/legal")
 
-# Health check endpoint
+# Préchargement du détecteur de visages pour que la première requête ne paie pas le chargement du modèle
+@app.on_event("startup")
+def load_models():
+    # Modules d'analyse d'images (OpenCV, numpy) importés ici et non au chargement de l'application
+    from src.ai.face_scan import warmup_detector
+    
+    warmup_detector()
+    
+    # Modèles de documents juridiques compilés une fois pour toutes
+    print(f"Modèles de documents chargés: {load_templates()}")
+
+# Index des contenus protégés (pHash et visages) chargés depuis la base et tenus à jour
+# des ajouts et suppressions faits par les autres processus
+@app.on_event("startup")
+async def start_index_sync():
+    await index_sync.start()
+
+# Planificateur des analyses (les budgets de requêtes sont partagés en base entre les workers)
+scan_scheduler = ScanScheduler()
+
+@app.on_event("startup")
+async def start_scan_scheduler():
+    # Les alertes écrites par les autres processus invalident aussi le cache local
+    alert_broker.listeners.append(response_cache.on_alerts)
+    await alert_broker.start()
+    if os.getenv("SCAN_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes"):
+        app.state.scan_scheduler_task = asyncio.create_task(scan_scheduler.run_forever())
+
+# Arrêt du planificateur, sauvegarde des filtres d'URLs vues et fermeture du pool HTTP des scrapers
+@app.on_event("shutdown")
+async def stop_background_work():
+    scan_scheduler.stop()
+    await alert_broker.stop()
+    await index_sync.stop()
+    await asyncio.to_thread(seen_urls.save)
+    await close_client()
+    await response_cache.close()
+    await async_engine.dispose()
+
+# Health check endpoint (les sondes reçoivent un 304 tant que l'état ne change pas)
 @app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+async def health_check(request: Request):
+    from src.ai.face_scan import detector_ready
+    
+    async def health():
+        return {"status": "healthy", "face_detector_ready": detector_ready()}
+    return await response_cache.respond(request, health, ttl=float(os.getenv("CACHE_HEALTH_TTL", "5")))
+
+# Métriques des pools de connexions à la base
+@app.get("/health/db")
+def database_pool_metrics():
+    return {"status": "healthy", "pools": get_pool_metrics(), "response_cache": response_cache.stats()}
+
+# Readiness check : charge le détecteur si nécessaire et renvoie 503 tant qu'il n'est pas prêt
+@app.get("/health/ready")
+def readiness_check():
+    from src.ai.face_scan import warmup_detector
+    
+    if not warmup_detector():
+        return JSONResponse(status_code=503, content={"status": "not_ready", "face_detector_ready": False})
+    return {"status": "ready", "face_detector_ready": True}
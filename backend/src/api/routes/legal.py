@@ -1,54 +1,129 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.cache import response_cache, alert_tags, dmca_tags
+from src.legal.takedown import TAKEDOWN_PLATFORMS, create_takedown_request
+from src.models.database import get_db, DMCARequest
 
 router = APIRouter()
 
 @router.post("/dmca", response_model=Dict[str, str])
-def create_dmca_notice(domain: str, reason: str, contact: str):
+def create_dmca_notice(domain: str, reason: str, contact: str, locale: Optional[str] = None):
     """
     Génère une lettre DMCA pour demander la suppression de contenu
     """
     from src.legal.dmca import generate_dmca
     
-    dmca_text = generate_dmca(domain, reason, contact)
+    dmca_text = generate_dmca(domain, reason, contact, locale=locale)
     
     return {
         "status": "created",
         "dmca_text": dmca_text
     }
 
-@router.post("/takedown/{platform}")
-def request_takedown(platform: str, url: str, reason: str):
+@router.post("/notices/batch")
+def generate_notices_batch(
+    requests: List[Dict[str, Any]] = Body(...),
+    format: str = "zip",
+    locale: Optional[str] = None
+):
     """
-    Envoie automatiquement une demande de suppression à une plateforme
+    Génère des centaines de documents DMCA/RGPD en un appel, diffusés en ZIP ou en NDJSON
+    au fur et à mesure du rendu (voir legal.dmca.generate_batch pour le format des demandes)
     """
-    platforms = {
-        "twitter": "Twitter API",
-        "facebook": "Facebook API",
-        "instagram": "Instagram API",
-        "youtube": "YouTube API"
-    }
+    from src.legal.dmca import generate_batch, stream_ndjson, stream_zip
     
-    if platform not in platforms:
+    if len(requests) > int(os.getenv("NOTICE_BATCH_MAX", "5000")):
+        raise HTTPException(status_code=413, detail="Trop de documents demandés en un seul lot")
+    
+    notices = generate_batch(requests, locale=locale)
+    if format == "ndjson":
+        return StreamingResponse(stream_ndjson(notices), media_type="application/x-ndjson")
+    if format == "zip":
+        headers = {"Content-Disposition": 'attachment; filename="notices.zip"'}
+        return StreamingResponse(stream_zip(notices), media_type="application/zip", headers=headers)
+    raise HTTPException(status_code=400, detail="Format non supporté (zip ou ndjson)")
+
+@router.post("/takedown/{platform}")
+async def request_takedown(
+    platform: str,
+    url: str,
+    reason: str,
+    contact: Optional[str] = None,
+    alert_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Met en file une demande de suppression auprès d'une plateforme
+
+    La lettre est générée et envoyée par un worker (src.jobs.worker) ; le suivi se fait
+    via /legal/status/{request_id}.
+    """
+    if platform not in TAKEDOWN_PLATFORMS:
         raise HTTPException(status_code=400, detail="Plateforme non supportée")
     
-    # Logique pour envoyer la demande via l'API appropriée
+    request = await db.run_sync(create_takedown_request, platform, url, reason, contact, alert_id)
     
     return {
-        "status": "requested",
+        "status": request.status,
+        "request_id": request.id,
         "platform": platform,
         "url": url,
-        "message": f"Demande envoyée via {platforms[platform]}"
+        "message": f"Demande mise en file pour envoi via {TAKEDOWN_PLATFORMS[platform]}"
     }
 
-@router.get("/status/{request_id}")
-def check_takedown_status(request_id: str):
+@router.post("/takedowns/grouped")
+async def request_grouped_takedowns(
+    reason: str,
+    contact: Optional[str] = None,
+    user_id: Optional[int] = None,
+    group_by: str = "domain",
+    max_urls: Optional[int] = None,
+    locale: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Vérifie le statut d'une demande de suppression
+    Regroupe les alertes en attente par hébergeur (domaine ou plateforme) et met en file une
+    demande de suppression consolidée par hébergeur, au lieu d'une lettre par URL
     """
-    # Simulation de réponse
+    from src.legal.aggregate import create_grouped_requests
+    
+    if group_by not in ("domain", "platform"):
+        raise HTTPException(status_code=400, detail="Regroupement non supporté (domain ou platform)")
+    
+    requests = await db.run_sync(create_grouped_requests, reason, contact, user_id, group_by, max_urls, locale)
+    # Les alertes regroupées sont passées en "processing"
+    await response_cache.invalidate(alert_tags(request["user_id"] for request in requests) if requests else [])
+    
     return {
-        "request_id": request_id,
         "status": "pending",
-        "updated_at": "2025-05-16T10:30:00Z"
+        "requests": requests,
+        "alerts": sum(len(request["alert_ids"]) for request in requests)
     }
+
+@router.get("/status/{request_id}")
+async def check_takedown_status(request_id: int, http_request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Vérifie le statut d'une demande de suppression (lecture par clé primaire)
+    
+    La réponse est mise en cache jusqu'au prochain changement de statut (ETag / If-None-Match).
+    """
+    async def load_status():
+        request = await db.get(DMCARequest, request_id)
+        if request is None:
+            raise HTTPException(status_code=404, detail="Demande introuvable")
+        
+        return {
+            "request_id": request.id,
+            "status": request.status,
+            "platform": request.platform,
+            "url": request.url,
+            "url_count": request.url_count,
+            "updated_at": request.updated_at.isoformat() + "Z"
+        }
+    
+    return await response_cache.respond(http_request, load_status, tags=dmca_tags([request_id]),
+                                        ttl=float(os.getenv("CACHE_DMCA_TTL", "30")))
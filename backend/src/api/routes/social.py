@@ -1,47 +1,196 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Dict, Any, Optional
 from datetime import datetime
+import asyncio
+import base64
+import json
+import os
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.alerts.pubsub import serialize_alert
+from src.api.cache import response_cache
+from src.models.database import get_db, run_with_session, Alert, ScanJob
+from src.scheduler.scans import SCAN_RUNNERS, enqueue_scan
 
 router = APIRouter()
 
-# Données simulées pour les alertes
-sample_alerts = [
-    {
-        "id": 1, 
-        "message": "Votre photo a été détectée sur Twitter", 
-        "platform": "Twitter", 
-        "url": "https://twitter.com/example/status/123456", 
-        "timestamp": datetime.now().isoformat()
-    },
-    {
-        "id": 2, 
-        "message": "Mention de votre nom sur un forum", 
-        "platform": "Forum XYZ", 
-        "url": "https://forum.xyz/thread/789", 
-        "timestamp": datetime.now().isoformat()
-    }
-]
+def encode_cursor(alert):
+    """
+    Curseur de pagination opaque : position (created_at, id) de la dernière alerte renvoyée
+    """
+    raw = f"{alert.created_at.isoformat()}|{alert.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
-@router.get("/alerts", response_model=List[Dict[str, Any]])
-def get_alerts():
+def decode_cursor(cursor):
+    try:
+        created_at, alert_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(alert_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+@router.get("/alerts", response_model=Dict[str, Any])
+async def get_alerts(
+    request: Request,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    severity: Optional[int] = None,
+    platform: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
     """
-    Récupère toutes les alertes de sécurité détectées pour l'utilisateur
+    Récupère les alertes de sécurité détectées pour l'utilisateur, des plus récentes aux plus anciennes
+    
+    La pagination se fait par clé (created_at, id) : passer le `next_cursor` de la réponse
+    pour obtenir la page suivante. Le coût d'une page ne dépend pas de sa position.
+    
+    Les pages sont mises en cache jusqu'à la prochaine alerte de l'utilisateur ; un client
+    qui renvoie l'ETag reçu (If-None-Match) obtient un 304 tant que rien n'a changé.
     """
-    return sample_alerts
+    # Liste d'un utilisateur : invalidée par ses alertes ; liste globale : par toutes les alertes
+    tags = [f"alerts:user:{user_id}"] if user_id is not None else ["alerts:all"]
+    return await response_cache.respond(
+        request,
+        lambda: _list_alerts(db, user_id, status, severity, platform, cursor, limit),
+        tags=tags,
+        ttl=float(os.getenv("CACHE_ALERTS_TTL", "60")),
+    )
 
-@router.get("/scan/{platform}")
-def scan_platform(platform: str):
+async def _list_alerts(db, user_id, status, severity, platform, cursor, limit):
+    query = select(Alert)
+    if user_id is not None:
+        query = query.where(Alert.user_id == user_id)
+    if status is not None:
+        query = query.where(Alert.status == status)
+    if severity is not None:
+        query = query.where(Alert.severity == severity)
+    if platform is not None:
+        query = query.where(Alert.platform == platform)
+    if cursor:
+        query = query.where(tuple_(Alert.created_at, Alert.id) < decode_cursor(cursor))
+    
+    # Une alerte de plus que demandé indique s'il reste une page suivante
+    result = await db.execute(query.order_by(Alert.created_at.desc(), Alert.id.desc()).limit(limit + 1))
+    alerts = result.scalars().all()
+    has_more = len(alerts) > limit
+    alerts = alerts[:limit]
+    
+    return {
+        "items": [serialize_alert(alert) for alert in alerts],
+        "next_cursor": encode_cursor(alerts[-1]) if has_more else None
+    }
+
+@router.api_route("/scan/{platform}", methods=["GET", "POST"])
+async def scan_platform(
+    platform: str,
+    user_id: int,
+    username: Optional[str] = None,
+    keywords: List[str] = Query(default=[]),
+    queries: List[str] = Query(default=[]),
+    priority: int = 0,
+    db: AsyncSession = Depends(get_db),
+):
     """
-    Lance une analyse sur une plateforme spécifique
+    Planifie une analyse sur une plateforme spécifique
+    
+    L'analyse est placée dans la file de l'utilisateur et exécutée par le planificateur
+    dès que le budget de requêtes de la plateforme le permet.
     """
     if platform not in ["twitter", "instagram", "facebook", "forums"]:
         raise HTTPException(status_code=400, detail="Plateforme non supportée")
     
-    return {"status": "scanning", "platform": platform}
+    # Une analyse sans exécuteur resterait en attente indéfiniment
+    if platform not in SCAN_RUNNERS:
+        raise HTTPException(status_code=400, detail=f"Analyse automatique non disponible pour {platform}")
+    
+    if not username:
+        raise HTTPException(status_code=400, detail="Nom d'utilisateur requis pour l'analyse")
+    
+    params = {"username": username, "keywords": keywords, "queries": queries}
+    job = await db.run_sync(enqueue_scan, user_id, platform, params, priority=priority)
+    
+    return {"status": "queued", "platform": platform, "job_id": job.id}
+
+@router.get("/scan/jobs/{job_id}")
+async def get_scan_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Récupère l'état d'une analyse planifiée
+    """
+    job = await db.get(ScanJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analyse introuvable")
+    
+    return {
+        "job_id": job.id,
+        "platform": job.platform,
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None
+    }
 
 @router.post("/upload")
-def upload_protected_content():
+async def upload_protected_content(request: Request, user_id: int, description: Optional[str] = None):
     """
-    Upload de contenu à protéger (photos, textes, etc.)
+    Upload de contenu à protéger (photos) : corps multipart/form-data avec un ou plusieurs fichiers
+    
+    Le corps est lu en flux : chaque fichier est écrit sur disque par morceaux, avec son SHA-256
+    calculé au passage, sans jamais être chargé entièrement en mémoire. Un fichier déjà protégé
+    (même SHA-256) n'est pas stocké une seconde fois, même par un autre utilisateur : le
+    stockage est adressé par contenu (voir storage.blobs).
     """
-    return {"status": "uploaded", "message": "Contenu ajouté à la surveillance"}
+    from src.ai.protected_content import store_uploaded_image
+    from src.storage.uploads import MultipartUpload, UploadError
+    
+    try:
+        upload = MultipartUpload(request.headers.get("content-type"))
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    try:
+        async for chunk in request.stream():
+            await asyncio.to_thread(upload.write, chunk)
+        await asyncio.to_thread(upload.finish)
+    except UploadError as e:
+        upload.cleanup()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except BaseException:
+        upload.cleanup()
+        raise
+    
+    description = description or upload.fields.get("description")
+    results = []
+    try:
+        for part in upload.files:
+            if part["phash"] is None:
+                results.append({"filename": part["filename"], "status": "rejected",
+                                "detail": "Image illisible ou format non supporté"})
+                continue
+            content, status = await asyncio.to_thread(
+                run_with_session, store_uploaded_image, user_id, part, description
+            )
+            results.append({"filename": part["filename"], "content_id": content.id,
+                            "sha256": part["sha256"], "size": part["size"], "status": status})
+    finally:
+        upload.cleanup()
+    
+    return {
+        "status": "uploaded",
+        "message": "Contenu ajouté à la surveillance",
+        "files": results
+    }
+
+@router.delete("/content/{content_id}")
+async def delete_protected_content(content_id: int, user_id: int):
+    """
+    Retire un contenu de la surveillance ; le fichier stocké est supprimé s'il n'est plus utilisé
+    """
+    from src.ai.protected_content import remove_protected_content
+    
+    removed = await asyncio.to_thread(run_with_session, remove_protected_content, content_id, user_id)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Contenu protégé non trouvé")
+    return {"status": "deleted", "content_id": content_id}
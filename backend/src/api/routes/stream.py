@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Header, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from contextlib import aclosing
+import json
+import os
+from datetime import timedelta
+from sqlalchemy import or_, select
+
+from src.alerts.pubsub import alert_broker, serialize_alert
+from src.models.database import AsyncSessionLocal, Alert
+
+router = APIRouter()
+
+# Intervalle des messages de maintien de connexion (proxies, répartiteurs de charge)
+HEARTBEAT_SECONDS = float(os.getenv("ALERT_STREAM_HEARTBEAT", "15"))
+
+# Nombre maximum d'alertes renvoyées lors d'une reconnexion
+REPLAY_LIMIT = int(os.getenv("ALERT_STREAM_REPLAY_LIMIT", "500"))
+
+# Fenêtre de relecture (secondes) avant la création de la dernière alerte reçue : les alertes
+# d'id inférieur validées après elle (lots concurrents, lot en échec réécrit) y sont retrouvées
+REPLAY_OVERLAP_SECONDS = float(os.getenv("ALERT_STREAM_REPLAY_OVERLAP", "300"))
+
+async def replay_alerts(user_id, after_id):
+    """
+    Alertes manquées depuis la dernière reçue par le client (reconnexion après coupure)
+
+    Les ids ne suivent pas l'ordre de validation : une alerte d'id inférieur à after_id peut
+    avoir été validée après que le client a reçu after_id. Sont donc renvoyées les alertes
+    d'id supérieur et celles créées dans la fenêtre REPLAY_OVERLAP_SECONDS qui précède
+    l'alerte after_id ; le client écarte celles qu'il a déjà (dédoublonnage sur l'id).
+
+    La session est ouverte le temps de la requête seulement : une dépendance get_db resterait
+    ouverte, et garderait une connexion du pool, pendant toute la durée du flux.
+    """
+    async with AsyncSessionLocal() as db:
+        watermark = await db.scalar(select(Alert.created_at).where(Alert.id == after_id))
+        condition = Alert.id > after_id
+        if watermark is not None:
+            condition = or_(condition, Alert.created_at >= watermark - timedelta(seconds=REPLAY_OVERLAP_SECONDS))
+        stmt = select(Alert).where(condition).order_by(Alert.created_at, Alert.id).limit(REPLAY_LIMIT)
+        if user_id is not None:
+            stmt = stmt.where(Alert.user_id == user_id)
+        alerts = (await db.execute(stmt)).scalars().all()
+    return [serialize_alert(alert) for alert in alerts]
+
+async def alert_events(user_id, last_event_id=None):
+    """
+    Flux des alertes d'un utilisateur : alertes manquées puis nouvelles alertes au fil de l'eau
+
+    Produit None à chaque intervalle de maintien de connexion sans nouvelle alerte.
+
+    Les écritures concurrentes (plusieurs sinks et workers) valident les alertes dans le
+    désordre des ids : une alerte d'id inférieur peut arriver après une alerte d'id supérieur.
+    Seules les alertes déjà envoyées par la relecture sont donc écartées du flux en direct.
+    """
+    # Abonnement avant la relecture, pour ne rien perdre entre les deux
+    subscription = alert_broker.subscribe(user_id)
+    try:
+        replayed_ids = set()
+        if last_event_id is not None:
+            for event in await replay_alerts(user_id, last_event_id):
+                replayed_ids.add(event["id"])
+                yield event
+
+        while True:
+            event = await subscription.get(timeout=HEARTBEAT_SECONDS)
+            if event is None:
+                yield None
+            elif event["id"] not in replayed_ids:
+                yield {key: value for key, value in event.items() if key != "user_id"}
+    finally:
+        subscription.close()
+
+@router.get("/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    user_id: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    Flux Server-Sent Events des nouvelles alertes (remplace l'interrogation périodique de /alerts)
+
+    Le navigateur renvoie automatiquement l'en-tête Last-Event-ID à la reconnexion :
+    les alertes créées pendant la coupure sont alors renvoyées en premier.
+    """
+    async def body():
+        async with aclosing(alert_events(user_id, last_event_id)) as events:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    yield ": ping\n\n"
+                else:
+                    yield f"id: {event['id']}\nevent: alert\ndata: {json.dumps(event)}\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type="text/event-stream", headers=headers)
+
+@router.websocket("/alerts/ws")
+async def alerts_websocket(
+    websocket: WebSocket,
+    user_id: Optional[int] = None,
+    last_event_id: Optional[int] = Query(None),
+):
+    """
+    Flux WebSocket des nouvelles alertes, pour les clients sans EventSource (application mobile)
+
+    Messages : {"type": "alert", "alert": {...}} ou {"type": "ping"}
+    """
+    await websocket.accept()
+    try:
+        async with aclosing(alert_events(user_id, last_event_id)) as events:
+            async for event in events:
+                if event is None:
+                    await websocket.send_json({"type": "ping"})
+                else:
+                    await websocket.send_json({"type": "alert", "alert": event})
+    except WebSocketDisconnect:
+        pass
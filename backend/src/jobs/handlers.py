@@ -0,0 +1,13 @@
+from src.legal.takedown import send_takedown, takedown_failed
+from src.storage.blobs import collect_unused_blobs
+
+# Exécuteurs des tâches par type : coroutine recevant le payload et retournant un résultat JSON
+JOB_HANDLERS = {
+    "takedown": send_takedown,
+    "collect_blobs": collect_unused_blobs,
+}
+
+# Appelés quand une tâche a épuisé ses tentatives (payload, message d'erreur)
+JOB_FAILURE_HANDLERS = {
+    "takedown": takedown_failed,
+}
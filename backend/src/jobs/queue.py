@@ -0,0 +1,129 @@
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from src.models.database import Job
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Délais entre les tentatives : croissance exponentielle plafonnée
+RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "900"))
+
+def retry_delay(attempts, base=None, cap=None):
+    """
+    Délai avant la prochaine tentative ("full jitter") : tirage uniforme entre 0 et
+    base * 2^(tentatives - 1), plafonné. L'aléa évite que des tâches échouées ensemble
+    (panne d'une plateforme) ne réessaient toutes au même instant.
+
+    Args:
+        attempts (int): Nombre de tentatives déjà effectuées
+
+    Returns:
+        float: Délai en secondes
+    """
+    base = RETRY_BASE_SECONDS if base is None else base
+    cap = RETRY_MAX_SECONDS if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** max(attempts - 1, 0)))
+
+def enqueue_job(db, kind, payload, max_attempts=None, commit=True):
+    """
+    Ajoute une tâche à la file
+
+    Args:
+        db: Session SQLAlchemy
+        kind (str): Type de tâche (clé de JOB_HANDLERS)
+        payload (dict): Paramètres sérialisables en JSON
+        max_attempts (int): Nombre maximum de tentatives (JOB_MAX_ATTEMPTS par défaut)
+        commit (bool): False pour laisser l'appelant valider la transaction (tâche créée
+            en même temps que les lignes qu'elle traite)
+
+    Returns:
+        Job: Tâche créée
+    """
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload),
+        status="pending",
+        max_attempts=max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "5")),
+    )
+    db.add(job)
+    if commit:
+        db.commit()
+        db.refresh(job)
+    else:
+        db.flush()
+    return job
+
+def enqueue_jobs(db, kind, payloads, max_attempts=None):
+    """
+    Ajoute plusieurs tâches d'un même type en un seul envoi ; la transaction est validée par l'appelant
+    """
+    max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    jobs = [Job(kind=kind, payload=json.dumps(payload), status="pending", max_attempts=max_attempts)
+            for payload in payloads]
+    db.add_all(jobs)
+    db.flush()
+    return jobs
+
+def dequeue_job(db, kinds=None):
+    """
+    Réserve la prochaine tâche exécutable (SKIP LOCKED : les workers ne se bloquent pas entre eux)
+
+    Returns:
+        Job ou None: Tâche passée à "running", détachée de la session
+    """
+    query = db.query(Job).filter(Job.status == "pending", Job.run_after <= datetime.utcnow())
+    if kinds:
+        query = query.filter(Job.kind.in_(kinds))
+    job = query.order_by(Job.run_after, Job.id).with_for_update(skip_locked=True).first()
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = "running"
+    job.attempts += 1
+    db.commit()
+
+    db.refresh(job)
+    db.expunge(job)
+    return job
+
+def complete_job(db, job_id, result):
+    job = db.get(Job, job_id)
+    job.status = "done"
+    job.result = json.dumps(result) if result is not None else None
+    job.error = None
+    db.commit()
+
+def fail_job(db, job_id, error, retry=True):
+    """
+    Enregistre l'échec d'une tentative : la tâche repasse en file après un délai aléatoire
+    tant qu'il reste des tentatives, sinon elle est marquée "failed"
+
+    Returns:
+        bool: True si une nouvelle tentative est programmée
+    """
+    job = db.get(Job, job_id)
+    job.error = error
+    if retry and job.attempts < job.max_attempts:
+        job.status = "pending"
+        job.run_after = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+    else:
+        job.status = "failed"
+    db.commit()
+    return job.status == "pending"
+
+def requeue_stale_jobs(db, timeout_seconds):
+    """
+    Remet en file les tâches restées "running" (worker arrêté en cours d'exécution)
+    """
+    deadline = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    count = db.query(Job) \
+        .filter(Job.status == "running", Job.updated_at < deadline) \
+        .update({Job.status: "pending"}, synchronize_session=False)
+    db.commit()
+    return count
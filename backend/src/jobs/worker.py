@@ -0,0 +1,130 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+from dotenv import load_dotenv
+
+from src.jobs.handlers import JOB_HANDLERS, JOB_FAILURE_HANDLERS
+from src.jobs.queue import dequeue_job, complete_job, fail_job, requeue_stale_jobs
+from src.models.database import run_with_session
+
+# Charger les variables d'environnement
+load_dotenv()
+
+class JobWorker:
+    """
+    Boucle d'exécution des tâches de fond : dépile les tâches de la table jobs et les exécute,
+    au plus `concurrency` à la fois. Plusieurs processus peuvent tourner en parallèle (SKIP LOCKED).
+    """
+
+    def __init__(self, kinds=None, concurrency=None, poll_interval=None, stale_timeout=None):
+        self.kinds = kinds or list(JOB_HANDLERS)
+        self.concurrency = concurrency or int(os.getenv("JOB_WORKER_CONCURRENCY", "8"))
+        self.poll_interval = poll_interval or float(os.getenv("JOB_POLL_INTERVAL", "1"))
+        self.stale_timeout = stale_timeout or int(os.getenv("JOB_STALE_TIMEOUT", "900"))
+        self._semaphore = None
+        self._tasks = set()
+        self._stopping = False
+
+    async def run_job(self, job):
+        payload = json.loads(job.payload)
+        try:
+            result = await JOB_HANDLERS[job.kind](payload)
+            await asyncio.to_thread(run_with_session, complete_job, job.id, result)
+        except Exception as e:
+            print(f"Erreur lors de la tâche {job.id} ({job.kind}, tentative {job.attempts}): {str(e)}")
+            retrying = await asyncio.to_thread(run_with_session, fail_job, job.id, str(e))
+            failure_handler = JOB_FAILURE_HANDLERS.get(job.kind)
+            if not retrying and failure_handler is not None:
+                await failure_handler(payload, str(e))
+        finally:
+            self._semaphore.release()
+
+    async def run_forever(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        count = await asyncio.to_thread(run_with_session, requeue_stale_jobs, self.stale_timeout)
+        if count:
+            print(f"{count} tâche(s) interrompue(s) remise(s) en file")
+
+        while not self._stopping:
+            await self._semaphore.acquire()
+            try:
+                job = await asyncio.to_thread(run_with_session, dequeue_job, self.kinds)
+            except Exception as e:
+                print(f"Erreur lors de la lecture de la file des tâches: {str(e)}")
+                job = None
+            if job is None:
+                self._semaphore.release()
+                await asyncio.sleep(self.poll_interval)
+                continue
+            task = asyncio.create_task(self.run_job(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        # Les tâches en cours se terminent avant l'arrêt du processus
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self):
+        self._stopping = True
+
+async def run_worker():
+    """
+    Processus worker : tâches de fond et planificateur des analyses
+    """
+    from src.ai.index_sync import index_sync
+    from src.alerts.bloom import seen_urls
+    from src.alerts.pubsub import alert_broker
+    from src.models.database import async_engine
+    from src.scheduler.scans import ScanScheduler
+    from src.scraping.client import close_client
+
+    # Les analyses comparent les images scrapées aux index des contenus protégés : chargés
+    # avant le lancement du planificateur, puis tenus à jour des ajouts et suppressions de l'API
+    await index_sync.start(wait=True)
+
+    worker = JobWorker()
+    scheduler = ScanScheduler()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: (worker.stop(), scheduler.stop()))
+
+    scans = asyncio.create_task(scheduler.run_forever())
+    try:
+        await worker.run_forever()
+    finally:
+        # Les analyses déjà lancées se terminent ; la boucle de planification est interrompue
+        scans.cancel()
+        await asyncio.gather(scans, *scheduler._tasks, return_exceptions=True)
+        await alert_broker.stop()
+        await index_sync.stop()
+        await asyncio.to_thread(seen_urls.save)
+        await close_client()
+        await async_engine.dispose()
+
+def _process_main():
+    asyncio.run(run_worker())
+
+def main():
+    """
+    Lance JOB_WORKER_PROCESSES processus workers (python -m src.jobs.worker)
+    """
+    count = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+    if count <= 1:
+        _process_main()
+        return
+
+    processes = [multiprocessing.Process(target=_process_main, name=f"shadow-worker-{i}") for i in range(count)]
+    for process in processes:
+        process.start()
+
+    # SIGTERM (docker stop) est transmis aux processus enfants, qui s'arrêtent proprement ;
+    # SIGINT (Ctrl-C) est déjà reçu par tout le groupe de processus
+    signal.signal(signal.SIGTERM, lambda signum, frame: [process.terminate() for process in processes])
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from sqlalchemy import insert
+
+from src.jobs.queue import enqueue_jobs
+from src.legal.dmca import generate_grouped_dmca
+from src.legal.templating import format_date
+from src.models.database import Alert, DMCARequest, DMCARequestAlert
+from src.scraping.urls import HOST_ALIASES
+
+# Charger les variables d'environnement
+load_dotenv()
+
+def get_max_urls_per_notice():
+    """
+    Nombre maximum d'URLs par lettre (limite des services abuse des hébergeurs)
+    """
+    return int(os.getenv("DMCA_MAX_URLS_PER_NOTICE", "50"))
+
+def hosting_domain(url):
+    """
+    Domaine de l'hébergeur d'une URL (sans www, alias ramenés au domaine principal)
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return HOST_ALIASES.get(host, host)
+
+def group_alerts(alerts, group_by="domain", max_urls=None):
+    """
+    Regroupe des alertes par utilisateur et par hébergeur, en lots d'au plus max_urls URLs distinctes
+
+    Args:
+        alerts (list): Alertes à regrouper (dans l'ordre voulu à l'intérieur des lettres)
+        group_by (str): "domain" (domaine de l'URL) ou "platform" (colonne Alert.platform)
+        max_urls (int): Nombre maximum d'URLs par lettre
+
+    Returns:
+        list: Tuples (user_id, destinataire, alertes, urls)
+    """
+    max_urls = max_urls or get_max_urls_per_notice()
+    groups = {}
+    for alert in alerts:
+        target = hosting_domain(alert.url) if group_by == "domain" else alert.platform
+        chunks, url_chunk = groups.setdefault((alert.user_id, target), ([], {}))
+        # Une même URL peut porter plusieurs alertes (contenus protégés différents) : elle n'est listée qu'une fois
+        if alert.url not in url_chunk:
+            if not chunks or len(chunks[-1][1]) >= max_urls:
+                chunks.append(([], []))
+            url_chunk[alert.url] = chunks[-1]
+            chunks[-1][1].append(alert.url)
+        url_chunk[alert.url][0].append(alert)
+
+    return [
+        (user_id, target, chunk_alerts, chunk_urls)
+        for (user_id, target), (chunks, _) in groups.items()
+        for chunk_alerts, chunk_urls in chunks
+    ]
+
+def create_grouped_requests(db, reason, contact=None, user_id=None, group_by="domain", max_urls=None, locale=None,
+                            limit=None):
+    """
+    Crée une demande de retrait consolidée par hébergeur pour les alertes en attente ("new")
+
+    Chaque demande liste toutes les URLs de ses alertes ; le lien demande → alertes est
+    enregistré dans dmca_request_alerts, les alertes passent en "processing" et une tâche
+    "takedown" par demande se charge de l'envoi. Les alertes sont verrouillées (SKIP LOCKED) :
+    deux regroupements simultanés ne couvrent jamais la même alerte. Au plus `limit` alertes
+    (DMCA_GROUP_BATCH_SIZE) sont traitées par appel.
+
+    Returns:
+        list: Demandes créées {"request_id", "user_id", "platform", "url_count", "alert_ids"}
+    """
+    query = db.query(Alert).filter(Alert.status == "new")
+    if user_id is not None:
+        query = query.filter(Alert.user_id == user_id)
+    alerts = query.order_by(Alert.user_id, Alert.created_at, Alert.id) \
+        .limit(limit or int(os.getenv("DMCA_GROUP_BATCH_SIZE", "5000"))) \
+        .with_for_update(skip_locked=True) \
+        .all()
+    if not alerts:
+        db.rollback()
+        return []
+
+    contact = contact or os.getenv("DMCA_CONTACT", "")
+    date = format_date(locale=locale)
+    created = []
+    for owner_id, target, chunk_alerts, urls in group_alerts(alerts, group_by, max_urls):
+        request = DMCARequest(
+            alert_id=chunk_alerts[0].id if len(chunk_alerts) == 1 else None,
+            platform=target,
+            url=urls[0] if len(urls) == 1 else None,
+            url_count=len(urls),
+            status="pending",
+            dmca_text=generate_grouped_dmca(target, urls, reason, contact, locale=locale, date=date),
+        )
+        db.add(request)
+        created.append((owner_id, request, chunk_alerts))
+    db.flush()
+
+    db.execute(insert(DMCARequestAlert), [
+        {"dmca_request_id": request.id, "alert_id": alert.id}
+        for _, request, chunk_alerts in created
+        for alert in chunk_alerts
+    ])
+    for alert in alerts:
+        alert.status = "processing"
+    enqueue_jobs(db, "takedown", [
+        {"dmca_request_id": request.id, "reason": reason, "contact": contact}
+        for _, request, _ in created
+    ])
+
+    # Résumé construit avant le commit, qui expire les objets de la session
+    summary = [
+        {
+            "request_id": request.id,
+            "user_id": owner_id,
+            "platform": request.platform,
+            "url_count": request.url_count,
+            "alert_ids": [alert.id for alert in chunk_alerts],
+        }
+        for owner_id, request, chunk_alerts in created
+    ]
+    db.commit()
+    return summary
@@ -1,85 +1,169 @@
-def generate_dmca(domain, reason, contact):
+import io
+import json
+import re
+import zipfile
+
+from src.legal.templating import get_template, get_locale_strings, format_date
+
+def generate_dmca(domain, reason, contact, locale=None, date=None):
     """
     Génère une lettre DMCA pour demander la suppression de contenu
-    
+
     Args:
         domain (str): Nom de domaine ou plateforme concernée
         reason (str): Motif de la demande DMCA
         contact (str): Informations de contact du demandeur
-        
+        locale (str): Langue de la lettre ("fr", "en" ; NOTICE_LOCALE par défaut)
+        date (str): Date déjà formatée (génération par lots), sinon la date du jour
+
     Returns:
         str: Texte formaté de la demande DMCA
     """
-    
-    current_date = "16 mai 2025"  # À remplacer par la date actuelle du système dans une version réelle
-    
-    dmca_template = f"""
-    À l'attention de : Hébergeur/Propriétaire de {domain}
-    Objet : Notification de retrait DMCA
-    Date : {current_date}
-    
-    Bonjour,
-    
-    Je vous contacte conformément au Digital Millennium Copyright Act (DMCA).
-    
-    J'ai constaté que du contenu protégé par des droits d'auteur/droits à l'image est publié sur votre site sans mon autorisation.
-    
-    Motif de la demande : {reason}
-    
-    Je déclare sous peine de parjure que :
-    
-    1. Je suis le propriétaire exclusif des droits, ou autorisé à agir au nom du propriétaire des droits.
-    2. Le contenu mentionné ci-dessus n'est pas autorisé par le titulaire des droits, son agent ou la loi.
-    
-    Je vous demande donc de retirer immédiatement ce contenu de votre site, conformément à la section 512(c) du DMCA.
-    
-    Mes coordonnées :
-    {contact}
-    
-    Je vous remercie de votre coopération.
-    
-    Cordialement,
-    Shadow (pour le compte de l'utilisateur)
+    return get_template("dmca", locale).render({
+        "domain": domain,
+        "reason": reason,
+        "contact": contact,
+        "date": date or format_date(locale=locale),
+    })
+
+def generate_grouped_dmca(domain, urls, reason, contact, locale=None, date=None):
     """
-    
-    return dmca_template.strip()
+    Génère une lettre DMCA unique listant tous les contenus à retirer chez un même hébergeur
 
-def generate_gdpr_request(platform, personal_data_types, user_details):
+    Args:
+        domain (str): Domaine ou plateforme de l'hébergeur
+        urls (list): URLs des contenus concernés
+        reason (str): Motif de la demande DMCA
+        contact (str): Informations de contact du demandeur
+        locale (str): Langue de la lettre ("fr", "en" ; NOTICE_LOCALE par défaut)
+        date (str): Date déjà formatée, sinon la date du jour
+
+    Returns:
+        str: Texte formaté de la demande DMCA
+    """
+    return get_template("dmca_grouped", locale).render({
+        "domain": domain,
+        "urls": "\n".join(f"{i}. {url}" for i, url in enumerate(urls, start=1)),
+        "url_count": len(urls),
+        "reason": reason,
+        "contact": contact,
+        "date": date or format_date(locale=locale),
+    })
+
+def generate_gdpr_request(platform, personal_data_types, user_details, locale=None):
     """
     Génère une demande de suppression basée sur le RGPD (Europe)
-    
+
     Args:
         platform (str): Nom de la plateforme
         personal_data_types (list): Types de données personnelles concernées
         user_details (dict): Détails de l'utilisateur faisant la demande
-        
+        locale (str): Langue de la demande ("fr", "en" ; NOTICE_LOCALE par défaut)
+
     Returns:
         str: Texte formaté de la demande RGPD
     """
-    data_types_text = ", ".join(personal_data_types)
-    
-    gdpr_template = f"""
-    À l'attention du Délégué à la Protection des Données de {platform}
-    Objet : Demande de suppression de données personnelles (RGPD)
-    
-    Bonjour,
-    
-    Conformément à l'article 17 du Règlement Général sur la Protection des Données (RGPD), je souhaite exercer mon droit à l'effacement.
-    
-    Je demande la suppression complète des données personnelles suivantes me concernant :
-    {data_types_text}
-    
-    Informations me concernant :
-    Nom : {user_details.get('name', 'Non fourni')}
-    Email : {user_details.get('email', 'Non fourni')}
-    Identifiant utilisateur : {user_details.get('user_id', 'Non fourni')}
-    
-    Conformément au RGPD, vous disposez d'un délai d'un mois pour répondre à cette demande.
-    
-    Je vous remercie de votre attention.
-    
-    Cordialement,
-    {user_details.get('name', 'L\'utilisateur')}
+    strings = get_locale_strings(locale)
+    return get_template("gdpr", locale).render({
+        "platform": platform,
+        "data_types": ", ".join(personal_data_types),
+        "name": user_details.get("name", strings["not_provided"]),
+        "email": user_details.get("email", strings["not_provided"]),
+        "user_id": user_details.get("user_id", strings["not_provided"]),
+        "signature": user_details.get("name", strings["the_user"]),
+    })
+
+def _slug(value):
+    return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-")[:60] or "notice"
+
+def generate_batch(requests, locale=None):
+    """
+    Génère une série de documents (après une fuite : un document par URL concernée)
+
+    La date est formatée une fois par langue pour tout le lot. Les documents sont produits
+    au fil de l'eau (générateur), ce qui permet de les diffuser sans tout garder en mémoire.
+
+    Args:
+        requests (iterable): Dicts {"type": "dmca", "domain", "reason", "contact"} ou
+            {"type": "gdpr", "platform", "personal_data_types", "user_details"}, avec en option
+            "id" (repris dans le résultat) et "locale"
+        locale (str): Langue par défaut du lot
+
+    Yields:
+        dict: {"id", "type", "locale", "filename", "text"} ou {"id", "type", "error"} si la demande est invalide
+    """
+    dates = {}
+    for index, request in enumerate(requests, start=1):
+        kind = request.get("type", "dmca")
+        request_locale = request.get("locale") or locale
+        request_id = request.get("id", index)
+        try:
+            if kind == "dmca":
+                if request_locale not in dates:
+                    dates[request_locale] = format_date(locale=request_locale)
+                text = generate_dmca(request["domain"], request["reason"], request["contact"],
+                                     locale=request_locale, date=dates[request_locale])
+                target = request["domain"]
+            elif kind == "gdpr":
+                text = generate_gdpr_request(request["platform"], request["personal_data_types"],
+                                             request.get("user_details") or {}, locale=request_locale)
+                target = request["platform"]
+            else:
+                raise ValueError(f"Type de document inconnu: {kind}")
+        except (KeyError, TypeError, ValueError) as e:
+            yield {"id": request_id, "type": kind, "error": str(e)}
+            continue
+
+        yield {
+            "id": request_id,
+            "type": kind,
+            "locale": request_locale,
+            "filename": f"{index:05d}-{kind}-{_slug(target)}.txt",
+            "text": text,
+        }
+
+def stream_ndjson(notices):
+    """
+    Documents au format NDJSON (un objet JSON par ligne), par morceaux d'octets
+    """
+    for notice in notices:
+        yield (json.dumps(notice, ensure_ascii=False) + "\n").encode("utf-8")
+
+class _ChunkWriter(io.RawIOBase):
+    """
+    Flux d'écriture non positionnable : zipfile y écrit, le générateur récupère les octets produits
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_zip(notices):
+    """
+    Archive ZIP des documents (un fichier .txt par document), produite par morceaux d'octets
+
+    Les demandes invalides sont listées dans errors.ndjson à la fin de l'archive.
     """
-    
-    return gdpr_template.strip()
+    writer = _ChunkWriter()
+    errors = []
+    with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for notice in notices:
+            if "error" in notice:
+                errors.append(notice)
+                continue
+            archive.writestr(notice["filename"], notice["text"])
+            yield writer.drain()
+        if errors:
+            archive.writestr("errors.ndjson", "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in errors))
+    yield writer.drain()
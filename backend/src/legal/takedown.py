@@ -0,0 +1,93 @@
+import asyncio
+import os
+import re
+from dotenv import load_dotenv
+
+from src.jobs.queue import enqueue_job
+from src.models.database import DMCARequest, DMCARequestAlert, run_with_session
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Plateformes acceptant une demande de suppression
+TAKEDOWN_PLATFORMS = {
+    "twitter": "Twitter API",
+    "facebook": "Facebook API",
+    "instagram": "Instagram API",
+    "youtube": "YouTube API"
+}
+
+def create_takedown_request(db, platform, url, reason, contact=None, alert_id=None):
+    """
+    Enregistre une demande de suppression "pending" et la tâche qui l'enverra, dans la même transaction
+
+    Returns:
+        DMCARequest: Demande créée (son id sert à suivre le statut)
+    """
+    request = DMCARequest(alert_id=alert_id, platform=platform, url=url, status="pending")
+    db.add(request)
+    db.flush()
+    if alert_id is not None:
+        db.add(DMCARequestAlert(dmca_request_id=request.id, alert_id=alert_id))
+
+    enqueue_job(db, "takedown", {
+        "dmca_request_id": request.id,
+        "reason": reason,
+        "contact": contact or os.getenv("DMCA_CONTACT", ""),
+    }, commit=False)
+    db.commit()
+    db.refresh(request)
+    return request
+
+def _get_request(db, request_id):
+    request = db.get(DMCARequest, request_id)
+    db.expunge(request)
+    return request
+
+def _update_request(db, request_id, **values):
+    request = db.get(DMCARequest, request_id)
+    for key, value in values.items():
+        setattr(request, key, value)
+    db.commit()
+
+async def send_takedown(payload):
+    """
+    Tâche "takedown" : génère la lettre DMCA puis l'envoie à la plateforme
+
+    L'envoi se fait vers TAKEDOWN_<PLATEFORME>_URL (ex: TAKEDOWN_TWITTER_URL, TAKEDOWN_FORUM_XYZ_URL
+    pour une demande groupée adressée au domaine forum.xyz) si ce point d'entrée est configuré ; sinon
+    la lettre est seulement générée (statut "generated") pour un envoi manuel. Une erreur HTTP
+    fait échouer la tentative, qui sera reprise par le worker.
+    """
+    from src.api.cache import response_cache, dmca_tags
+    from src.legal.dmca import generate_dmca
+    from src.scraping.client import get_client
+
+    request_id = payload["dmca_request_id"]
+    request = await asyncio.to_thread(run_with_session, _get_request, request_id)
+    dmca_text = request.dmca_text or generate_dmca(request.platform, payload["reason"], payload["contact"])
+
+    endpoint = os.getenv(f"TAKEDOWN_{re.sub(r'[^A-Z0-9]+', '_', request.platform.upper())}_URL")
+    if endpoint:
+        r = await get_client().post(endpoint, json={"url": request.url, "notice": dmca_text})
+        r.raise_for_status()
+        status, response = "sent", r.text[:10000]
+    else:
+        status, response = "generated", None
+
+    await asyncio.to_thread(
+        run_with_session, _update_request, request_id, status=status, dmca_text=dmca_text, response=response
+    )
+    await response_cache.invalidate(dmca_tags([request_id]))
+    return {"dmca_request_id": request_id, "status": status}
+
+async def takedown_failed(payload, error):
+    """
+    Dernière tentative échouée : la demande passe en "failed"
+    """
+    from src.api.cache import response_cache, dmca_tags
+
+    await asyncio.to_thread(
+        run_with_session, _update_request, payload["dmca_request_id"], status="failed", response=error
+    )
+    await response_cache.invalidate(dmca_tags([payload["dmca_request_id"]]))
@@ -0,0 +1,133 @@
+import os
+import threading
+from datetime import date
+from string import Template
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Dossier des modèles : templates/<langue>/<type>.txt (syntaxe $variable de string.Template)
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# Textes propres à chaque langue utilisés en dehors des modèles
+LOCALE_STRINGS = {
+    "fr": {
+        "months": ["janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+                   "août", "septembre", "octobre", "novembre", "décembre"],
+        "date_format": "{day} {month} {year}",
+        "not_provided": "Non fourni",
+        "the_user": "L'utilisateur",
+    },
+    "en": {
+        "months": ["January", "February", "March", "April", "May", "June", "July",
+                   "August", "September", "October", "November", "December"],
+        "date_format": "{month} {day}, {year}",
+        "not_provided": "Not provided",
+        "the_user": "The user",
+    },
+}
+
+class CompiledTemplate:
+    """
+    Modèle découpé une fois pour toutes en morceaux de texte fixes et en variables :
+    le rendu n'est plus qu'un join, sans nouvelle analyse du modèle à chaque appel.
+    """
+
+    def __init__(self, source, name=""):
+        self.name = name
+        self.parts = []
+        self.fields = set()
+        position = 0
+        for match in Template.pattern.finditer(source):
+            literal = source[position:match.start()]
+            if match.group("escaped") is not None:
+                literal += "$"
+            elif match.group("invalid") is not None:
+                raise ValueError(f"Variable invalide dans le modèle {name} (position {match.start()})")
+            if literal:
+                self._add_literal(literal)
+            field = match.group("named") or match.group("braced")
+            if field:
+                self.parts.append((field,))
+                self.fields.add(field)
+            position = match.end()
+        if source[position:]:
+            self._add_literal(source[position:])
+
+    def _add_literal(self, text):
+        if self.parts and isinstance(self.parts[-1], str):
+            self.parts[-1] += text
+        else:
+            self.parts.append(text)
+
+    def render(self, values):
+        """
+        Rendu du modèle
+
+        Args:
+            values (dict): Valeur de chaque variable du modèle
+
+        Returns:
+            str: Texte rendu
+        """
+        try:
+            return "".join(part if isinstance(part, str) else str(values[part[0]]) for part in self.parts)
+        except KeyError as e:
+            raise KeyError(f"Variable {e} manquante pour le modèle {self.name}")
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def get_default_locale():
+    return os.getenv("NOTICE_LOCALE", "fr")
+
+def load_templates(directory=None):
+    """
+    Charge et compile tous les modèles (appelé au démarrage de l'API ; sinon au premier rendu)
+
+    Returns:
+        int: Nombre de modèles chargés
+    """
+    directory = directory or TEMPLATES_DIR
+    loaded = {}
+    for locale in sorted(os.listdir(directory)):
+        locale_dir = os.path.join(directory, locale)
+        if not os.path.isdir(locale_dir):
+            continue
+        for filename in sorted(os.listdir(locale_dir)):
+            kind, extension = os.path.splitext(filename)
+            if extension != ".txt":
+                continue
+            with open(os.path.join(locale_dir, filename), encoding="utf-8") as f:
+                loaded[(locale, kind)] = CompiledTemplate(f.read().strip(), name=f"{locale}/{filename}")
+
+    with _templates_lock:
+        _templates.clear()
+        _templates.update(loaded)
+    return len(loaded)
+
+def get_template(kind, locale=None):
+    """
+    Modèle compilé d'un type de document ("dmca", "gdpr") dans une langue
+
+    Une langue inconnue retombe sur la langue par défaut (NOTICE_LOCALE).
+    """
+    if not _templates:
+        load_templates()
+    locale = locale or get_default_locale()
+    template = _templates.get((locale, kind)) or _templates.get((get_default_locale(), kind))
+    if template is None:
+        raise ValueError(f"Aucun modèle '{kind}' pour la langue {locale}")
+    return template
+
+def get_locale_strings(locale=None):
+    return LOCALE_STRINGS.get(locale or get_default_locale(), LOCALE_STRINGS["fr"])
+
+def format_date(value=None, locale=None):
+    """
+    Date en toutes lettres dans la langue du document (ex: "16 mai 2025")
+    """
+    value = value or date.today()
+    strings = get_locale_strings(locale)
+    return strings["date_format"].format(day=value.day, month=strings["months"][value.month - 1], year=value.year)
@@ -0,0 +1,123 @@
+import asyncio
+import inspect
+import time
+
+# Marqueur de fin de flux transmis d'étape en étape
+_DONE = object()
+
+class Stage:
+    """
+    Étape d'un pipeline
+
+    Args:
+        name (str): Nom de l'étape (statistiques, configuration)
+        fn (callable): Fonction (synchrone ou coroutine) appliquée à chaque élément. Elle retourne
+            l'élément transformé, None pour l'écarter, ou une liste pour en émettre plusieurs.
+        concurrency (int): Nombre de workers de l'étape
+        blocking (bool): Fonction synchrone coûteuse en CPU/IO bloquant, exécutée dans le pool de threads
+        fatal (tuple): Exceptions qui interrompent tout le pipeline au lieu d'écarter l'élément
+    """
+
+    def __init__(self, name, fn, concurrency=1, blocking=False, fatal=()):
+        self.name = name
+        self.fn = fn
+        self.concurrency = max(1, concurrency)
+        self.blocking = blocking
+        self.fatal = fatal
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    async def apply(self, item):
+        if inspect.iscoroutinefunction(self.fn):
+            return await self.fn(item)
+        if self.blocking:
+            return await asyncio.get_running_loop().run_in_executor(None, self.fn, item)
+        return self.fn(item)
+
+    def stats(self):
+        return {
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+class Pipeline:
+    """
+    Pipeline d'étapes reliées par des files bornées
+
+    Chaque étape a ses propres workers : le réseau, le CPU et la base travaillent en même temps.
+    Une file pleine bloque l'étape précédente (backpressure), ce qui borne la mémoire utilisée.
+    """
+
+    def __init__(self, stages, queue_size=100):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    async def _feed(self, source, queue):
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await queue.put(item)
+        else:
+            for item in source:
+                await queue.put(item)
+        await queue.put(_DONE)
+
+    async def _worker(self, stage, inbox, outbox):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                # Le marqueur est remis en file pour les autres workers de l'étape
+                await inbox.put(_DONE)
+                return
+            started = time.perf_counter()
+            try:
+                result = await stage.apply(item)
+            except Exception as e:
+                stage.errors += 1
+                if isinstance(e, stage.fatal):
+                    raise
+                print(f"Erreur dans l'étape {stage.name}: {str(e)}")
+                continue
+            finally:
+                stage.processed += 1
+                stage.busy_seconds += time.perf_counter() - started
+
+            if result is None:
+                continue
+            for output in (result if isinstance(result, list) else [result]):
+                stage.emitted += 1
+                if outbox is not None:
+                    await outbox.put(output)
+
+    async def _run_stage(self, stage, inbox, outbox):
+        await asyncio.gather(*(self._worker(stage, inbox, outbox) for _ in range(stage.concurrency)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    async def run(self, source):
+        """
+        Fait passer tous les éléments de la source dans le pipeline
+
+        Args:
+            source: Itérable synchrone ou asynchrone des éléments d'entrée
+
+        Returns:
+            dict: Statistiques par étape
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(self.stages) else None
+            tasks.append(asyncio.create_task(self._run_stage(stage, queues[i], outbox)))
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        return {stage.name: stage.stats() for stage in self.stages}
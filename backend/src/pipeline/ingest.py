@@ -0,0 +1,169 @@
+import asyncio
+import os
+import httpx
+from dotenv import load_dotenv
+
+from src.alerts.bloom import seen_urls
+from src.pipeline.engine import Pipeline, Stage
+from src.scraping.client import get_client, RateLimitError
+from src.scraping.keywords import get_matcher
+from src.scraping.twitter import fetch_new_tweets
+from src.scraping.urls import canonicalize_url
+
+# Charger les variables d'environnement
+load_dotenv()
+
+def get_stage_concurrency(stage, default):
+    """
+    Nombre de workers d'une étape, configurable par PIPELINE_<ETAPE>_CONCURRENCY
+    """
+    return int(os.getenv(f"PIPELINE_{stage.upper()}_CONCURRENCY", str(default)))
+
+def normalize_tweet(tweet):
+    """
+    Convertit un tweet brut en élément du pipeline
+    """
+    author = tweet.get("user", {}).get("screen_name", "i")
+    media = tweet.get("extended_entities", tweet.get("entities", {})).get("media", [])
+    return {
+        "platform": "twitter",
+        "url": canonicalize_url(f"https://twitter.com/{author}/status/{tweet['id_str']}"),
+        "text": tweet.get("full_text") or tweet.get("text", ""),
+        "image_urls": [m["media_url_https"] for m in media if m.get("type") == "photo" and m.get("media_url_https")],
+        "keywords": [],
+        "image_matches": [],
+    }
+
+async def download_image(url):
+    """
+    Télécharge une image via le client HTTP partagé
+
+    Returns:
+        bytes ou None en cas d'erreur
+    """
+    try:
+        r = await get_client().get(url)
+        r.raise_for_status()
+        return r.content
+    except httpx.HTTPError as e:
+        print(f"Erreur lors du téléchargement de l'image {url}: {str(e)}")
+        return None
+
+def screen_hashes(item, user_id):
+    """
+    Filtre rapide par hash perceptuel ; les images sans correspondance passent à l'étape faciale
+    """
+    from src.ai.image_hash import screen_image
+
+    unmatched = []
+    for url, data in zip(item["image_urls"], item.pop("images")):
+        if data is None:
+            continue
+        matches = [m for m in screen_image(data) if m["user_id"] == user_id]
+        if matches:
+            item["image_matches"].append({"url": url, "content_id": matches[0]["content_id"], "method": "hash"})
+        else:
+            unmatched.append((url, data))
+    item["unmatched_images"] = unmatched
+    return item
+
+def match_image_faces(item, user_id):
+    """
+    Reconnaissance faciale sur les images que le hash perceptuel n'a pas reconnues
+    """
+    from src.ai.face_index import match_faces
+    from src.ai.face_scan import compute_face_embeddings
+
+    for url, data in item.pop("unmatched_images"):
+        faces = compute_face_embeddings(data)
+        if not faces:
+            continue
+        for candidates in match_faces([embedding for _, embedding in faces], k=20):
+            candidates = [c for c in candidates if c["user_id"] == user_id]
+            if candidates:
+                item["image_matches"].append({"url": url, "content_id": candidates[0]["content_id"], "method": "face"})
+                break
+    return item
+
+def build_alert(item, user_id):
+    """
+    Construit l'alerte correspondant à un élément, ou None s'il ne contient rien de sensible
+    """
+    if not item["keywords"] and not item["image_matches"]:
+        return None
+
+    platform = item["platform"].capitalize()
+    if item["image_matches"]:
+        message = f"Votre photo a été détectée sur {platform}"
+        severity = 3
+    else:
+        message = f"Mention de {', '.join(item['keywords'])} détectée sur {platform}"
+        severity = 2
+
+    return {
+        "user_id": user_id,
+        "content_id": item["image_matches"][0]["content_id"] if item["image_matches"] else None,
+        "platform": item["platform"],
+        "url": item["url"],
+        "message": message,
+        "severity": severity,
+        "status": "new",
+    }
+
+def build_twitter_pipeline(user_id, keywords, cursors, sink):
+    """
+    Construit le pipeline d'ingestion Twitter :
+    fetch → normalise → dédoublonnage → mots-clés → téléchargement → hash d'image → visage → alertes
+
+    Args:
+        user_id (int): Utilisateur surveillé
+        keywords (list): Mots-clés surveillés
+        cursors (dict): Points de reprise par requête (avancés sur place)
+        sink (AlertSink): Tampon d'écriture des alertes (voir alerts.sink)
+
+    Returns:
+        Pipeline: Pipeline dont la source est la liste des requêtes de recherche
+    """
+    matcher = get_matcher(keywords, user_id=user_id)
+    batch_urls = set()
+
+    async def fetch(query):
+        return await fetch_new_tweets(query, cursors.setdefault(query, {}))
+
+    async def dedupe(item):
+        # URLs déjà vues dans ce scan, puis URLs déjà signalées (filtre de Bloom de l'utilisateur)
+        if item["url"] in batch_urls:
+            return None
+        batch_urls.add(item["url"])
+        if item["url"] in await seen_urls.aget(user_id):
+            return None
+        return item
+
+    def match_keywords(item):
+        item["keywords"] = matcher.matched_keywords(item["text"])
+        return item
+
+    async def fetch_images(item):
+        item["images"] = await asyncio.gather(*(download_image(url) for url in item["image_urls"]))
+        return item
+
+    async def persist(item):
+        alert = build_alert(item, user_id)
+        if alert is None:
+            return None
+        await sink.add(alert)
+        return alert
+
+    stages = [
+        Stage("fetch", fetch, concurrency=get_stage_concurrency("fetch", 8), fatal=(RateLimitError,)),
+        Stage("normalise", normalize_tweet),
+        Stage("dedupe", dedupe),
+        Stage("keywords", match_keywords),
+        Stage("download", fetch_images, concurrency=get_stage_concurrency("download", 16)),
+        Stage("hashes", lambda item: screen_hashes(item, user_id), blocking=True,
+              concurrency=get_stage_concurrency("hashes", 2)),
+        Stage("faces", lambda item: match_image_faces(item, user_id), blocking=True,
+              concurrency=get_stage_concurrency("faces", os.cpu_count() or 1)),
+        Stage("persist", persist),
+    ]
+    return Pipeline(stages, queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", "100")))
@@ -0,0 +1,84 @@
+import os
+from datetime import datetime, timedelta
+
+from src.models.database import RateBudget
+
+# Fenêtres de limitation des API (requêtes autorisées, durée de la fenêtre en secondes)
+# - Twitter v1.1 search/tweets : 450 requêtes / 15 min (authentification applicative)
+# - Instagram / Facebook Graph API : 200 appels / heure
+PLATFORM_LIMITS = {
+    "twitter": (450, 15 * 60),
+    "instagram": (200, 60 * 60),
+    "facebook": (200, 60 * 60),
+    "forums": (60, 60),
+}
+
+def get_platform_limit(platform):
+    """
+    Limite (capacité, fenêtre) d'une plateforme, surchargeable par RATE_LIMIT_<PLATEFORME>=capacité/fenêtre
+    """
+    override = os.getenv(f"RATE_LIMIT_{platform.upper()}")
+    if override:
+        capacity, window = override.split("/")
+        return int(capacity), int(window)
+    return PLATFORM_LIMITS[platform]
+
+def _get_budget_for_update(db, platform):
+    # Verrou de ligne : un seul worker à la fois modifie le budget d'une plateforme
+    budget = db.query(RateBudget).filter(RateBudget.platform == platform).with_for_update().first()
+    if budget is None:
+        capacity, window = get_platform_limit(platform)
+        budget = RateBudget(
+            platform=platform,
+            tokens=float(capacity),
+            capacity=capacity,
+            window_seconds=window,
+            updated_at=datetime.utcnow(),
+        )
+        db.add(budget)
+        db.flush()
+    return budget
+
+def take_tokens(db, platform, cost=1):
+    """
+    Tente de consommer `cost` jetons du budget d'une plateforme (token bucket stocké en base)
+
+    Le verrou posé sur la ligne du budget est conservé jusqu'au commit de la transaction de l'appelant.
+
+    Returns:
+        float: 0 si les jetons ont été pris, sinon le nombre de secondes à attendre
+    """
+    now = datetime.utcnow()
+    budget = _get_budget_for_update(db, platform)
+
+    if budget.blocked_until and budget.blocked_until > now:
+        return (budget.blocked_until - now).total_seconds()
+
+    # Remplissage continu : capacity jetons par fenêtre
+    rate = budget.capacity / budget.window_seconds
+    elapsed = (now - budget.updated_at).total_seconds()
+    budget.tokens = min(float(budget.capacity), budget.tokens + elapsed * rate)
+    budget.updated_at = now
+    budget.blocked_until = None
+
+    # Une analyse plus coûteuse que la capacité passe dès que le seau est plein
+    cost = min(cost, budget.capacity)
+    if budget.tokens >= cost:
+        budget.tokens -= cost
+        return 0
+    return (cost - budget.tokens) / rate
+
+def block_platform(db, platform, reset_at=None):
+    """
+    Vide le budget après une réponse 429 et bloque la plateforme jusqu'à la fin de la fenêtre
+    """
+    budget = _get_budget_for_update(db, platform)
+    now = datetime.utcnow()
+    if reset_at:
+        blocked_until = datetime.utcfromtimestamp(reset_at)
+    else:
+        blocked_until = now + timedelta(seconds=budget.window_seconds)
+    budget.tokens = 0.0
+    budget.updated_at = blocked_until
+    budget.blocked_until = blocked_until
+    return blocked_until
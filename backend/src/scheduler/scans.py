@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import func
+
+from src.jobs.queue import retry_delay
+from src.models.database import ScanJob, run_with_session
+from src.scheduler.rate_limit import take_tokens, block_platform
+from src.scraping.client import RateLimitError
+
+# Charger les variables d'environnement
+load_dotenv()
+
+async def run_twitter_scan(job, params):
+    from src.alerts.sink import AlertSink
+    from src.pipeline.ingest import build_twitter_pipeline
+    from src.scraping.cursors import load_cursors, save_cursors
+
+    # Analyse incrémentale : seuls les tweets postérieurs au dernier point de reprise sont traités
+    queries = [f"from:{params['username']}"] + list(params.get("queries") or [])
+    cursors = await asyncio.to_thread(run_with_session, load_cursors, job.user_id, "twitter", queries)
+
+    async with AlertSink() as sink:
+        pipeline = build_twitter_pipeline(job.user_id, params.get("keywords") or [], cursors, sink)
+        stats = await pipeline.run(queries)
+
+    # Les points de reprise ne sont avancés qu'une fois les alertes enregistrées
+    await asyncio.to_thread(run_with_session, save_cursors, job.user_id, "twitter", cursors)
+    return {"alerts": sink.inserted, "duplicates": sink.duplicates, "stages": stats}
+
+# Exécuteurs des analyses par plateforme
+SCAN_RUNNERS = {
+    "twitter": run_twitter_scan,
+}
+
+def estimate_cost(platform, params):
+    """
+    Nombre de requêtes API qu'une analyse va consommer
+    """
+    return 1 + len(params.get("queries") or [])
+
+def enqueue_scan(db, user_id, platform, params, priority=0):
+    """
+    Ajoute une analyse à la file de l'utilisateur
+
+    Les analyses sont servies par priorité décroissante puis par rang dans la file de chaque
+    utilisateur : à priorité égale, la première analyse de chaque utilisateur passe avant la
+    seconde de quiconque.
+    """
+    last_seq = db.query(func.max(ScanJob.user_seq)) \
+        .filter(ScanJob.user_id == user_id, ScanJob.status == "pending") \
+        .scalar()
+
+    job = ScanJob(
+        user_id=user_id,
+        platform=platform,
+        params=json.dumps(params),
+        priority=priority,
+        user_seq=(last_seq or 0) + 1,
+        status="pending",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def dequeue_scan(db, platform):
+    """
+    Réserve la prochaine analyse exécutable d'une plateforme si le budget de requêtes le permet
+
+    Returns:
+        tuple: (ScanJob ou None, secondes à attendre avant de réessayer)
+    """
+    now = datetime.utcnow()
+    job = db.query(ScanJob) \
+        .filter(ScanJob.status == "pending", ScanJob.platform == platform, ScanJob.run_after <= now) \
+        .order_by(ScanJob.priority.desc(), ScanJob.user_seq, ScanJob.created_at) \
+        .with_for_update(skip_locked=True) \
+        .first()
+    if job is None:
+        db.rollback()
+        return None, None
+
+    wait = take_tokens(db, platform, estimate_cost(platform, json.loads(job.params)))
+    if wait > 0:
+        db.rollback()
+        return None, wait
+
+    job.status = "running"
+    job.attempts += 1
+    db.commit()
+
+    # L'analyse est utilisée après la fermeture de la session : on la détache une fois rechargée
+    db.refresh(job)
+    db.expunge(job)
+    return job, 0
+
+def requeue_stale_scans(db, timeout_seconds):
+    """
+    Remet en file les analyses restées "running" (worker arrêté en cours d'exécution)
+    """
+    deadline = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    count = db.query(ScanJob) \
+        .filter(ScanJob.status == "running", ScanJob.updated_at < deadline) \
+        .update({ScanJob.status: "pending"}, synchronize_session=False)
+    db.commit()
+    return count
+
+class ScanScheduler:
+    """
+    Boucle de planification des analyses : une tâche par plateforme dépile les analyses
+    tant que le budget de requêtes partagé (table rate_budgets) le permet.
+
+    Plusieurs workers peuvent tourner en parallèle : les analyses sont réservées avec
+    SKIP LOCKED et les budgets sont modifiés sous verrou de ligne.
+    """
+
+    def __init__(self, platforms=None, concurrency=None, poll_interval=None, stale_timeout=None):
+        self.platforms = platforms or list(SCAN_RUNNERS)
+        self.concurrency = concurrency or int(os.getenv("SCAN_SCHEDULER_CONCURRENCY", "4"))
+        self.poll_interval = poll_interval or float(os.getenv("SCAN_SCHEDULER_POLL_INTERVAL", "2"))
+        self.stale_timeout = stale_timeout or int(os.getenv("SCAN_STALE_TIMEOUT", "900"))
+        self.max_attempts = int(os.getenv("SCAN_MAX_ATTEMPTS", "3"))
+        self._semaphore = None
+        self._tasks = set()
+        self._stopping = False
+
+    async def run_job(self, job):
+        params = json.loads(job.params)
+        runner = SCAN_RUNNERS.get(job.platform)
+        try:
+            if runner is None:
+                raise ValueError(f"Aucun exécuteur pour la plateforme {job.platform}")
+            result = await runner(job, params)
+            await asyncio.to_thread(run_with_session, self._finish_job, job.id, "done", result, None)
+        except RateLimitError as e:
+            # Tout le budget est vidé pour tous les workers et l'analyse repasse en file
+            await asyncio.to_thread(run_with_session, self._rate_limited, job.id, job.platform, e.reset_at)
+        except Exception as e:
+            print(f"Erreur lors de l'analyse {job.id} ({job.platform}): {str(e)}")
+            await asyncio.to_thread(run_with_session, self._failed, job.id, str(e), self.max_attempts)
+        finally:
+            self._semaphore.release()
+
+    @staticmethod
+    def _finish_job(db, job_id, status, result, error):
+        job = db.get(ScanJob, job_id)
+        job.status = status
+        job.result = json.dumps(result) if result is not None else None
+        job.error = error
+        db.commit()
+
+    @staticmethod
+    def _failed(db, job_id, error, max_attempts):
+        # Nouvelle tentative après un délai aléatoire croissant, tant qu'il en reste
+        job = db.get(ScanJob, job_id)
+        job.error = error
+        if job.attempts < max_attempts:
+            job.status = "pending"
+            job.run_after = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+        else:
+            job.status = "failed"
+        db.commit()
+
+    @staticmethod
+    def _rate_limited(db, job_id, platform, reset_at):
+        blocked_until = block_platform(db, platform, reset_at)
+        job = db.get(ScanJob, job_id)
+        job.status = "pending"
+        job.run_after = blocked_until
+        db.commit()
+
+    async def run_platform(self, platform):
+        while not self._stopping:
+            await self._semaphore.acquire()
+            try:
+                job, wait = await asyncio.to_thread(run_with_session, dequeue_scan, platform)
+            except Exception as e:
+                print(f"Erreur lors de la planification ({platform}): {str(e)}")
+                job, wait = None, self.poll_interval
+            if job is None:
+                self._semaphore.release()
+                await asyncio.sleep(min(wait or self.poll_interval, 60))
+                continue
+            task = asyncio.create_task(self.run_job(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def run_forever(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        count = await asyncio.to_thread(run_with_session, requeue_stale_scans, self.stale_timeout)
+        if count:
+            print(f"{count} analyse(s) interrompue(s) remise(s) en file")
+        await asyncio.gather(*(self.run_platform(platform) for platform in self.platforms))
+
+    def stop(self):
+        self._stopping = True
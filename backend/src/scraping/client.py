@@ -0,0 +1,61 @@
+import asyncio
+import os
+import weakref
+import httpx
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+class RateLimitError(Exception):
+    """
+    Levée quand une plateforme répond 429 ; reset_at est l'horodatage (epoch) de fin de fenêtre si connu
+    """
+
+    def __init__(self, platform, reset_at=None):
+        super().__init__(f"Limite de requêtes atteinte sur {platform}")
+        self.platform = platform
+        self.reset_at = reset_at
+
+# Client HTTP partagé par tous les scrapers (pool de connexions keep-alive), un par boucle asyncio
+_clients = weakref.WeakKeyDictionary()
+
+def get_client_settings():
+    """
+    Paramètres du pool de connexions, configurables par variables d'environnement
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("SCRAPER_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("SCRAPER_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("SCRAPER_KEEPALIVE_EXPIRY", "30")),
+        ),
+        "timeout": httpx.Timeout(
+            float(os.getenv("SCRAPER_TIMEOUT", "10")),
+            connect=float(os.getenv("SCRAPER_CONNECT_TIMEOUT", "5")),
+        ),
+    }
+
+def get_client():
+    """
+    Retourne le client HTTP asynchrone partagé de la boucle courante, créé au premier appel
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # Pas d'await entre la vérification et la création : aucune course possible dans la boucle
+        client = httpx.AsyncClient(
+            follow_redirects=True,
+            headers={"User-Agent": "Shadow/1.0"},
+            **get_client_settings(),
+        )
+        _clients[loop] = client
+    return client
+
+async def close_client():
+    """
+    Ferme le client partagé de la boucle courante (à appeler à l'arrêt de l'application)
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,53 @@
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+
+from src.models.database import ScanCursor
+
+def load_cursors(db, user_id, platform, queries):
+    """
+    Charge les points de reprise d'un utilisateur pour les requêtes données
+
+    Returns:
+        dict: requête -> {"since_id", "last_seen_at", "etag"} (dict vide si la requête n'a jamais été lancée)
+    """
+    rows = db.query(ScanCursor) \
+        .filter(ScanCursor.user_id == user_id, ScanCursor.platform == platform, ScanCursor.query.in_(queries)) \
+        .all()
+
+    cursors = {query: {} for query in queries}
+    for row in rows:
+        cursors[row.query] = {"since_id": row.since_id, "last_seen_at": row.last_seen_at, "etag": row.etag}
+    return cursors
+
+def save_cursors(db, user_id, platform, cursors):
+    """
+    Enregistre les points de reprise mis à jour par une analyse (upsert, sûr entre workers)
+    """
+    rows = [
+        {
+            "user_id": user_id,
+            "platform": platform,
+            "query": query,
+            "since_id": cursor.get("since_id"),
+            "last_seen_at": cursor.get("last_seen_at"),
+            "etag": cursor.get("etag"),
+            "updated_at": datetime.utcnow(),
+        }
+        for query, cursor in cursors.items()
+        if cursor
+    ]
+    if not rows:
+        return
+
+    stmt = insert(ScanCursor).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_scan_cursors_query",
+        set_={
+            "since_id": stmt.excluded.since_id,
+            "last_seen_at": stmt.excluded.last_seen_at,
+            "etag": stmt.excluded.etag,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+    db.commit()
@@ -0,0 +1,127 @@
+import os
+import threading
+import unicodedata
+from collections import OrderedDict, deque
+
+def normalize_text(text):
+    """
+    Normalise un texte pour la recherche : décomposition Unicode, suppression des accents, casse repliée
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def _is_word_char(c):
+    return c.isalnum() or c == "_"
+
+class KeywordMatcher:
+    """
+    Automate d'Aho-Corasick compilé pour une liste de mots-clés
+
+    Le texte est parcouru une seule fois quel que soit le nombre de mots-clés,
+    après normalisation (accents et casse) identique à celle des mots-clés.
+    """
+
+    def __init__(self, keywords, whole_words=True):
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword and keyword.strip()))
+        self.whole_words = whole_words
+
+        # États : transitions, lien d'échec et motifs reconnus (index du mot-clé, longueur normalisée)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            pattern = normalize_text(keyword.strip())
+            state = 0
+            for c in pattern:
+                next_state = self._goto[state].get(c)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][c] = next_state
+                state = next_state
+            self._output[state].append((index, len(pattern)))
+
+        # Liens d'échec calculés en largeur ; les sorties des suffixes sont fusionnées
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and c not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(c, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """
+        Retourne les occurrences des mots-clés dans le texte
+
+        Returns:
+            list: Tuples (mot-clé, début, fin) avec positions dans le texte normalisé
+        """
+        normalized = normalize_text(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for position, c in enumerate(normalized):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for index, length in output[state]:
+                start, end = position - length + 1, position + 1
+                if self.whole_words and not self._at_boundaries(normalized, start, end):
+                    continue
+                matches.append((self.keywords[index], start, end))
+        return matches
+
+    @staticmethod
+    def _at_boundaries(text, start, end):
+        # Une limite n'est exigée que si le mot-clé commence/finit lui-même par un caractère de mot
+        if start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1]):
+            return False
+        if end < len(text) and _is_word_char(text[end - 1]) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def matched_keywords(self, text):
+        """
+        Mots-clés présents dans le texte, dans l'ordre de la liste d'origine
+        """
+        found = {keyword for keyword, _, _ in self.find_all(text)}
+        return [keyword for keyword in self.keywords if keyword in found]
+
+# Automates compilés par utilisateur, réutilisés tant que sa liste de mots-clés ne change pas
+_matchers = OrderedDict()
+_matchers_lock = threading.Lock()
+
+def get_matcher(keywords, user_id=None, whole_words=True):
+    """
+    Retourne l'automate de l'utilisateur pour cette liste de mots-clés, compilé une seule fois
+
+    Args:
+        keywords (list): Mots-clés surveillés
+        user_id (int): Utilisateur propriétaire (sans utilisateur, l'automate n'est pas mis en cache)
+        whole_words (bool): N'accepter que des mots entiers
+    """
+    if user_id is None:
+        return KeywordMatcher(keywords, whole_words=whole_words)
+
+    fingerprint = (tuple(sorted(set(keywords))), whole_words)
+    with _matchers_lock:
+        cached = _matchers.get(user_id)
+        if cached is not None and cached[0] == fingerprint:
+            _matchers.move_to_end(user_id)
+            return cached[1]
+
+    matcher = KeywordMatcher(keywords, whole_words=whole_words)
+    with _matchers_lock:
+        _matchers[user_id] = (fingerprint, matcher)
+        _matchers.move_to_end(user_id)
+        while len(_matchers) > int(os.getenv("KEYWORD_MATCHER_CACHE_SIZE", "10000")):
+            _matchers.popitem(last=False)
+    return matcher
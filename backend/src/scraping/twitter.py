@@ -1,69 +1,183 @@
-import requests
+import asyncio
+import httpx
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 
+from src.scraping.client import get_client, RateLimitError
+from src.scraping.keywords import get_matcher
+
 # Charger les variables d'environnement
 load_dotenv()
 
-def search_twitter(keyword, max_results=10):
+TWITTER_SEARCH_URL = "https://api.twitter.com/1.1/search/tweets.json"
+
+async def search_twitter_page(keyword, max_results=10, since_id=None, etag=None, max_id=None):
     """
-    Recherche des tweets contenant le keyword spécifié
+    Recherche des tweets contenant le keyword spécifié, limitée aux tweets plus récents que since_id
+    (et au plus récents que max_id, inclus, pour lire les pages suivantes)
+
+    Returns:
+        dict: {"statuses": [...], "etag": ETag de la réponse, "not_modified": True si rien n'a changé (304),
+        "has_more": True si une page plus ancienne existe, "error": True si la requête a échoué}
     """
     twitter_bearer = os.getenv("TWITTER_BEARER", "YOUR_TWITTER_BEARER")
-    
+
     headers = {"Authorization": f"Bearer {twitter_bearer}"}
+    if etag:
+        headers["If-None-Match"] = etag
     params = {
-        "q": keyword, 
-        "result_type": "recent", 
+        "q": keyword,
+        "result_type": "recent",
         "count": max_results
     }
-    
+    if since_id:
+        params["since_id"] = since_id
+    if max_id:
+        params["max_id"] = max_id
+
     try:
-        r = requests.get(
-            "https://api.twitter.com/1.1/search/tweets.json", 
-            headers=headers, 
-            params=params
-        )
+        client = get_client()
+        r = await client.get(TWITTER_SEARCH_URL, headers=headers, params=params)
+        if r.status_code == 429:
+            reset_at = r.headers.get("x-rate-limit-reset")
+            raise RateLimitError("twitter", float(reset_at) if reset_at else None)
+        if r.status_code == 304:
+            return {"statuses": [], "etag": etag, "not_modified": True, "has_more": False, "error": False}
         r.raise_for_status()  # Vérifie si la requête a réussi
-        
-        return r.json().get("statuses", [])
-    
-    except requests.exceptions.RequestException as e:
+
+        data = r.json()
+        return {
+            "statuses": data.get("statuses", []),
+            "etag": r.headers.get("etag"),
+            "not_modified": False,
+            "has_more": bool(data.get("search_metadata", {}).get("next_results")),
+            "error": False,
+        }
+
+    except httpx.HTTPError as e:
         print(f"Erreur lors de la recherche Twitter: {str(e)}")
-        return []
+        return {"statuses": [], "etag": etag, "not_modified": False, "has_more": False, "error": True}
+
+async def search_twitter(keyword, max_results=10):
+    """
+    Recherche des tweets contenant le keyword spécifié
+    """
+    page = await search_twitter_page(keyword, max_results=max_results)
+    return page["statuses"]
+
+def _parse_tweet_date(value):
+    try:
+        return datetime.strptime(value, "%a %b %d %H:%M:%S %z %Y").replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+async def fetch_new_tweets(query, cursor, max_results=100):
+    """
+    Récupère uniquement les tweets publiés depuis le dernier point de reprise, et avance celui-ci
+
+    La recherche renvoie les tweets du plus récent au plus ancien, max_results par page : après
+    une rafale de plus de max_results tweets, les pages plus anciennes sont lues (max_id) jusqu'à
+    rejoindre since_id. Le point de reprise n'est avancé qu'une fois toutes les pages lues ; si une
+    page échoue, il reste en place et la prochaine analyse relit l'intervalle.
 
-def check_for_personal_content(username, keywords=None, image_urls=None):
+    Args:
+        query (str): Requête de recherche
+        cursor (dict): Point de reprise {"since_id", "last_seen_at", "etag"}, mis à jour sur place
+    """
+    statuses = []
+    etag = cursor.get("etag")
+    max_id = None
+    while True:
+        # Seule la première page est conditionnelle (If-None-Match)
+        page = await search_twitter_page(
+            query,
+            max_results=max_results,
+            since_id=cursor.get("since_id"),
+            etag=cursor.get("etag") if max_id is None else None,
+            max_id=max_id,
+        )
+        if page["error"]:
+            return statuses
+        if max_id is None and page["etag"]:
+            etag = page["etag"]
+        statuses.extend(page["statuses"])
+        if not page["statuses"] or not page["has_more"]:
+            break
+        # max_id est inclusif : la page suivante commence juste avant le plus ancien tweet lu
+        max_id = str(min(int(tweet["id_str"]) for tweet in page["statuses"]) - 1)
+
+    if etag:
+        cursor["etag"] = etag
+    if statuses:
+        newest = max(statuses, key=lambda tweet: int(tweet["id_str"]))
+        cursor["since_id"] = newest["id_str"]
+        cursor["last_seen_at"] = _parse_tweet_date(newest.get("created_at")) or cursor.get("last_seen_at")
+
+    return statuses
+
+async def check_for_personal_content(username, keywords=None, image_urls=None, queries=None, max_concurrency=None,
+                                     cursors=None, user_id=None):
     """
     Surveille le compte Twitter d'un utilisateur pour du contenu personnel
+
+    Args:
+        username (str): Compte Twitter surveillé
+        keywords (list): Mots-clés sensibles à rechercher dans les tweets
+        image_urls (list): Images de référence (non exploitées pour l'instant)
+        queries (list): Requêtes de recherche supplémentaires (mentions, variantes du nom...)
+        max_concurrency (int): Nombre maximal de requêtes simultanées (SCRAPER_QUERY_CONCURRENCY)
+        cursors (dict): Points de reprise par requête (voir scraping.cursors) ; s'ils sont fournis, seuls
+            les tweets publiés depuis la dernière analyse sont récupérés et les points sont avancés sur place
+        user_id (int): Utilisateur Shadow propriétaire de la surveillance (cache de l'automate de mots-clés)
     """
     # Si aucun mot-clé n'est fourni, utiliser une liste par défaut
     if keywords is None:
         keywords = []
-    
+
     # Si aucune URL d'image n'est fournie, utiliser une liste vide
     if image_urls is None:
         image_urls = []
-    
-    # Récupérer les tweets récents de l'utilisateur
-    user_tweets = search_twitter(f"from:{username}")
-    
+
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("SCRAPER_QUERY_CONCURRENCY", "8"))
+
+    # Récupérer les tweets récents de l'utilisateur et ceux des requêtes supplémentaires, en parallèle
+    all_queries = [f"from:{username}"] + list(queries or [])
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_query(query):
+        async with semaphore:
+            if cursors is None:
+                return await search_twitter(query)
+            return await fetch_new_tweets(query, cursors.setdefault(query, {}))
+
+    results = await asyncio.gather(*(run_query(query) for query in all_queries))
+
+    # Un même tweet peut remonter par plusieurs requêtes
+    tweets = {}
+    for statuses in results:
+        for tweet in statuses:
+            tweets.setdefault(tweet["id_str"], tweet)
+
     findings = []
-    
-    # Vérifier si les tweets contiennent des mots-clés sensibles
-    for tweet in user_tweets:
+
+    # Vérifier si les tweets contiennent des mots-clés sensibles (un seul passage par tweet)
+    matcher = get_matcher(keywords, user_id=user_id)
+    for tweet in tweets.values():
         tweet_text = tweet.get("text", "").lower()
-        
-        for keyword in keywords:
-            if keyword.lower() in tweet_text:
-                findings.append({
-                    "type": "keyword_match",
-                    "platform": "Twitter",
-                    "content": tweet_text,
-                    "url": f"https://twitter.com/{username}/status/{tweet['id_str']}",
-                    "keyword": keyword
-                })
-    
+        author = tweet.get("user", {}).get("screen_name", username)
+
+        for keyword in matcher.matched_keywords(tweet_text):
+            findings.append({
+                "type": "keyword_match",
+                "platform": "Twitter",
+                "content": tweet_text,
+                "url": f"https://twitter.com/{author}/status/{tweet['id_str']}",
+                "keyword": keyword
+            })
+
     # Note: La vérification des images nécessiterait un traitement supplémentaire
     # avec l'API Twitter et l'analyse d'images
-    
+
     return findings
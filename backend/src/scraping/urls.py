@@ -0,0 +1,76 @@
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Hôtes équivalents ramenés à un hôte canonique
+HOST_ALIASES = {
+    "x.com": "twitter.com",
+    "mobile.twitter.com": "twitter.com",
+    "mobile.x.com": "twitter.com",
+    "m.facebook.com": "facebook.com",
+    "web.facebook.com": "facebook.com",
+    "mbasic.facebook.com": "facebook.com",
+    "fb.com": "facebook.com",
+    "instagr.am": "instagram.com",
+    "m.youtube.com": "youtube.com",
+    "music.youtube.com": "youtube.com",
+    "old.reddit.com": "reddit.com",
+    "new.reddit.com": "reddit.com",
+}
+
+# Paramètres de suivi sans effet sur le contenu affiché
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "igsh", "mc_cid", "mc_eid", "_ga", "ref", "ref_src",
+    "ref_url", "si", "feature", "share", "mibextid",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+# Paramètres de suivi propres à une plateforme (ex: ?s=20&t=... sur les liens de partage Twitter)
+HOST_TRACKING_PARAMS = {
+    "twitter.com": {"s", "t", "lang"},
+}
+
+_TWITTER_STATUS = re.compile(r"^/(?:[^/]+|i/web|i)/status(?:es)?/(\d+)")
+
+def canonicalize_url(url):
+    """
+    Forme canonique d'une URL pour le dédoublonnage des découvertes
+
+    Schéma https, hôte en minuscules sans www/m., alias de domaines (x.com → twitter.com),
+    paramètres de suivi supprimés et autres paramètres triés, sans fragment ni slash final.
+    Les liens vers un tweet (photo, variantes de chemin) sont ramenés à twitter.com/i/status/<id>.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme in ("http", "https", ""):
+        scheme = "https"
+
+    host = (parts.hostname or "").lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    host = HOST_ALIASES.get(host, host)
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+
+    if host == "twitter.com":
+        status = _TWITTER_STATUS.match(path)
+        if status:
+            return f"https://twitter.com/i/status/{status.group(1)}"
+    if host == "youtu.be" and len(path) > 1:
+        host, path, extra = "youtube.com", "/watch", [("v", path.strip("/"))]
+    else:
+        extra = []
+
+    ignored = TRACKING_PARAMS | HOST_TRACKING_PARAMS.get(host, set())
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in ignored and not key.lower().startswith(TRACKING_PREFIXES)
+    ] + extra
+    query.sort()
+
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import shutil
+import uuid
+from dotenv import load_dotenv
+from sqlalchemy.dialects.postgresql import insert
+
+from src.models.database import Blob, run_with_session
+
+# Charger les variables d'environnement
+load_dotenv()
+
+class BlobStore:
+    """
+    Stockage des fichiers par contenu : un dossier par SHA-256, réparti en sous-dossiers
+    (ab/cd/abcd...) pour ne jamais avoir des millions d'entrées dans un même dossier
+
+    Le dossier d'un blob contient le fichier source ("source.jpg") et ses dérivés (miniature,
+    visage recadré, embedding, hashes) : un dérivé est calculé une seule fois, quel que soit
+    le nombre d'utilisateurs ou d'analyses qui l'utilisent.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv("BLOB_DIR", "./data/blobs")
+
+    def blob_dir(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def source_path(self, sha256, extension=""):
+        return os.path.join(self.blob_dir(sha256), f"source{extension}")
+
+    def artefact_path(self, sha256, name):
+        return os.path.join(self.blob_dir(sha256), name)
+
+    def put(self, path, sha256, extension=""):
+        """
+        Range un fichier dans le stockage ; s'il y est déjà (même contenu), le fichier fourni est supprimé
+
+        Returns:
+            str: Chemin du fichier source dans le stockage
+        """
+        target = self.source_path(sha256, extension)
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Simple renommage sur le même système de fichiers, copie sinon
+            shutil.move(path, target)
+        return target
+
+    def derive(self, sha256, name, compute):
+        """
+        Dérivé d'un blob : lu sur disque s'il existe, sinon calculé par compute() puis enregistré
+
+        Args:
+            sha256 (str): Blob source
+            name (str): Nom du dérivé (ex: "thumbnail.jpg")
+            compute (callable): Fonction sans argument retournant le contenu (bytes, éventuellement vide)
+
+        Returns:
+            bytes: Contenu du dérivé
+        """
+        path = self.artefact_path(sha256, name)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+        data = compute()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+    def delete(self, sha256):
+        shutil.rmtree(self.blob_dir(sha256), ignore_errors=True)
+
+def acquire_blob(db, sha256, size, extension=""):
+    """
+    Ajoute une référence à un blob (créé s'il n'existe pas) ; la transaction est validée par l'appelant
+
+    La ligne reste verrouillée jusqu'au commit : un nettoyage concurrent (collect_blobs)
+    ne peut pas supprimer les fichiers pendant qu'on les range.
+    """
+    stmt = insert(Blob).values(sha256=sha256, size=size, extension=extension, ref_count=1)
+    stmt = stmt.on_conflict_do_update(index_elements=[Blob.sha256], set_={"ref_count": Blob.ref_count + 1})
+    db.execute(stmt)
+
+def release_blob(db, sha256):
+    """
+    Retire une référence à un blob ; les fichiers des blobs sans référence sont supprimés par collect_blobs
+    """
+    db.query(Blob).filter(Blob.sha256 == sha256) \
+        .update({Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False)
+
+def collect_blobs(db, store=None, limit=1000):
+    """
+    Supprime les blobs qui ne sont plus référencés (fichier source et dérivés)
+
+    Returns:
+        int: Nombre de blobs supprimés
+    """
+    store = store or blob_store
+    blobs = db.query(Blob).filter(Blob.ref_count <= 0).limit(limit).with_for_update(skip_locked=True).all()
+    for blob in blobs:
+        # Suppression des fichiers sous verrou : une nouvelle référence attend la fin de la transaction
+        store.delete(blob.sha256)
+        db.delete(blob)
+    db.commit()
+    return len(blobs)
+
+async def collect_unused_blobs(payload):
+    """
+    Tâche "collect_blobs" : nettoyage programmé après chaque retrait de contenu protégé
+    """
+    return {"deleted": await asyncio.to_thread(run_with_session, collect_blobs, None, payload.get("limit", 1000))}
+
+# Stockage partagé par le processus
+blob_store = BlobStore()
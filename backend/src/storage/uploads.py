@@ -0,0 +1,158 @@
+import hashlib
+import os
+import uuid
+from dotenv import load_dotenv
+from multipart.multipart import MultipartParser, parse_options_header
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Extensions d'images acceptées pour le contenu protégé
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff", ".gif"}
+
+# Taille maximale d'un champ texte du formulaire (description, etc.)
+MAX_FIELD_SIZE = 64 * 1024
+
+class UploadError(Exception):
+    """
+    Envoi refusé (requête mal formée, fichier trop volumineux...), avec le code HTTP à renvoyer
+    """
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def get_upload_dir():
+    return os.getenv("UPLOAD_DIR", "./data/uploads")
+
+class MultipartUpload:
+    """
+    Lecture en flux d'un corps multipart/form-data
+
+    Chaque fichier est écrit sur disque morceau par morceau pendant la lecture de la requête,
+    son SHA-256 étant calculé sur les mêmes morceaux : la mémoire utilisée ne dépend pas de la
+    taille des fichiers. Le hash perceptuel est calculé dès la fin de chaque fichier, tant qu'il
+    est encore dans le cache disque.
+
+    Usage :
+        upload = MultipartUpload(request.headers["content-type"])
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.finish()
+        upload.files  # [{"field", "filename", "path", "size", "sha256", "phash"}]
+    """
+
+    def __init__(self, content_type, directory=None, max_file_size=None, max_files=None):
+        ctype, options = parse_options_header(content_type or "")
+        if ctype != b"multipart/form-data" or b"boundary" not in options:
+            raise UploadError("Corps multipart/form-data attendu")
+
+        self.directory = os.path.join(directory or get_upload_dir(), "incoming")
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_file_size = max_file_size or int(os.getenv("UPLOAD_MAX_FILE_SIZE", str(100 * 1024 * 1024)))
+        self.max_files = max_files or int(os.getenv("UPLOAD_MAX_FILES", "1000"))
+        self.files = []
+        self.fields = {}
+
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._part = None
+        self._parser = MultipartParser(options[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.decode("latin-1").lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get("content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        if filename is None:
+            self._part = {"field": name, "value": bytearray()}
+            return
+
+        if len(self.files) >= self.max_files:
+            raise UploadError("Trop de fichiers dans un même envoi", status_code=413)
+        filename = os.path.basename(filename.decode("utf-8", "replace").replace("\\", "/"))
+        path = os.path.join(self.directory, f"{uuid.uuid4().hex}.part")
+        self._part = {
+            "field": name,
+            "filename": filename,
+            "content_type": self._headers.get("content-type", b"").decode("latin-1"),
+            "path": path,
+            "size": 0,
+            "digest": hashlib.sha256(),
+            "file": open(path, "wb"),
+        }
+        self.files.append(self._part)
+
+    def _on_part_data(self, data, start, end):
+        part = self._part
+        chunk = data[start:end]
+        if "value" in part:
+            if len(part["value"]) + len(chunk) > MAX_FIELD_SIZE:
+                raise UploadError(f"Champ {part['field']} trop volumineux", status_code=413)
+            part["value"] += chunk
+            return
+
+        part["size"] += len(chunk)
+        if part["size"] > self.max_file_size:
+            raise UploadError(f"Fichier {part['filename']} trop volumineux", status_code=413)
+        part["digest"].update(chunk)
+        part["file"].write(chunk)
+
+    def _on_part_end(self):
+        part, self._part = self._part, None
+        if "value" in part:
+            self.fields[part["field"]] = part["value"].decode("utf-8", "replace")
+            return
+
+        part["file"].close()
+        part["sha256"] = part.pop("digest").hexdigest()
+        del part["file"]
+        part["phash"] = None
+        if os.path.splitext(part["filename"])[1].lower() in IMAGE_EXTENSIONS:
+            from src.ai.image_hash import compute_image_hashes
+
+            hashes = compute_image_hashes(part["path"])
+            part["phash"] = hashes["phash"] if hashes else None
+
+    def write(self, chunk):
+        """
+        Traite un morceau du corps de la requête (appel bloquant : écriture disque et hash)
+        """
+        self._parser.write(chunk)
+
+    def finish(self):
+        self._parser.finalize()
+        if self._part is not None:
+            raise UploadError("Corps multipart incomplet")
+
+    def cleanup(self):
+        """
+        Supprime les fichiers temporaires qui n'ont pas été déplacés vers le stockage
+        """
+        for part in self.files:
+            if "file" in part:
+                part["file"].close()
+            if os.path.exists(part["path"]):
+                os.remove(part["path"])
@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "cli")
+
+# Budgets de temps d'import (secondes), larges pour les machines d'intégration continue
+API_IMPORT_BUDGET = float(os.getenv("API_IMPORT_BUDGET", "3"))
+CLI_STATUS_BUDGET = float(os.getenv("CLI_STATUS_BUDGET", "2"))
+
+# Modules lourds chargés seulement par les fonctions qui analysent des images
+IMAGE_MODULES = ["cv2", "numpy", "PIL"]
+
+def run_python(code, cwd):
+    """
+    Exécute du code dans un nouvel interpréteur (modules non encore importés) et renvoie le
+    rapport JSON imprimé sur sa dernière ligne
+    """
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_api_import_does_not_load_image_modules():
+    report = run_python(
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import src.api.main\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {IMAGE_MODULES!r} if m in sys.modules]}}))\n",
+        BACKEND_DIR,
+    )
+    assert report["loaded"] == []
+    assert report["elapsed"] < API_IMPORT_BUDGET
+
+def test_cli_status_does_not_load_image_modules(tmp_path):
+    # Copie du CLI : il crée son dossier data/ à côté de son dossier parent
+    cli_dir = tmp_path / "cli"
+    shutil.copytree(CLI_DIR, cli_dir, ignore=shutil.ignore_patterns("__pycache__"))
+
+    report = run_python(
+        "import json, runpy, subprocess, sys, time\n"
+        # docker-compose n'est pas appelé : seul le coût de démarrage du CLI est mesuré
+        "subprocess.run = lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, stdout='')\n"
+        "sys.argv = ['shadow.py', 'status']\n"
+        "start = time.perf_counter()\n"
+        "runpy.run_path('shadow.py', run_name='__main__')\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {IMAGE_MODULES!r} if m in sys.modules]}}))\n",
+        str(cli_dir),
+    )
+    assert report["loaded"] == []
+    assert report["elapsed"] < CLI_STATUS_BUDGET
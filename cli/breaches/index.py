@@ -0,0 +1,345 @@
+"""
+Index local des fuites de données (aucun appel réseau)
+
+Chaque adresse email est stockée sous la forme du SHA-1 de l'adresse normalisée, dans
+256 fichiers selon le premier octet du hash. Chaque fichier est une suite triée
+d'enregistrements de taille fixe (19 derniers octets du hash + numéro de la fuite),
+ouverte en mmap : une recherche est une dichotomie qui ne lit que quelques pages du disque.
+
+La recherche par préfixe (k-anonymat, 5 caractères hexadécimaux comme l'API "range" de
+Have I Been Pwned) renvoie tous les hashes partageant ce préfixe, ce qui permet de
+vérifier une adresse sans jamais transmettre son hash complet.
+"""
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import uuid
+
+# Enregistrement : fin du hash (le premier octet est donné par le nom du fichier) + numéro de fuite
+KEY_SIZE = 19
+RECORD_SIZE = KEY_SIZE + 2
+
+# Nombre d'enregistrements triés en mémoire avant écriture d'un fichier temporaire
+RUN_SIZE = 1_000_000
+
+# Préfixe de la recherche par k-anonymat (caractères hexadécimaux)
+RANGE_PREFIX_LENGTH = 5
+
+SHA1_RE = re.compile(r"^[0-9a-fA-F]{40}$")
+FIELD_SEPARATORS = re.compile(r"[:;,\s]")
+
+def normalize_email(email):
+    return email.strip().lower()
+
+def email_hash(email):
+    """
+    SHA-1 (20 octets) de l'adresse normalisée
+    """
+    return hashlib.sha1(normalize_email(email).encode("utf-8")).digest()
+
+def parse_dump_line(line):
+    """
+    Hash d'une ligne de fichier de fuite : email ou SHA-1 hexadécimal en premier champ
+    ("email", "email:motdepasse", "hash,...")
+
+    Returns:
+        bytes: SHA-1 (20 octets) ou None si la ligne n'en contient pas
+    """
+    field = FIELD_SEPARATORS.split(line.strip(), 1)[0]
+    if SHA1_RE.match(field):
+        return bytes.fromhex(field)
+    if "@" in field:
+        return email_hash(field)
+    return None
+
+def _records(path):
+    """
+    Enregistrements d'un fichier trié, lus par blocs
+    """
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(RECORD_SIZE * 65536)
+            if not block:
+                return
+            for i in range(0, len(block), RECORD_SIZE):
+                yield block[i:i + RECORD_SIZE]
+
+def _count_tag(records, tag, counter):
+    """
+    Transmet les enregistrements en comptant ceux de la fuite tag (counter[0])
+    """
+    for record in records:
+        counter[0] += record.endswith(tag)
+        yield record
+
+class BreachIndex:
+    """
+    Index des fuites stocké dans un dossier (catalogue breaches.json et fichiers xx.idx)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.catalog_path = os.path.join(directory, "breaches.json")
+        self.breaches = []
+        if os.path.exists(self.catalog_path):
+            with open(self.catalog_path) as f:
+                self.breaches = json.load(f)
+        self._shards = {}
+
+    def _shard_path(self, first_byte):
+        return os.path.join(self.directory, f"{first_byte:02x}.idx")
+
+    def _shard(self, first_byte):
+        """
+        Fichier d'un préfixe ouvert en mmap (None s'il est vide)
+        """
+        if first_byte not in self._shards:
+            path = self._shard_path(first_byte)
+            shard = None
+            if os.path.exists(path) and os.path.getsize(path):
+                with open(path, "rb") as f:
+                    shard = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._shards[first_byte] = shard
+        return self._shards[first_byte]
+
+    def close(self):
+        for shard in self._shards.values():
+            if shard is not None:
+                shard.close()
+        self._shards = {}
+
+    def is_empty(self):
+        return not self.breaches
+
+    # --- Recherche ---
+
+    @staticmethod
+    def _lower_bound(shard, key, lo=0, hi=None):
+        hi = len(shard) // RECORD_SIZE if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            position = mid * RECORD_SIZE
+            if shard[position:position + len(key)] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _gallop(self, shard, key, lo):
+        """
+        Première position >= key à partir de lo, par pas doublés puis dichotomie : proche de lo
+        quand les clés cherchées sont denses (lots triés)
+        """
+        count = len(shard) // RECORD_SIZE
+        hi = lo
+        step = 1
+        while hi < count and shard[hi * RECORD_SIZE:hi * RECORD_SIZE + KEY_SIZE] < key:
+            lo = hi + 1
+            hi += step
+            step *= 2
+        return self._lower_bound(shard, key, lo, min(hi, count))
+
+    def _ids_at(self, shard, key, index):
+        ids = []
+        position = index * RECORD_SIZE
+        while position < len(shard) and shard[position:position + KEY_SIZE] == key:
+            ids.append(int.from_bytes(shard[position + KEY_SIZE:position + RECORD_SIZE], "big"))
+            position += RECORD_SIZE
+        return ids
+
+    def lookup_hash(self, digest):
+        """
+        Numéros des fuites contenant ce SHA-1 (20 octets)
+        """
+        shard = self._shard(digest[0])
+        if shard is None:
+            return []
+        key = digest[1:]
+        return self._ids_at(shard, key, self._lower_bound(shard, key))
+
+    def check(self, email):
+        """
+        Fuites contenant cette adresse
+
+        Returns:
+            list: Fuites du catalogue ({"id", "name", "date", "description", "count"})
+        """
+        return [self.breaches[breach_id] for breach_id in self.lookup_hash(email_hash(email))]
+
+    def check_many(self, emails):
+        """
+        Vérifie un lot d'adresses : les hashes sont triés pour parcourir chaque fichier dans l'ordre,
+        chaque recherche repartant de la position de la précédente
+
+        Returns:
+            dict: Adresse normalisée -> numéros des fuites (adresses trouvées uniquement)
+        """
+        by_digest = {}
+        for email in emails:
+            email = normalize_email(email)
+            by_digest[hashlib.sha1(email.encode("utf-8")).digest()] = email
+        found = {}
+        shard_byte, shard, lo = None, None, 0
+        for digest in sorted(by_digest):
+            if digest[0] != shard_byte:
+                shard_byte, shard, lo = digest[0], self._shard(digest[0]), 0
+            if shard is None:
+                continue
+            key = digest[1:]
+            lo = self._gallop(shard, key, lo)
+            ids = self._ids_at(shard, key, lo)
+            if ids:
+                found[by_digest[digest]] = ids
+        return found
+
+    def range(self, prefix):
+        """
+        Recherche par k-anonymat : hashes commençant par un préfixe de 5 caractères hexadécimaux
+
+        Returns:
+            dict: Suffixe hexadécimal (35 caractères) -> numéros des fuites
+        """
+        if not re.fullmatch(r"[0-9a-fA-F]{%d}" % RANGE_PREFIX_LENGTH, prefix):
+            raise ValueError(f"Préfixe de {RANGE_PREFIX_LENGTH} caractères hexadécimaux attendu")
+        prefix = prefix.lower()
+        shard = self._shard(int(prefix[:2], 16))
+        if shard is None:
+            return {}
+
+        # Préfixe de 20 bits : 1 octet (le fichier) puis 12 bits, lus à partir de la première clé qui les porte
+        rest = int(prefix[2:], 16)
+        low = (rest << 4).to_bytes(2, "big")
+        index = self._lower_bound(shard, low)
+        results = {}
+        position = index * RECORD_SIZE
+        while position < len(shard):
+            key = shard[position:position + KEY_SIZE]
+            if int.from_bytes(key[:2], "big") >> 4 != rest:
+                break
+            suffix = (prefix[:2] + key.hex())[RANGE_PREFIX_LENGTH:]
+            results.setdefault(suffix, []).append(int.from_bytes(shard[position + KEY_SIZE:position + RECORD_SIZE], "big"))
+            position += RECORD_SIZE
+        return results
+
+    # --- Import ---
+
+    def _save_catalog(self):
+        tmp_path = f"{self.catalog_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.breaches, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.catalog_path)
+
+    def _breach_id(self, name, date=None, description=None):
+        for breach in self.breaches:
+            if breach["name"] == name:
+                breach["date"] = date or breach["date"]
+                breach["description"] = description or breach["description"]
+                return breach["id"]
+        if len(self.breaches) >= 65536:
+            raise ValueError("Nombre maximum de fuites atteint")
+        self.breaches.append({"id": len(self.breaches), "name": name, "date": date or "",
+                              "description": description or "", "count": 0})
+        return self.breaches[-1]["id"]
+
+    def ingest(self, dump_paths, name, date=None, description=None, progress=None):
+        """
+        Importe des fichiers de fuite (une adresse ou un SHA-1 par ligne, champs suivants ignorés)
+
+        Les hashes sont triés par lots de RUN_SIZE en mémoire, écrits dans des fichiers
+        temporaires, puis fusionnés avec l'index existant fichier par fichier : la mémoire
+        utilisée ne dépend pas de la taille des fichiers importés.
+
+        Args:
+            dump_paths (list): Fichiers de fuite
+            name (str): Nom de la fuite (une fuite déjà importée est complétée)
+            date (str): Date de la fuite (AAAA-MM-JJ)
+            description (str): Description
+            progress (callable): Appelée avec le nombre de lignes lues (tous les RUN_SIZE)
+
+        Returns:
+            dict: {"breach", "lines", "invalid", "hashes" (hashes distincts de la fuite dans l'index)}
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.close()
+        breach_id = self._breach_id(name, date, description)
+        tag = breach_id.to_bytes(2, "big")
+        run_dir = os.path.join(self.directory, f"runs.{uuid.uuid4().hex}")
+        os.makedirs(run_dir)
+
+        runs = {}
+        buffers = {}
+        buffered = lines = invalid = 0
+
+        def flush():
+            for first_byte, records in buffers.items():
+                path = os.path.join(run_dir, f"{first_byte:02x}.{len(runs.get(first_byte, []))}")
+                with open(path, "wb") as f:
+                    f.write(b"".join(sorted(set(records))))
+                runs.setdefault(first_byte, []).append(path)
+            buffers.clear()
+
+        try:
+            for dump_path in dump_paths:
+                with open(dump_path, encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        lines += 1
+                        digest = parse_dump_line(line)
+                        if digest is None:
+                            invalid += 1
+                            continue
+                        buffers.setdefault(digest[0], []).append(digest[1:] + tag)
+                        buffered += 1
+                        if buffered >= RUN_SIZE:
+                            flush()
+                            buffered = 0
+                            if progress:
+                                progress(lines)
+            flush()
+
+            added = 0
+            for first_byte, paths in runs.items():
+                shard_path = self._shard_path(first_byte)
+                sources = [_records(path) for path in paths]
+                existing = [0]
+                if os.path.exists(shard_path):
+                    sources.append(_count_tag(_records(shard_path), tag, existing))
+                added += self._merge(heapq.merge(*sources), shard_path, tag) - existing[0]
+            self.breaches[breach_id]["count"] += added
+        finally:
+            for paths in runs.values():
+                for path in paths:
+                    os.remove(path)
+            os.rmdir(run_dir)
+
+        self._save_catalog()
+        return {"breach": self.breaches[breach_id], "lines": lines, "invalid": invalid,
+                "hashes": self.breaches[breach_id]["count"]}
+
+    def _merge(self, records, shard_path, tag):
+        """
+        Écrit un fichier trié sans doublons à partir d'enregistrements triés
+
+        Returns:
+            int: Nombre d'enregistrements écrits pour la fuite tag
+        """
+        tmp_path = f"{shard_path}.{uuid.uuid4().hex}.tmp"
+        previous = None
+        batch = []
+        count = 0
+        with open(tmp_path, "wb") as f:
+            for record in records:
+                if record == previous:
+                    continue
+                previous = record
+                count += record.endswith(tag)
+                batch.append(record)
+                if len(batch) >= 65536:
+                    f.write(b"".join(batch))
+                    batch = []
+            f.write(b"".join(batch))
+        os.replace(tmp_path, shard_path)
+        return count
@@ -0,0 +1,209 @@
+"""
+Nettoyage des métadonnées par lots (dossiers, motifs glob) sur plusieurs processus
+
+Les fichiers déjà propres sont reconnus à leur SHA-256 : les hashes des fichiers produits
+(et des fichiers sans métadonnées) sont conservés d'une exécution à l'autre, et un fichier
+dont le hash est connu n'est pas réécrit.
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+from functools import partial
+from multiprocessing import Pool
+
+from scrubbers.images import CHUNK_SIZE, scrub_image
+from scrubbers.office import scrub_office
+from scrubbers.pdf import scrub_pdf
+
+# Fonction de nettoyage par extension de fichier : scrub(chemin, chemin_nettoyé) -> dict
+SCRUBBERS = {
+    ".jpg": scrub_image,
+    ".jpeg": scrub_image,
+    ".png": scrub_image,
+    ".tif": scrub_image,
+    ".tiff": scrub_image,
+    ".gif": scrub_image,
+    ".pdf": scrub_pdf,
+    ".docx": scrub_office,
+    ".xlsx": scrub_office,
+    ".pptx": scrub_office,
+}
+
+# Suffixe des fichiers nettoyés écrits à côté des originaux
+CLEAN_SUFFIX = "_clean"
+
+def get_scrubbers(remove_comments=False, remove_revisions=False):
+    """
+    Fonctions de nettoyage par extension, avec les options des documents Office
+    """
+    office = partial(scrub_office, remove_comments=remove_comments, remove_revisions=remove_revisions)
+    return {extension: office if scrub is scrub_office else scrub for extension, scrub in SCRUBBERS.items()}
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _supported(path):
+    stem, extension = os.path.splitext(os.path.basename(path))
+    return extension.lower() in SCRUBBERS and not stem.endswith(CLEAN_SUFFIX)
+
+def collect_files(inputs, recursive=True):
+    """
+    Liste les fichiers à nettoyer
+
+    Args:
+        inputs (list): Fichiers, dossiers (parcourus récursivement) ou motifs glob ("photos/**/*.jpg")
+        recursive (bool): Parcourir les sous-dossiers
+
+    Returns:
+        list: Tuples (fichier, dossier de base) ; le chemin relatif au dossier de base est
+        conservé dans le dossier de sortie. Les fichiers "_clean" produits par une exécution
+        précédente sont ignorés.
+    """
+    files = []
+    seen = set()
+
+    def add(path, base):
+        path = os.path.abspath(path)
+        if path not in seen and _supported(path):
+            seen.add(path)
+            files.append((path, os.path.abspath(base)))
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, names in os.walk(item):
+                dirs.sort()
+                if not recursive:
+                    dirs.clear()
+                for name in sorted(names):
+                    add(os.path.join(root, name), item)
+        elif os.path.isfile(item):
+            # Un fichier nommé explicitement est traité même s'il a déjà le suffixe "_clean"
+            path = os.path.abspath(item)
+            if path not in seen:
+                seen.add(path)
+                files.append((path, os.path.dirname(path)))
+        else:
+            # Dossier de base du motif : la partie du chemin qui ne contient aucun joker
+            parts = []
+            for part in item.split(os.sep):
+                if glob.has_magic(part):
+                    break
+                parts.append(part)
+            base = os.sep.join(parts) or "."
+            for path in sorted(glob.iglob(item, recursive=recursive)):
+                if os.path.isfile(path):
+                    add(path, base)
+    return files
+
+def output_path_for(path, base, output_dir=None, in_place=False):
+    """
+    Chemin du fichier nettoyé : le fichier lui-même, son équivalent dans output_dir, ou "<nom>_clean<ext>"
+    """
+    if in_place:
+        return path
+    if output_dir:
+        return os.path.join(output_dir, os.path.relpath(path, base))
+    stem, extension = os.path.splitext(path)
+    return f"{stem}{CLEAN_SUFFIX}{extension}"
+
+class CleanHashes:
+    """
+    Hashes des fichiers connus comme propres, enregistrés dans un fichier texte (un hash par ligne)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hashes = set()
+        self._new = []
+        if os.path.exists(path):
+            with open(path) as f:
+                self.hashes = {line.strip() for line in f if line.strip()}
+
+    def add(self, sha256):
+        if sha256 and sha256 not in self.hashes:
+            self.hashes.add(sha256)
+            self._new.append(sha256)
+
+    def save(self):
+        if not self._new:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.writelines(f"{sha256}\n" for sha256 in self._new)
+        self._new = []
+
+# Hashes propres connus et fonctions de nettoyage, transmis une seule fois à chaque processus (initialiseur du pool)
+_known_clean = frozenset()
+_scrubbers = SCRUBBERS
+
+def _init_worker(known_clean, scrubbers):
+    global _known_clean, _scrubbers
+    _known_clean = known_clean
+    _scrubbers = scrubbers
+
+def scrub_file(task):
+    """
+    Nettoie un fichier (exécuté dans un processus du pool)
+
+    Args:
+        task (tuple): (fichier, fichier nettoyé)
+
+    Returns:
+        dict: {"path", "output", "status" ("cleaned", "already_clean" ou "error"), "sha256", ...}
+    """
+    path, output_path = task
+    result = {"path": path, "output": None}
+    try:
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        result["sha256"] = file_sha256(path)
+        if result["sha256"] in _known_clean:
+            # Fichier déjà propre : simple copie s'il doit être écrit ailleurs
+            if output_path != path:
+                shutil.copyfile(path, output_path)
+                result["output"] = output_path
+            result["status"] = "already_clean"
+            return result
+
+        result.update(_scrubbers[os.path.splitext(path)[1].lower()](path, output_path))
+        result["output"] = output_path
+        result["clean_sha256"] = file_sha256(output_path)
+        result["status"] = "cleaned" if result["removed"] else "already_clean"
+    except Exception as e:
+        # Un fichier illisible ou malformé ne doit pas interrompre le lot
+        result["status"] = "error"
+        result["error"] = str(e)
+    return result
+
+def scrub_files(tasks, known_clean=frozenset(), workers=None, scrubbers=None):
+    """
+    Nettoie des fichiers en parallèle
+
+    Args:
+        tasks (list): Tuples (fichier, fichier nettoyé)
+        known_clean (set): SHA-256 des fichiers déjà propres (non réécrits)
+        workers (int): Nombre de processus (par défaut, un par cœur)
+        scrubbers (dict): Fonctions de nettoyage par extension (voir get_scrubbers)
+
+    Yields:
+        dict: Résultat de chaque fichier (voir scrub_file), dans l'ordre de fin de traitement
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    initargs = (frozenset(known_clean), scrubbers or SCRUBBERS)
+    if workers == 1:
+        _init_worker(*initargs)
+        for task in tasks:
+            yield scrub_file(task)
+        return
+
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        # Petits lots : les résultats arrivent régulièrement sans un aller-retour par fichier
+        yield from pool.imap_unordered(scrub_file, tasks, chunksize=8)
@@ -0,0 +1,425 @@
+"""
+Suppression des métadonnées des images sans décoder les pixels
+
+Les conteneurs JPEG, PNG, TIFF et GIF sont réécrits segment par segment : les segments de
+métadonnées (EXIF, XMP, IPTC, commentaires, textes) sont retirés et les données compressées
+de l'image sont copiées telles quelles, par morceaux. Pas de réencodage (aucune perte de
+qualité) et une mémoire constante quelle que soit la taille de l'image.
+"""
+
+import os
+import shutil
+import struct
+import uuid
+
+# Taille des morceaux copiés d'un fichier à l'autre
+CHUNK_SIZE = 1024 * 1024
+
+class ScrubError(Exception):
+    """
+    Fichier illisible, tronqué ou format non supporté
+    """
+
+def _read(src, size):
+    data = src.read(size)
+    if len(data) != size:
+        raise ScrubError("Fichier tronqué")
+    return data
+
+def _copy(src, dst, size):
+    while size > 0:
+        chunk = src.read(min(size, CHUNK_SIZE))
+        if not chunk:
+            raise ScrubError("Fichier tronqué")
+        dst.write(chunk)
+        size -= len(chunk)
+
+# --- JPEG ---
+
+# Segments APPn conservés (identifiant en tête du segment) : nécessaires au rendu des couleurs
+JPEG_KEEP_APP = {
+    0xE0: b"JFIF\0",
+    0xE2: b"ICC_PROFILE\0",
+    0xEE: b"Adobe",
+}
+
+class _PushbackReader:
+    """
+    Lecteur permettant de remettre des octets dans le flux (fin d'un scan détectée au milieu d'un morceau)
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.pending = b""
+
+    def read(self, size):
+        if not self.pending:
+            return self.f.read(size)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        if len(data) < size:
+            data += self.f.read(size - len(data))
+        return data
+
+    def unread(self, data):
+        self.pending = data + self.pending
+
+def _jpeg_marker(reader):
+    byte = _read(reader, 1)
+    if byte != b"\xff":
+        raise ScrubError("Marqueur JPEG attendu")
+    # Octets de remplissage 0xFF possibles avant le code du marqueur
+    while byte == b"\xff":
+        byte = _read(reader, 1)
+    return byte[0]
+
+def _jpeg_copy_scan(reader, dst):
+    """
+    Copie les données compressées d'un scan ; le marqueur qui le termine est remis dans le flux
+    """
+    while True:
+        data = reader.read(CHUNK_SIZE)
+        if not data:
+            raise ScrubError("JPEG tronqué")
+        pos = 0
+        while True:
+            i = data.find(b"\xff", pos)
+            if i == -1:
+                dst.write(data)
+                break
+            if i == len(data) - 1:
+                # 0xFF en fin de morceau : tranché avec le morceau suivant
+                if len(data) == 1:
+                    raise ScrubError("JPEG tronqué")
+                dst.write(data[:i])
+                reader.unread(data[i:])
+                break
+            code = data[i + 1]
+            # 0xFF00 (octet échappé) et RSTn font partie des données compressées
+            if code == 0 or 0xD0 <= code <= 0xD7:
+                pos = i + 2
+                continue
+            dst.write(data[:i])
+            reader.unread(data[i:])
+            return
+
+def strip_jpeg(src, dst):
+    """
+    Réécrit un JPEG sans ses segments APPn de métadonnées (EXIF, XMP, IPTC...) ni commentaires
+
+    Les données situées après la fin de l'image (aperçus MPF, blocs ajoutés par les
+    constructeurs) sont abandonnées.
+
+    Returns:
+        list: Segments retirés (ex: "APP1 Exif")
+    """
+    reader = _PushbackReader(src)
+    if _read(reader, 2) != b"\xff\xd8":
+        raise ScrubError("JPEG invalide")
+    dst.write(b"\xff\xd8")
+    removed = []
+
+    while True:
+        marker = _jpeg_marker(reader)
+        if marker == 0xD9:
+            dst.write(b"\xff\xd9")
+            return removed
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            dst.write(bytes((0xFF, marker)))
+            continue
+
+        length = struct.unpack(">H", _read(reader, 2))[0]
+        if length < 2:
+            raise ScrubError("Segment JPEG invalide")
+        payload = _read(reader, length - 2)
+
+        if marker == 0xFE:
+            removed.append("COM")
+            continue
+        if 0xE0 <= marker <= 0xEF:
+            keep = JPEG_KEEP_APP.get(marker)
+            if keep is None or not payload.startswith(keep):
+                identifier = payload.split(b"\0", 1)[0][:32].decode("latin-1")
+                removed.append(f"APP{marker - 0xE0} {identifier}".strip())
+                continue
+            if marker == 0xE0 and len(payload) > 14:
+                # Miniature JFIF retirée (dimensions ramenées à 0x0)
+                payload = payload[:12] + b"\0\0"
+                removed.append("APP0 JFIF thumbnail")
+
+        dst.write(struct.pack(">BBH", 0xFF, marker, len(payload) + 2) + payload)
+        if marker == 0xDA:
+            _jpeg_copy_scan(reader, dst)
+
+# --- PNG ---
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Chunks auxiliaires conservés car ils changent le rendu (transparence, couleurs, animation)
+PNG_KEEP = {
+    b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT", b"bKGD", b"pHYs", b"sPLT", b"hIST",
+    b"acTL", b"fcTL", b"fdAT",
+}
+
+def strip_png(src, dst):
+    """
+    Réécrit un PNG sans ses chunks de texte, EXIF, date et chunks privés
+
+    Returns:
+        list: Types des chunks retirés
+    """
+    if _read(src, 8) != PNG_SIGNATURE:
+        raise ScrubError("PNG invalide")
+    dst.write(PNG_SIGNATURE)
+    removed = []
+
+    while True:
+        header = _read(src, 8)
+        length, chunk_type = struct.unpack(">I4s", header)
+        # Bit 5 du premier octet à 0 : chunk critique (IHDR, PLTE, IDAT, IEND)
+        if not chunk_type[0] & 0x20 or chunk_type in PNG_KEEP:
+            dst.write(header)
+            _copy(src, dst, length + 4)
+        else:
+            src.seek(length + 4, os.SEEK_CUR)
+            removed.append(chunk_type.decode("latin-1"))
+        if chunk_type == b"IEND":
+            return removed
+
+# --- TIFF ---
+
+# Taille d'une valeur par type de champ TIFF
+TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4}
+
+# Champs de métadonnées retirés des IFD des images
+TIFF_METADATA_TAGS = {
+    269: "DocumentName",
+    270: "ImageDescription",
+    271: "Make",
+    272: "Model",
+    285: "PageName",
+    305: "Software",
+    306: "DateTime",
+    315: "Artist",
+    316: "HostComputer",
+    700: "XMP",
+    33432: "Copyright",
+    33723: "IPTC",
+    34377: "Photoshop",
+    34665: "ExifIFD",
+    34853: "GPSInfo",
+    37724: "ImageSourceData",
+    40965: "InteroperabilityIFD",
+}
+
+# Champs pointant vers une sous-IFD de métadonnées, effacée en entier
+TIFF_IFD_POINTERS = {34665, 34853, 40965}
+
+def _tiff_ifd(f, order, offset):
+    f.seek(offset)
+    count = struct.unpack(order + "H", _read(f, 2))[0]
+    data = _read(f, 12 * count)
+    next_offset = struct.unpack(order + "I", _read(f, 4))[0]
+    return [data[i:i + 12] for i in range(0, len(data), 12)], next_offset
+
+def _tiff_entry(order, entry):
+    """
+    Returns:
+        tuple: (tag, taille de la valeur, position de la valeur si elle est hors de l'entrée sinon None)
+    """
+    tag, field_type, count = struct.unpack(order + "HHI", entry[:8])
+    size = TIFF_TYPE_SIZES.get(field_type, 1) * count
+    offset = struct.unpack(order + "I", entry[8:])[0] if size > 4 else None
+    return tag, size, offset
+
+def _tiff_zero(f, offset, size):
+    f.seek(offset)
+    while size > 0:
+        n = min(size, CHUNK_SIZE)
+        f.write(b"\0" * n)
+        size -= n
+
+def _tiff_erase_ifd(f, order, offset, visited):
+    """
+    Efface une sous-IFD (Exif, GPS...) et toutes les valeurs qu'elle référence
+    """
+    if not offset or offset in visited:
+        return
+    visited.add(offset)
+    entries, _ = _tiff_ifd(f, order, offset)
+    for entry in entries:
+        tag, size, value_offset = _tiff_entry(order, entry)
+        if value_offset is not None:
+            _tiff_zero(f, value_offset, size)
+        if tag in TIFF_IFD_POINTERS:
+            _tiff_erase_ifd(f, order, struct.unpack(order + "I", entry[8:])[0], visited)
+    _tiff_zero(f, offset, 2 + 12 * len(entries) + 4)
+
+def strip_tiff(f):
+    """
+    Retire les champs de métadonnées d'un TIFF, modifié sur place (ouvert en "r+b")
+
+    Les IFD sont réécrites à leur emplacement sans les champs retirés, et les valeurs de ces
+    champs (sous-IFD Exif/GPS comprises) sont remplacées par des zéros : les bandes et tuiles
+    de l'image ne sont ni lues ni déplacées.
+
+    Returns:
+        list: Champs retirés
+    """
+    order = {b"II": "<", b"MM": ">"}.get(_read(f, 2))
+    if order is None:
+        raise ScrubError("TIFF invalide")
+    magic = struct.unpack(order + "H", _read(f, 2))[0]
+    if magic == 43:
+        raise ScrubError("BigTIFF non supporté")
+    if magic != 42:
+        raise ScrubError("TIFF invalide")
+
+    offset = struct.unpack(order + "I", _read(f, 4))[0]
+    removed = []
+    visited = set()
+    while offset and offset not in visited:
+        visited.add(offset)
+        entries, next_offset = _tiff_ifd(f, order, offset)
+        kept = []
+        for entry in entries:
+            tag, size, value_offset = _tiff_entry(order, entry)
+            if tag not in TIFF_METADATA_TAGS:
+                kept.append(entry)
+                continue
+            removed.append(TIFF_METADATA_TAGS[tag])
+            if value_offset is not None:
+                _tiff_zero(f, value_offset, size)
+            if tag in TIFF_IFD_POINTERS:
+                _tiff_erase_ifd(f, order, struct.unpack(order + "I", entry[8:])[0], visited)
+
+        if len(kept) < len(entries):
+            f.seek(offset)
+            f.write(
+                struct.pack(order + "H", len(kept)) + b"".join(kept)
+                + struct.pack(order + "I", next_offset) + b"\0" * (12 * (len(entries) - len(kept)))
+            )
+        offset = next_offset
+    return removed
+
+# --- GIF ---
+
+# Extensions d'application conservées (boucle des animations)
+GIF_KEEP_APPLICATIONS = (b"NETSCAPE2.0", b"ANIMEXTS1.0")
+
+def _gif_sub_blocks(src, dst):
+    while True:
+        size = _read(src, 1)
+        block = _read(src, size[0])
+        if dst is not None:
+            dst.write(size + block)
+        if not size[0]:
+            return
+
+def strip_gif(src, dst):
+    """
+    Réécrit un GIF sans ses extensions de commentaire ni d'application (XMP...)
+
+    Returns:
+        list: Extensions retirées
+    """
+    header = _read(src, 13)
+    if header[:6] not in (b"GIF87a", b"GIF89a"):
+        raise ScrubError("GIF invalide")
+    dst.write(header)
+    if header[10] & 0x80:
+        _copy(src, dst, 3 << ((header[10] & 7) + 1))
+    removed = []
+
+    while True:
+        block = _read(src, 1)
+        if block == b";":
+            dst.write(block)
+            return removed
+        if block == b",":
+            descriptor = _read(src, 9)
+            dst.write(block + descriptor)
+            if descriptor[8] & 0x80:
+                _copy(src, dst, 3 << ((descriptor[8] & 7) + 1))
+            # Taille minimale des codes LZW puis données de l'image
+            _copy(src, dst, 1)
+            _gif_sub_blocks(src, dst)
+        elif block == b"!":
+            label = _read(src, 1)
+            if label == b"\xfe":
+                removed.append("Comment")
+                _gif_sub_blocks(src, None)
+            elif label == b"\xff":
+                size = _read(src, 1)
+                identifier = _read(src, size[0])
+                if identifier[:11] in GIF_KEEP_APPLICATIONS:
+                    dst.write(block + label + size + identifier)
+                    _gif_sub_blocks(src, dst)
+                else:
+                    removed.append(f"Application {identifier[:8].decode('latin-1')}")
+                    _gif_sub_blocks(src, None)
+            else:
+                dst.write(block + label)
+                _gif_sub_blocks(src, dst)
+        else:
+            raise ScrubError("Bloc GIF invalide")
+
+def detect_image_format(header):
+    """
+    Format d'une image d'après ses premiers octets (8 suffisent)
+    """
+    if header.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if header.startswith(PNG_SIGNATURE):
+        return "png"
+    if header[:4] in (b"II*\0", b"MM\0*", b"II+\0", b"MM\0+"):
+        return "tiff"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+IMAGE_STRIPPERS = {
+    "jpeg": strip_jpeg,
+    "png": strip_png,
+    "gif": strip_gif,
+}
+
+def scrub_image(path, output_path=None):
+    """
+    Écrit une copie de l'image sans métadonnées (écriture atomique)
+
+    Args:
+        path (str): Image source
+        output_path (str): Image nettoyée (par défaut, l'image source est remplacée)
+
+    Returns:
+        dict: {"format", "removed" (segments retirés), "size", "clean_size"}
+    """
+    output_path = output_path or path
+    with open(path, "rb") as f:
+        image_format = detect_image_format(f.read(8))
+    if image_format is None:
+        raise ScrubError("Format d'image non reconnu")
+
+    size = os.path.getsize(path)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if image_format == "tiff":
+            # Le TIFF est corrigé sur place : copie du fichier (faite par le noyau) puis modification des IFD
+            shutil.copyfile(path, tmp_path)
+            with open(tmp_path, "r+b") as f:
+                removed = strip_tiff(f)
+        else:
+            with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+                removed = IMAGE_STRIPPERS[image_format](src, dst)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return {
+        "format": image_format,
+        "removed": list(dict.fromkeys(removed)),
+        "size": size,
+        "clean_size": os.path.getsize(output_path),
+    }
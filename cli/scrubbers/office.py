@@ -0,0 +1,185 @@
+"""
+Suppression des métadonnées des documents Office (docx, xlsx, pptx)
+
+Le document est une archive ZIP réécrite entrée par entrée : les propriétés (auteur, société,
+dates, propriétés personnalisées) sont vidées et, sur demande, les commentaires et les
+révisions (suivi des modifications) sont retirés. Les autres entrées (images, médias) sont
+copiées par morceaux et les parties XML filtrées en flux : le document n'est jamais chargé
+entièrement en mémoire.
+"""
+
+import os
+import re
+import shutil
+import uuid
+import zipfile
+from xml.etree import ElementTree
+
+from scrubbers.images import CHUNK_SIZE, ScrubError
+
+# Parties de propriétés, toujours vidées
+PROPERTY_PARTS = {"docProps/core.xml", "docProps/app.xml", "docProps/custom.xml"}
+
+# Parties des commentaires et de leurs auteurs (Word, Excel, PowerPoint)
+COMMENT_PARTS = re.compile(
+    r"^(word/(comments[^/]*|people)\.xml"
+    r"|xl/comments\d*\.xml|xl/threadedComments/[^/]+\.xml|xl/persons/[^/]+\.xml"
+    r"|ppt/comments/[^/]+\.xml|ppt/(commentAuthors|authors)\.xml)$"
+)
+
+# Parties de Word portant le texte (corps, en-têtes, pieds de page, notes)
+WORD_TEXT_PARTS = re.compile(r"^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+
+# Ancres des commentaires dans le texte
+COMMENT_MARKERS_RE = re.compile(rb"<w:(?:commentRangeStart|commentRangeEnd|commentReference)\b[^>]*/>")
+
+# Révisions : éléments supprimés avec leur contenu (texte supprimé, anciennes mises en forme)
+REVISION_DROP = rb"del|moveFrom|rPrChange|pPrChange|sectPrChange|tblPrChange|tblGridChange|trPrChange|tcPrChange|numberingChange"
+REVISION_DROP_RE = re.compile(
+    rb"<w:(?:" + REVISION_DROP + rb"|moveFromRangeStart|moveFromRangeEnd|moveToRangeStart|moveToRangeEnd)\b[^>]*/>"
+    rb"|<w:(" + REVISION_DROP + rb")\b[^>]*(?<!/)>.*?</w:\1>",
+    re.DOTALL,
+)
+REVISION_OPEN_RE = re.compile(rb"<w:(?:" + REVISION_DROP + rb")\b[^>]*(?<!/)>")
+# Révisions : balises retirées, contenu conservé (texte inséré accepté)
+REVISION_UNWRAP_RE = re.compile(rb"<w:(?:ins|moveTo)\b[^>]*>")
+REVISION_UNWRAP_END_RE = re.compile(rb"</w:(?:ins|moveTo)>")
+
+# Commentaires Excel : seules parties dont la racine vide garde des listes obligatoires
+EXCEL_COMMENT_PARTS = re.compile(r"^xl/comments\d*\.xml$")
+
+ROOT_RE = re.compile(rb"<(?![?!])([^\s>/]+)([^>]*?)/?>")
+NAMESPACE_DECLARATION_RE = re.compile(rb"""\sxmlns(?::[^\s=]+)?\s*=\s*(?:"[^"]*"|'[^']*')""")
+
+# Attributs de compatibilité (mc:Ignorable...) : annotations du format, pas des métadonnées
+MARKUP_COMPATIBILITY = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+
+def _empty_part(name, head):
+    """
+    Partie XML réduite à son élément racine vide, sans attributs (déclarations d'espaces de
+    noms conservées)
+    """
+    match = ROOT_RE.search(head)
+    if match is None:
+        raise ScrubError("Partie XML invalide")
+    root = b"<" + match.group(1) + b"".join(NAMESPACE_DECLARATION_RE.findall(match.group(2)))
+    if EXCEL_COMMENT_PARTS.match(name):
+        # Commentaires Excel : les listes des auteurs et des commentaires sont obligatoires
+        return XML_DECLARATION + root + b"><authors/><commentList/></" + match.group(1) + b">"
+    return XML_DECLARATION + root + b"/>"
+
+def _has_attributes(element):
+    return any(not key.startswith(MARKUP_COMPATIBILITY) for key in element.attrib)
+
+def _has_metadata(name, head):
+    """
+    Indique si une partie de propriétés ou de commentaires contient des entrées : attributs ou
+    éléments sous la racine (hors listes vides obligatoires des commentaires Excel). La
+    déclaration XML et la mise en forme ne comptent pas.
+    """
+    try:
+        root = ElementTree.fromstring(head)
+    except ElementTree.ParseError:
+        return True
+    if _has_attributes(root):
+        return True
+    if EXCEL_COMMENT_PARTS.match(name):
+        return any(len(child) or _has_attributes(child) for child in root)
+    return len(root) > 0
+
+def _filter_xml(src, dst, remove_comments, remove_revisions):
+    """
+    Filtre une partie XML de Word en flux
+
+    Un morceau n'est écrit qu'une fois sûr de ne contenir aucun élément coupé : la fin non
+    traitée (dernière balise, élément supprimé pas encore fermé) est reprise avec le morceau
+    suivant.
+
+    Returns:
+        tuple: (ancres de commentaires retirées, révisions retirées)
+    """
+    comments = revisions = 0
+    pending = b""
+    while True:
+        chunk = src.read(CHUNK_SIZE)
+        data = pending + chunk
+        if remove_comments:
+            data, n = COMMENT_MARKERS_RE.subn(b"", data)
+            comments += n
+        if remove_revisions:
+            data, n = REVISION_DROP_RE.subn(b"", data)
+            revisions += n
+            data, n = REVISION_UNWRAP_RE.subn(b"", data)
+            revisions += n
+            data = REVISION_UNWRAP_END_RE.sub(b"", data)
+        if not chunk:
+            dst.write(data)
+            return comments, revisions
+
+        cut = data.rfind(b"<")
+        if cut == -1:
+            cut = len(data)
+        if remove_revisions:
+            open_match = REVISION_OPEN_RE.search(data)
+            if open_match is not None and open_match.start() < cut:
+                cut = open_match.start()
+        dst.write(data[:cut])
+        pending = data[cut:]
+
+def scrub_office(path, output_path=None, remove_comments=False, remove_revisions=False):
+    """
+    Écrit une copie du document Office sans métadonnées (écriture atomique)
+
+    Args:
+        path (str): Document source (.docx, .xlsx, .pptx)
+        output_path (str): Document nettoyé (par défaut, le document source est remplacé)
+        remove_comments (bool): Retirer les commentaires et leurs auteurs
+        remove_revisions (bool): Accepter les révisions de Word (texte supprimé et historique retirés)
+
+    Returns:
+        dict: {"format", "removed" (parties modifiées), "size", "clean_size"}
+    """
+    output_path = output_path or path
+    size = os.path.getsize(path)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    removed = []
+    try:
+        with zipfile.ZipFile(path) as zin, zipfile.ZipFile(tmp_path, "w") as zout:
+            for info in zin.infolist():
+                name = info.filename
+                # Date fixe pour toutes les entrées : celles d'origine révèlent les dates d'édition
+                out_info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+                out_info.compress_type = info.compress_type
+                with zin.open(info) as src:
+                    if name in PROPERTY_PARTS or (remove_comments and COMMENT_PARTS.match(name)):
+                        head = src.read(64 * 1024)
+                        truncated = bool(src.read(1))
+                        if truncated or _has_metadata(name, head):
+                            removed.append(name)
+                        zout.writestr(out_info, _empty_part(name, head))
+                    elif (remove_comments or remove_revisions) and WORD_TEXT_PARTS.match(name):
+                        with zout.open(out_info, "w") as dst:
+                            comments, revisions = _filter_xml(src, dst, remove_comments, remove_revisions)
+                        if comments:
+                            removed.append(f"{name}: {comments} ancre(s) de commentaire")
+                        if revisions:
+                            removed.append(f"{name}: {revisions} révision(s)")
+                    else:
+                        with zout.open(out_info, "w", force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) as dst:
+                            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        os.replace(tmp_path, output_path)
+    except BaseException as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if isinstance(e, zipfile.BadZipFile):
+            raise ScrubError("Document Office invalide ou chiffré") from e
+        raise
+
+    return {
+        "format": os.path.splitext(path)[1].lower().lstrip("."),
+        "removed": removed,
+        "size": size,
+        "clean_size": os.path.getsize(output_path),
+    }
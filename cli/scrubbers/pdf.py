@@ -0,0 +1,370 @@
+"""
+Suppression des métadonnées des PDF (dictionnaire Info et flux XMP)
+
+Le fichier est copié puis corrigé sur place, sans être chargé en mémoire :
+- les chaînes de l'ancien dictionnaire Info sont remplacées par des espaces et les flux XMP
+  par un paquet XMP vide de même longueur (les positions des objets ne changent pas) ;
+- une mise à jour incrémentale est ajoutée en fin de fichier : un nouveau dictionnaire Info
+  vide et la table des références (ou le flux XRef) qui le rend actif.
+"""
+
+import os
+import re
+import shutil
+import uuid
+import zlib
+
+from scrubbers.images import CHUNK_SIZE, ScrubError
+
+OBJECT_RE = re.compile(rb"(?<![0-9])(\d+)\s+(\d+)\s+obj\b")
+METADATA_RE = re.compile(rb"/Type\s*/Metadata\b")
+REFERENCE_RE = re.compile(rb"(\d+)\s+(\d+)\s+R\b")
+
+# Marge entre deux morceaux lus : aucun motif recherché n'est plus long
+SCAN_OVERLAP = 64
+
+# Paquet XMP vide ; l'espace restant est comblé par du remplissage, prévu par la norme XMP
+EMPTY_XMP = b'<?xpacket begin="\xef\xbb\xbf" id="W5M0MpCehiHzreSzNTczkc9d"?><x:xmpmeta xmlns:x="adobe:ns:meta/"/>'
+XMP_END = b'<?xpacket end="w"?>'
+
+def _scan_objects(f):
+    """
+    Parcourt le fichier une fois
+
+    Returns:
+        tuple: (position de la dernière définition de chaque objet, positions des objets XMP)
+    """
+    offsets = {}
+    metadata = set()
+    last_object = None
+    position = 0
+    data = b""
+    f.seek(0)
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        data += chunk
+        end = len(data) if not chunk else max(0, len(data) - SCAN_OVERLAP)
+        events = [(m.start(), m) for m in OBJECT_RE.finditer(data) if m.start() < end]
+        events += [(m.start(), None) for m in METADATA_RE.finditer(data) if m.start() < end]
+        for start, match in sorted(events, key=lambda event: event[0]):
+            if match is not None:
+                last_object = position + start
+                offsets[int(match.group(1))] = last_object
+            elif last_object is not None:
+                metadata.add(last_object)
+        if not chunk:
+            return offsets, sorted(metadata)
+        position += end
+        data = data[end:]
+
+def _skip_string(data, i):
+    depth = 0
+    while i < len(data):
+        c = data[i]
+        if c == 0x5C:
+            i += 2
+            continue
+        if c == 0x28:
+            depth += 1
+        elif c == 0x29:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return None
+
+def _strings(data, start=0, end=None):
+    """
+    Chaînes d'un fragment PDF : tuples (début, fin) du contenu des chaînes littérales et hexadécimales
+
+    Returns:
+        tuple: (chaînes, position suivant la fin du dictionnaire ouvert en start ou None)
+    """
+    strings = []
+    depth = 0
+    i = start
+    end = len(data) if end is None else end
+    while i < end:
+        if data.startswith(b"<<", i):
+            depth += 1
+            i += 2
+            continue
+        if data.startswith(b">>", i):
+            depth -= 1
+            i += 2
+            if depth == 0:
+                return strings, i
+            continue
+        c = data[i]
+        if c == 0x28:
+            j = _skip_string(data, i)
+            if j is None:
+                return strings, None
+            strings.append((i + 1, j - 1))
+            i = j
+        elif c == 0x3C:
+            j = data.find(b">", i)
+            if j == -1:
+                return strings, None
+            strings.append((i + 1, j))
+            i = j + 1
+        elif c == 0x25:
+            # Commentaire jusqu'à la fin de la ligne
+            j = data.find(b"\n", i)
+            i = end if j == -1 else j + 1
+        else:
+            i += 1
+    return strings, None
+
+def _read_object(f, offset, max_size=1024 * 1024):
+    """
+    Dictionnaire d'un objet (ou du trailer) commençant à offset
+
+    Returns:
+        tuple: (octets lus depuis offset, début du dictionnaire, fin du dictionnaire)
+    """
+    size = 64 * 1024
+    while True:
+        f.seek(offset)
+        data = f.read(size)
+        start = data.find(b"<<")
+        if start != -1:
+            _, end = _strings(data, start)
+            if end is not None:
+                return data, start, end
+        if len(data) < size or size >= max_size:
+            raise ScrubError(f"Objet PDF illisible (position {offset})")
+        size *= 4
+
+def _find(f, token, offset):
+    """
+    Position de la prochaine occurrence de token à partir de offset
+    """
+    f.seek(offset)
+    data = b""
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return None
+        data = data[-(len(token) - 1):] + chunk if data else chunk
+        i = data.find(token)
+        if i != -1:
+            return f.tell() - len(data) + i
+
+def _read_trailer(f, size):
+    """
+    Dernière section de références : ("table" ou "stream", position, dictionnaire du trailer)
+    """
+    f.seek(max(0, size - 4096))
+    matches = list(re.finditer(rb"startxref\s+(\d+)", f.read()))
+    if not matches:
+        raise ScrubError("PDF invalide (startxref introuvable)")
+    xref_offset = int(matches[-1].group(1))
+
+    f.seek(xref_offset)
+    head = f.read(64)
+    if head.startswith(b"xref"):
+        trailer_offset = _find(f, b"trailer", xref_offset)
+        if trailer_offset is None:
+            raise ScrubError("PDF invalide (trailer introuvable)")
+        data, start, end = _read_object(f, trailer_offset)
+        return "table", xref_offset, data[start:end]
+    if OBJECT_RE.match(head):
+        data, start, end = _read_object(f, xref_offset)
+        return "stream", xref_offset, data[start:end]
+    raise ScrubError("PDF invalide (table des références introuvable)")
+
+def _blank(f, offset, data, strings):
+    """
+    Remplace par des espaces le contenu des chaînes (même longueur : les positions ne changent pas)
+
+    Returns:
+        bool: Au moins une chaîne n'était pas vide
+    """
+    changed = False
+    for start, end in strings:
+        if data[start:end].strip():
+            f.seek(offset + start)
+            f.write(b" " * (end - start))
+            changed = True
+    return changed
+
+def _blank_info(f, offsets, info_number):
+    """
+    Efface les valeurs de l'ancien dictionnaire Info (et des chaînes qu'il référence)
+
+    Returns:
+        tuple: (Info trouvé dans le fichier, Info contenait des valeurs)
+    """
+    offset = offsets.get(info_number)
+    if offset is None:
+        # Info rangé dans un flux d'objets compressé : seule la mise à jour incrémentale le remplace
+        return False, True
+
+    data, start, end = _read_object(f, offset)
+    strings, _ = _strings(data, start, end)
+    changed = _blank(f, offset, data, strings)
+    has_values = re.search(rb"/[A-Za-z]", data[start + 2:end - 2]) is not None
+
+    for match in REFERENCE_RE.finditer(data, start, end):
+        ref_offset = offsets.get(int(match.group(1)))
+        if ref_offset is None:
+            continue
+        f.seek(ref_offset)
+        ref_data = f.read(64 * 1024)
+        ref_end = ref_data.find(b"endobj")
+        strings, _ = _strings(ref_data, 0, len(ref_data) if ref_end == -1 else ref_end)
+        changed = _blank(f, ref_offset, ref_data, strings) or changed
+    return True, has_values or changed
+
+def _stream_length(f, offsets, dictionary):
+    match = re.search(rb"/Length\s+(\d+)(?:\s+(\d+)\s+R)?", dictionary)
+    if match is None:
+        return None
+    if match.group(2) is None:
+        return int(match.group(1))
+    offset = offsets.get(int(match.group(1)))
+    if offset is None:
+        return None
+    f.seek(offset)
+    value = re.match(rb"\d+\s+\d+\s+obj\s*(\d+)", f.read(128))
+    return int(value.group(1)) if value else None
+
+def _blank_xmp(f, offsets, offset):
+    """
+    Remplace un flux XMP par un paquet vide de même longueur
+
+    Returns:
+        str: None si le flux est déjà vide, "XMP" s'il a été vidé, sinon un avertissement
+    """
+    data, start, end = _read_object(f, offset)
+    dictionary = data[start:end]
+    length = _stream_length(f, offsets, dictionary)
+    stream = re.compile(rb"\s*stream\r?\n").match(data, end)
+    if length is None or stream is None:
+        return f"XMP illisible (position {offset})"
+
+    filters = re.findall(rb"/(\w+)", re.search(rb"/Filter\s*(\[[^\]]*\]|/\w+)", dictionary).group(1)) \
+        if b"/Filter" in dictionary else []
+    if filters not in ([], [b"FlateDecode"]):
+        return f"XMP compressé non supporté (position {offset})"
+
+    data_offset = offset + stream.end()
+    f.seek(data_offset)
+    raw = f.read(length)
+    try:
+        content = zlib.decompressobj().decompress(raw) if filters else raw
+    except zlib.error:
+        return f"XMP illisible (position {offset})"
+    if b"<rdf:" not in content:
+        return None
+
+    if filters:
+        # Flux compressé de même longueur : le décodeur s'arrête à la fin du flux zlib
+        packet = zlib.compress(EMPTY_XMP + XMP_END, 9)
+        if len(packet) > length:
+            return f"XMP trop court pour être vidé (position {offset})"
+        packet += b"\0" * (length - len(packet))
+    elif length >= len(EMPTY_XMP) + len(XMP_END):
+        packet = EMPTY_XMP + b" " * (length - len(EMPTY_XMP) - len(XMP_END)) + XMP_END
+    else:
+        packet = b" " * length
+    f.seek(data_offset)
+    f.write(packet)
+    return "XMP"
+
+def _append_update(f, kind, xref_offset, trailer):
+    """
+    Ajoute une mise à jour incrémentale : un dictionnaire Info vide et sa section de références
+    """
+    size = re.search(rb"/Size\s+(\d+)", trailer)
+    root = re.search(rb"/Root\s+(\d+\s+\d+\s+R)", trailer)
+    if size is None or root is None:
+        raise ScrubError("PDF invalide (trailer incomplet)")
+    document_id = re.search(rb"/ID\s*(\[[^\]]*\])", trailer)
+    document_id = b" /ID " + document_id.group(1) if document_id else b""
+    info_number = int(size.group(1))
+
+    f.seek(0, os.SEEK_END)
+    info_offset = f.tell() + 1
+    info = b"%d 0 obj\n<< >>\nendobj\n" % info_number
+    new_xref_offset = info_offset + len(info)
+    if kind == "table":
+        section = (
+            b"xref\n%d 1\n%010d 00000 n \ntrailer\n<< /Size %d /Root %s /Info %d 0 R%s /Prev %d >>\n"
+            % (info_number, info_offset, info_number + 1, root.group(1), info_number, document_id, xref_offset)
+        )
+    else:
+        # Flux XRef non compressé : une entrée pour Info, une pour le flux lui-même
+        width = max(4, (new_xref_offset.bit_length() + 7) // 8)
+        rows = b"".join(b"\x01" + value.to_bytes(width, "big") + b"\0\0" for value in (info_offset, new_xref_offset))
+        section = (
+            b"%d 0 obj\n<< /Type /XRef /Size %d /Root %s /Info %d 0 R%s /Prev %d /W [1 %d 2] /Index [%d 2] /Length %d >>\n"
+            b"stream\n%s\nendstream\nendobj\n"
+            % (info_number + 1, info_number + 2, root.group(1), info_number, document_id, xref_offset, width,
+               info_number, len(rows), rows)
+        )
+    f.write(b"\n" + info + section + b"startxref\n%d\n%%%%EOF\n" % new_xref_offset)
+
+def strip_pdf(f):
+    """
+    Retire le dictionnaire Info et les flux XMP d'un PDF, modifié sur place (ouvert en "r+b")
+
+    Returns:
+        tuple: (éléments retirés, avertissements)
+    """
+    f.seek(0)
+    if b"%PDF-" not in f.read(1024):
+        raise ScrubError("PDF invalide")
+    f.seek(0, os.SEEK_END)
+    kind, xref_offset, trailer = _read_trailer(f, f.tell())
+    if b"/Encrypt" in trailer:
+        raise ScrubError("PDF chiffré non supporté")
+
+    offsets, metadata = _scan_objects(f)
+    removed = []
+    warnings = []
+    for offset in metadata:
+        result = _blank_xmp(f, offsets, offset)
+        if result == "XMP":
+            removed.append("XMP")
+        elif result:
+            warnings.append(result)
+
+    info = re.search(rb"/Info\s+(\d+)\s+\d+\s+R", trailer)
+    if info is not None:
+        found, has_values = _blank_info(f, offsets, int(info.group(1)))
+        if has_values:
+            if not found:
+                warnings.append("Info rangé dans un flux d'objets : remplacé, mais l'ancienne version reste dans le fichier")
+            _append_update(f, kind, xref_offset, trailer)
+            removed.append("Info")
+    return removed, warnings
+
+def scrub_pdf(path, output_path=None):
+    """
+    Écrit une copie du PDF sans métadonnées (écriture atomique)
+
+    Returns:
+        dict: {"format", "removed", "warnings", "size", "clean_size"}
+    """
+    output_path = output_path or path
+    size = os.path.getsize(path)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copyfile(path, tmp_path)
+        with open(tmp_path, "r+b") as f:
+            removed, warnings = strip_pdf(f)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return {
+        "format": "pdf",
+        "removed": list(dict.fromkeys(removed)),
+        "warnings": warnings,
+        "size": size,
+        "clean_size": os.path.getsize(output_path),
+    }
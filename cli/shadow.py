@@ -11,16 +11,14 @@ import sys
 import argparse
 import subprocess
 import json
-import requests
 import random
 import string
 import datetime
 import re
 import hashlib
+import glob
 import secrets
 from pathlib import Path
-from PIL import Image, ExifTags
-import io
 
 # Couleurs pour le terminal
 class Colors:
@@ -57,6 +55,7 @@ class ShadowCLI:
         self.api_url = "http://localhost:8000"
         self.dashboard_url = "http://localhost:3000"
         self.data_dir = self.project_root / "data"
+        self.breach_index_dir = self.data_dir / "breaches"
         
         # Créer le répertoire de données s'il n'existe pas
         os.makedirs(self.data_dir, exist_ok=True)
@@ -245,33 +244,32 @@ class ShadowCLI:
         print(f"\n{Colors.BLUE}[*] Rapport sauvegardé: {report_path}{Colors.ENDC}")
         return True
     
-    def identity_leak(self, email):
-        """Vérifie si une adresse email a été compromise dans des fuites de données"""
+    def identity_leak(self, email=None, emails_file=None):
+        """Vérifie si des adresses email ont été compromises, dans l'index local des fuites (aucun appel réseau)"""
+        from breaches.index import BreachIndex, normalize_email
+        
         print(f"{Colors.HEADER}[+] Vérification des fuites d'identité...{Colors.ENDC}")
         
-        if not email or not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+        if email and not re.match(r"[^@]+@[^@]+\.[^@]+", email):
             print(f"{Colors.FAIL}[✗] Veuillez fournir une adresse email valide{Colors.ENDC}")
             return False
+        if not email and not emails_file:
+            print(f"{Colors.FAIL}[✗] Veuillez fournir une adresse email ou un fichier d'adresses (--file){Colors.ENDC}")
+            return False
         
-        print(f"{Colors.BLUE}[*] Recherche de fuites pour: {email}{Colors.ENDC}")
-        print(f"{Colors.BLUE}[*] Vérification des bases de données de fuites connues...{Colors.ENDC}")
+        index = BreachIndex(self.breach_index_dir)
+        if index.is_empty():
+            print(f"{Colors.WARNING}[!] Aucune fuite importée. Importez des fichiers de fuite avec: ./cli/shadow.py leak-import <fichiers> --name <nom>{Colors.ENDC}")
+            return False
         
-        # Simuler une recherche dans des bases de données de fuites
-        import time
-        time.sleep(2)
+        print(f"{Colors.BLUE}[*] Vérification dans {len(index.breaches)} fuite(s) importée(s)...{Colors.ENDC}")
         
-        # Générer des résultats fictifs
-        breaches = [
-            {"name": "Adobe", "date": "2013-10-04", "pwned_count": 153000000, "description": "Fuite de données Adobe incluant emails et mots de passe"},
-            {"name": "LinkedIn", "date": "2012-05-05", "pwned_count": 164611595, "description": "Fuite de données LinkedIn avec emails et mots de passe hashés"},
-            {"name": "Dropbox", "date": "2012-07-01", "pwned_count": 68648009, "description": "Fuite de données Dropbox avec emails et mots de passe hashés"}
-        ]
+        if emails_file:
+            return self._identity_leak_batch(index, emails_file)
         
-        # Déterminer aléatoirement si l'email a été compromis
-        found_breaches = []
-        for breach in breaches:
-            if random.choice([True, False]):
-                found_breaches.append(breach)
+        print(f"{Colors.BLUE}[*] Recherche de fuites pour: {email}{Colors.ENDC}")
+        found_breaches = index.check(email)
+        index.close()
         
         # Afficher les résultats
         if found_breaches:
@@ -280,7 +278,7 @@ class ShadowCLI:
             print(f"\n{Colors.BOLD}Détails des fuites:{Colors.ENDC}")
             for breach in found_breaches:
                 print(f"  - {breach['name']} ({breach['date']}): {Colors.FAIL}{breach['description']}{Colors.ENDC}")
-                print(f"    Nombre de comptes affectés: {breach['pwned_count']}")
+                print(f"    Nombre de comptes affectés: {breach['count']}")
             
             print(f"\n{Colors.WARNING}[!] Recommandations:{Colors.ENDC}")
             print(f"  - Changez immédiatement vos mots de passe")
@@ -290,7 +288,7 @@ class ShadowCLI:
             print(f"\n{Colors.GREEN}[✓] Bonne nouvelle! Votre email n'a pas été trouvé dans les fuites de données connues.{Colors.ENDC}")
         
         # Générer un rapport
-        report_path = os.path.join(self.data_dir, f"leaks_{email}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        report_path = os.path.join(self.data_dir, f"leaks_{normalize_email(email)}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
         with open(report_path, "w") as f:
             f.write(f"Rapport de fuites d'identité pour {email}\n")
             f.write(f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
@@ -300,7 +298,7 @@ class ShadowCLI:
                 f.write("Détails des fuites:\n")
                 for breach in found_breaches:
                     f.write(f"- {breach['name']} ({breach['date']}): {breach['description']}\n")
-                    f.write(f"  Nombre de comptes affectés: {breach['pwned_count']}\n")
+                    f.write(f"  Nombre de comptes affectés: {breach['count']}\n")
                 
                 f.write("\nRecommandations:\n")
                 f.write("- Changez immédiatement vos mots de passe\n")
@@ -312,6 +310,55 @@ class ShadowCLI:
         print(f"\n{Colors.BLUE}[*] Rapport sauvegardé: {report_path}{Colors.ENDC}")
         return True
     
+    def _identity_leak_batch(self, index, emails_file):
+        """Vérifie un fichier d'adresses (une par ligne) et écrit un rapport JSON unique"""
+        with open(emails_file, encoding="utf-8", errors="replace") as f:
+            emails = [line.strip() for line in f if "@" in line]
+        
+        found = index.check_many(emails)
+        index.close()
+        
+        print(f"\n{Colors.BOLD}Résultats:{Colors.ENDC} {len(found)} adresse(s) compromise(s) sur {len(emails)}")
+        for email, breach_ids in sorted(found.items()):
+            names = ", ".join(index.breaches[breach_id]["name"] for breach_id in breach_ids)
+            print(f"  - {email}: {Colors.FAIL}{names}{Colors.ENDC}")
+        
+        report_path = os.path.join(self.data_dir, f"leaks_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(report_path, "w") as f:
+            json.dump({
+                "date": datetime.datetime.now().isoformat(),
+                "checked": len(emails),
+                "compromised": len(found),
+                "breaches": index.breaches,
+                "results": {email: breach_ids for email, breach_ids in sorted(found.items())}
+            }, f, indent=2, ensure_ascii=False)
+        
+        print(f"\n{Colors.BLUE}[*] Rapport sauvegardé: {report_path}{Colors.ENDC}")
+        return True
+    
+    def import_breach(self, files, name, date=None, description=None):
+        """Importe des fichiers de fuite (emails ou SHA-1, un par ligne) dans l'index local"""
+        from breaches.index import BreachIndex
+        
+        print(f"{Colors.HEADER}[+] Import de la fuite {name}...{Colors.ENDC}")
+        
+        for path in files:
+            if not os.path.isfile(path):
+                print(f"{Colors.FAIL}[✗] Le fichier spécifié n'existe pas: {path}{Colors.ENDC}")
+                return False
+        
+        index = BreachIndex(self.breach_index_dir)
+        result = index.ingest(
+            files, name, date, description,
+            progress=lambda lines: print(f"{Colors.BLUE}[*] {lines} lignes lues{Colors.ENDC}")
+        )
+        
+        print(f"\n{Colors.GREEN}[✓] Fuite importée: {result['breach']['name']}{Colors.ENDC}")
+        print(f"  - Lignes lues: {result['lines']}")
+        print(f"  - Lignes ignorées (ni email ni SHA-1): {result['invalid']}")
+        print(f"  - Adresses distinctes dans l'index: {result['hashes']}")
+        return True
+    
     def generate_identity(self, count=1):
         """Génère des identités temporaires"""
         print(f"{Colors.HEADER}[+] Génération d'identités temporaires...{Colors.ENDC}")
@@ -378,86 +425,69 @@ class ShadowCLI:
         print(f"\n{Colors.WARNING}[!] Attention: Ces identités sont générées aléatoirement et ne doivent être utilisées que pour des tests légitimes.{Colors.ENDC}")
         return True
     
-    def clean_metadata(self, file_path):
-        """Nettoie les métadonnées d'un fichier"""
+    def clean_metadata(self, paths, output_dir=None, in_place=False, workers=None, remove_comments=False, remove_revisions=False):
+        """Nettoie les métadonnées de fichiers, dossiers ou motifs glob, en parallèle, avec un rapport JSON unique"""
+        from scrubbers.batch import SCRUBBERS, CleanHashes, collect_files, get_scrubbers, output_path_for, scrub_files
+        
         print(f"{Colors.HEADER}[+] Nettoyage des métadonnées...{Colors.ENDC}")
         
-        if not os.path.exists(file_path):
-            print(f"{Colors.FAIL}[✗] Le fichier spécifié n'existe pas: {file_path}{Colors.ENDC}")
+        for path in paths:
+            if os.path.isfile(path):
+                file_extension = os.path.splitext(path)[1].lower()
+                if file_extension not in SCRUBBERS:
+                    print(f"{Colors.FAIL}[✗] Type de fichier non supporté: {file_extension}{Colors.ENDC}")
+            elif not os.path.isdir(path) and not glob.has_magic(path):
+                print(f"{Colors.FAIL}[✗] Le fichier spécifié n'existe pas: {path}{Colors.ENDC}")
+        
+        files = [(path, base) for path, base in collect_files(paths) if os.path.splitext(path)[1].lower() in SCRUBBERS]
+        if not files:
+            print(f"{Colors.WARNING}[!] Aucun fichier à nettoyer{Colors.ENDC}")
             return False
         
-        file_extension = os.path.splitext(file_path)[1].lower()
-        
-        print(f"{Colors.BLUE}[*] Analyse du fichier: {os.path.basename(file_path)}{Colors.ENDC}")
-        
-        # Traitement selon le type de fichier
-        if file_extension in ['.jpg', '.jpeg', '.png', '.tiff', '.gif']:
-            return self._clean_image_metadata(file_path)
-        elif file_extension in ['.pdf']:
-            print(f"{Colors.WARNING}[!] Le nettoyage des métadonnées PDF n'est pas encore implémenté{Colors.ENDC}")
-            return False
-        elif file_extension in ['.docx', '.xlsx', '.pptx']:
-            print(f"{Colors.WARNING}[!] Le nettoyage des métadonnées Office n'est pas encore implémenté{Colors.ENDC}")
-            return False
-        else:
-            print(f"{Colors.FAIL}[✗] Type de fichier non supporté: {file_extension}{Colors.ENDC}")
-            return False
-    
-    def _clean_image_metadata(self, image_path):
-        """Nettoie les métadonnées d'une image"""
-        try:
-            # Ouvrir l'image
-            image = Image.open(image_path)
-            
-            # Extraire les métadonnées actuelles pour le rapport
-            metadata = {}
-            if hasattr(image, '_getexif') and image._getexif():
-                exif = image._getexif()
-                for tag_id, value in exif.items():
-                    tag = ExifTags.TAGS.get(tag_id, tag_id)
-                    metadata[tag] = str(value)
+        print(f"{Colors.BLUE}[*] {len(files)} fichier(s) à analyser{Colors.ENDC}")
+        
+        # Hashes des fichiers déjà propres, conservés d'une exécution à l'autre (un fichier par jeu d'options)
+        options = "".join(option for option, enabled in (("_comments", remove_comments), ("_revisions", remove_revisions)) if enabled)
+        clean_hashes = CleanHashes(os.path.join(self.data_dir, f"metadata_clean_hashes{options}.txt"))
+        tasks = [(path, output_path_for(path, base, output_dir, in_place)) for path, base in files]
+        
+        results = []
+        summary = {"total": len(tasks), "cleaned": 0, "already_clean": 0, "error": 0}
+        for i, result in enumerate(scrub_files(tasks, clean_hashes.hashes, workers, get_scrubbers(remove_comments, remove_revisions)), 1):
+            results.append(result)
+            summary[result["status"]] += 1
+            progress = f"[{i}/{len(tasks)}] {os.path.relpath(result['path'])}"
+            if result["status"] == "error":
+                print(f"{Colors.FAIL}{progress}: {result['error']}{Colors.ENDC}")
+                continue
             
-            # Créer une nouvelle image sans métadonnées
-            data = list(image.getdata())
-            image_without_exif = Image.new(image.mode, image.size)
-            image_without_exif.putdata(data)
-            
-            # Sauvegarder l'image nettoyée
-            clean_path = os.path.splitext(image_path)[0] + "_clean" + os.path.splitext(image_path)[1]
-            image_without_exif.save(clean_path)
-            
-            # Afficher les résultats
-            print(f"\n{Colors.GREEN}[✓] Métadonnées supprimées avec succès{Colors.ENDC}")
-            print(f"\n{Colors.BOLD}Métadonnées originales:{Colors.ENDC}")
-            if metadata:
-                for tag, value in metadata.items():
-                    print(f"  - {tag}: {value}")
+            if result["status"] == "cleaned":
+                print(f"{Colors.GREEN}{progress}: {', '.join(result['removed'])}{Colors.ENDC}")
+                for warning in result.get("warnings", []):
+                    print(f"{Colors.WARNING}    [!] {warning}{Colors.ENDC}")
             else:
-                print(f"  Aucune métadonnée trouvée dans l'image originale")
-            
-            print(f"\n{Colors.BLUE}[*] Image nettoyée sauvegardée: {clean_path}{Colors.ENDC}")
-            
-            # Générer un rapport
-            report_path = os.path.join(self.data_dir, f"metadata_{os.path.basename(image_path)}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
-            with open(report_path, "w") as f:
-                f.write(f"Rapport de nettoyage de métadonnées pour {os.path.basename(image_path)}\n")
-                f.write(f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                
-                f.write("Métadonnées originales:\n")
-                if metadata:
-                    for tag, value in metadata.items():
-                        f.write(f"- {tag}: {value}\n")
-                else:
-                    f.write("Aucune métadonnée trouvée dans l'image originale\n")
-                
-                f.write(f"\nImage nettoyée sauvegardée: {clean_path}\n")
-            
-            print(f"\n{Colors.BLUE}[*] Rapport sauvegardé: {report_path}{Colors.ENDC}")
-            return True
-            
-        except Exception as e:
-            print(f"{Colors.FAIL}[✗] Erreur lors du nettoyage des métadonnées: {str(e)}{Colors.ENDC}")
-            return False
+                print(f"{Colors.BLUE}{progress}: déjà propre{Colors.ENDC}")
+                clean_hashes.add(result["sha256"])
+            clean_hashes.add(result.get("clean_sha256"))
+        clean_hashes.save()
+        
+        print(f"\n{Colors.BOLD}Résumé:{Colors.ENDC}")
+        print(f"  - Nettoyés: {summary['cleaned']}")
+        print(f"  - Déjà propres: {summary['already_clean']}")
+        print(f"  - Erreurs: {summary['error']}")
+        
+        # Générer un rapport unique pour tout le lot
+        report_path = os.path.join(self.data_dir, f"metadata_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(report_path, "w") as f:
+            json.dump({
+                "date": datetime.datetime.now().isoformat(),
+                "inputs": paths,
+                "summary": summary,
+                "files": results
+            }, f, indent=2, ensure_ascii=False)
+        
+        print(f"\n{Colors.BLUE}[*] Rapport sauvegardé: {report_path}{Colors.ENDC}")
+        return summary["error"] == 0
     
     def reputation_analysis(self, name=None, company=None, website=None):
         """Analyse la réputation en ligne d'une personne ou d'une entreprise"""
@@ -1007,15 +1037,29 @@ class ShadowCLI:
         
         # Commande: leak
         leak_parser = subparsers.add_parser("leak", help="Vérifier les fuites d'identité")
-        leak_parser.add_argument("email", help="Adresse email à vérifier")
+        leak_parser.add_argument("email", nargs="?", help="Adresse email à vérifier")
+        leak_parser.add_argument("--file", help="Fichier d'adresses à vérifier (une par ligne)")
+        
+        # Commande: leak-import
+        leak_import_parser = subparsers.add_parser("leak-import", help="Importer des fichiers de fuite dans l'index local")
+        leak_import_parser.add_argument("files", nargs="+", help="Fichiers de fuite (email ou SHA-1 de l'email en premier champ)")
+        leak_import_parser.add_argument("--name", required=True, help="Nom de la fuite")
+        leak_import_parser.add_argument("--date", help="Date de la fuite (AAAA-MM-JJ)")
+        leak_import_parser.add_argument("--description", help="Description de la fuite")
         
         # Commande: identity
         identity_parser = subparsers.add_parser("identity", help="Générer des identités temporaires")
         identity_parser.add_argument("--count", type=int, default=1, help="Nombre d'identités à générer (max 10)")
         
         # Commande: metadata
-        metadata_parser = subparsers.add_parser("metadata", help="Nettoyer les métadonnées d'un fichier")
-        metadata_parser.add_argument("file", help="Chemin du fichier à nettoyer")
+        metadata_parser = subparsers.add_parser("metadata", help="Nettoyer les métadonnées de fichiers ou de dossiers")
+        metadata_parser.add_argument("paths", nargs="+", help="Fichiers, dossiers ou motifs glob (entre guillemets) à nettoyer")
+        metadata_output = metadata_parser.add_mutually_exclusive_group()
+        metadata_output.add_argument("--output", help="Dossier où écrire les fichiers nettoyés (arborescence conservée)")
+        metadata_output.add_argument("--in-place", action="store_true", help="Remplacer les fichiers originaux")
+        metadata_parser.add_argument("--workers", type=int, help="Nombre de processus (par défaut, un par cœur)")
+        metadata_parser.add_argument("--comments", action="store_true", help="Retirer aussi les commentaires des documents Office")
+        metadata_parser.add_argument("--revisions", action="store_true", help="Accepter et retirer les révisions des documents Word")
         
         # Commande: reputation
         reputation_parser = subparsers.add_parser("reputation", help="Analyser la réputation en ligne")
@@ -1063,11 +1107,13 @@ class ShadowCLI:
         elif args.command == "footprint":
             self.digital_footprint(args.username, args.email)
         elif args.command == "leak":
-            self.identity_leak(args.email)
+            self.identity_leak(args.email, args.file)
+        elif args.command == "leak-import":
+            self.import_breach(args.files, args.name, args.date, args.description)
         elif args.command == "identity":
             self.generate_identity(args.count)
         elif args.command == "metadata":
-            self.clean_metadata(args.file)
+            self.clean_metadata(args.paths, args.output, args.in_place, args.workers, args.comments, args.revisions)
         elif args.command == "reputation":
             self.reputation_analysis(args.name, args.company, args.website)
         elif args.command == "darkweb":
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import axios from "../services/api";
+import axios, { subscribeToAlerts } from "../services/api";
 import { 
   Typography, 
   Paper, 
@@ -23,7 +23,7 @@ export default function Alerts() {
       try {
         setLoading(true);
         const response = await axios.get("/social/alerts");
-        setAlerts(response.data);
+        setAlerts(response.data.items);
         setError(null);
       } catch (err) {
         console.error("Erreur lors de la récupération des alertes:", err);
@@ -35,11 +35,15 @@ export default function Alerts() {
 
     fetchAlerts();
     
-    // Rafraîchir les alertes toutes les 5 minutes
-    const intervalId = setInterval(fetchAlerts, 5 * 60 * 1000);
+    // Les nouvelles alertes arrivent par le flux du serveur (plus d'interrogation périodique)
+    const unsubscribe = subscribeToAlerts((alert) => {
+      setAlerts((current) => (
+        current.some((item) => item.id === alert.id) ? current : [alert, ...current]
+      ));
+    });
     
-    // Nettoyer l'intervalle lors du démontage du composant
-    return () => clearInterval(intervalId);
+    // Fermer le flux lors du démontage du composant
+    return unsubscribe;
   }, []);
 
   const getSeverityColor = (platform) => {
@@ -99,8 +103,8 @@ export default function Alerts() {
         </Paper>
       ) : (
         <Grid container spacing={3}>
-          {alerts.map((alert, index) => (
-            <Grid item xs={12} key={index}>
+          {alerts.map((alert) => (
+            <Grid item xs={12} key={alert.id}>
               <Card>
                 <CardContent>
                   <Box display="flex" justifyContent="space-between" alignItems="center" mb={2}>
@@ -128,7 +132,7 @@ export default function Alerts() {
                     <Button 
                       variant="outlined" 
                       color="secondary" 
-                      onClick={() => handleTakedownRequest(index)}
+                      onClick={() => handleTakedownRequest(alert.id)}
                     >
                       Demander suppression
                     </Button>
@@ -48,4 +48,18 @@ api.interceptors.response.use(
   }
 );
 
+// Abonnement au flux des nouvelles alertes (Server-Sent Events)
+// EventSource se reconnecte seul et renvoie Last-Event-ID : les alertes manquées sont rejouées,
+// avec un recouvrement (alertes validées dans le désordre des ids) à dédoublonner sur l'id.
+export const subscribeToAlerts = (onAlert, params = {}) => {
+  const url = new URL('/social/alerts/stream', API_URL);
+  Object.entries(params).forEach(([key, value]) => url.searchParams.set(key, value));
+
+  const source = new EventSource(url.toString());
+  source.addEventListener('alert', (event) => onAlert(JSON.parse(event.data)));
+
+  // Retourne la fonction de désabonnement
+  return () => source.close();
+};
+
 export default api;
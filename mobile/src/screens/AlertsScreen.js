@@ -4,7 +4,7 @@ import { Card, Title, Paragraph, Chip, Button, ActivityIndicator } from 'react-n
 import { useNavigation } from '@react-navigation/native';
 import { Ionicons } from '@expo/vector-icons';
 import { useEffect, useState } from 'react';
-import api from '../utils/api';
+import api, { subscribeToAlerts } from '../utils/api';
 
 const AlertsScreen = () => {
   const navigation = useNavigation();
@@ -17,7 +17,7 @@ const AlertsScreen = () => {
       try {
         setLoading(true);
         const response = await api.get('/social/alerts');
-        setAlerts(response.data);
+        setAlerts(response.data.items);
         setError(null);
       } catch (err) {
         console.error('Erreur lors de la récupération des alertes:', err);
@@ -28,6 +28,15 @@ const AlertsScreen = () => {
     };
 
     fetchAlerts();
+
+    // Les nouvelles alertes arrivent par le flux du serveur
+    const unsubscribe = subscribeToAlerts((alert) => {
+      setAlerts((current) => (
+        current.some((item) => item.id === alert.id) ? current : [alert, ...current]
+      ));
+    });
+
+    return unsubscribe;
   }, []);
 
   const handleTakedownRequest = (alertId) => {
@@ -88,7 +97,7 @@ const AlertsScreen = () => {
       ) : (
         <FlatList
           data={alerts}
-          keyExtractor={(item, index) => index.toString()}
+          keyExtractor={(item) => item.id.toString()}
           renderItem={({ item }) => (
             <Card style={styles.card}>
               <Card.Content>
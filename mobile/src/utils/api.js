@@ -61,4 +61,49 @@ api.interceptors.response.use(
   }
 );
 
+// Abonnement au flux des nouvelles alertes (WebSocket, avec reconnexion automatique)
+export const subscribeToAlerts = (onAlert, params = {}) => {
+  let socket = null;
+  let lastEventId = null;
+  let closed = false;
+  let retryDelay = 1000;
+
+  const connect = () => {
+    const query = { ...params };
+    if (lastEventId !== null) {
+      // Les alertes créées pendant la coupure sont renvoyées à la reconnexion
+      query.last_event_id = lastEventId;
+    }
+    const queryString = Object.entries(query)
+      .map(([key, value]) => `${encodeURIComponent(key)}=${encodeURIComponent(value)}`)
+      .join('&');
+    socket = new WebSocket(`${BASE_URL.replace(/^http/, 'ws')}/social/alerts/ws?${queryString}`);
+
+    socket.onopen = () => {
+      retryDelay = 1000;
+    };
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'alert') {
+        lastEventId = message.alert.id;
+        onAlert(message.alert);
+      }
+    };
+    socket.onclose = () => {
+      if (!closed) {
+        setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      }
+    };
+  };
+
+  connect();
+
+  // Retourne la fonction de désabonnement
+  return () => {
+    closed = true;
+    socket.close();
+  };
+};
+
 export default api;
\ No newline at end of file